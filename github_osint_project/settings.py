@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from decouple import config, Csv
 import dj_database_url
@@ -105,7 +106,10 @@ LOGOUT_REDIRECT_URL = "/"
 LOGIN_URL = "/users/login/"
 
 # Email settings
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# locmem/console-бэкенды удобны для проверки очереди уведомлений
+EMAIL_BACKEND = config(
+    "EMAIL_BACKEND", default="django.core.mail.backends.smtp.EmailBackend"
+)
 EMAIL_HOST = config("EMAIL_HOST", default="smtp.yandex.ru")
 EMAIL_PORT = config("EMAIL_PORT", default=587, cast=int)
 EMAIL_USE_TLS = config("EMAIL_USE_TLS", default=True, cast=bool)
@@ -113,6 +117,199 @@ EMAIL_HOST_USER = config("EMAIL_HOST_USER", default="")
 EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD", default="")
 DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL", default=EMAIL_HOST_USER)
 
+# Email notification outbox (manage.py notification_worker)
+NOTIFICATION_BATCH_SIZE = config("NOTIFICATION_BATCH_SIZE", default=50, cast=int)
+NOTIFICATION_POLL_INTERVAL = config(
+    "NOTIFICATION_POLL_INTERVAL", default=5.0, cast=float
+)
+NOTIFICATION_MAX_ATTEMPTS = config("NOTIFICATION_MAX_ATTEMPTS", default=5, cast=int)
+# Задержка первого повтора, сек; дальше удваивается
+NOTIFICATION_RETRY_DELAY = config("NOTIFICATION_RETRY_DELAY", default=60, cast=int)
+NOTIFICATION_STALE_TIMEOUT = config(
+    "NOTIFICATION_STALE_TIMEOUT", default=600, cast=int
+)
+# Записей в тексте отчета; полный отчет уходит сжатым CSV-вложением
+NOTIFICATION_INLINE_RESULTS = config(
+    "NOTIFICATION_INLINE_RESULTS", default=50, cast=int
+)
+# Предел сжатого CSV-вложения, байты; больший отчет заменяется ссылкой на выгрузку
+NOTIFICATION_ATTACHMENT_MAX_BYTES = config(
+    "NOTIFICATION_ATTACHMENT_MAX_BYTES", default=10 * 1024 * 1024, cast=int
+)
+# Адрес сервиса для ссылок в письмах, например https://osint.example.com
+SITE_URL = config("SITE_URL", default="")
+
+# Scan job queue
+SCAN_WORKER_CONCURRENCY = config("SCAN_WORKER_CONCURRENCY", default=2, cast=int)
+SCAN_MAX_ACTIVE_PER_USER = config("SCAN_MAX_ACTIVE_PER_USER", default=2, cast=int)
+SCAN_POLL_INTERVAL = config("SCAN_POLL_INTERVAL", default=2.0, cast=float)
+# Как часто воркер заново проверяет доступные движки сканирования, секунды
+SCAN_ENGINES_REFRESH_INTERVAL = config(
+    "SCAN_ENGINES_REFRESH_INTERVAL", default=300, cast=int
+)
+SCAN_HEARTBEAT_INTERVAL = config("SCAN_HEARTBEAT_INTERVAL", default=15, cast=int)
+SCAN_STALE_TIMEOUT = config("SCAN_STALE_TIMEOUT", default=120, cast=int)
+SCAN_MAX_ATTEMPTS = config("SCAN_MAX_ATTEMPTS", default=3, cast=int)
+
+# TruffleHog
+TRUFFLEHOG_BINARY = config("TRUFFLEHOG_BINARY", default="trufflehog")
+TRUFFLEHOG_TIMEOUT = config("TRUFFLEHOG_TIMEOUT", default=300, cast=int)
+TRUFFLEHOG_VERIFY = config("TRUFFLEHOG_VERIFY", default=True, cast=bool)
+# Сколько путей передавать в один запуск TruffleHog при сканировании списка файлов
+TRUFFLEHOG_MAX_PATHS_PER_RUN = config(
+    "TRUFFLEHOG_MAX_PATHS_PER_RUN", default=500, cast=int
+)
+GIT_BINARY = config("GIT_BINARY", default="git")
+
+# Native secret scanning engine (truffleHogRegexes + entropy)
+# Глубины сканирования, для которых используется встроенный движок вместо TruffleHog
+SCAN_NATIVE_ENGINE_DEPTHS = config(
+    "SCAN_NATIVE_ENGINE_DEPTHS", default="STANDARD", cast=Csv()
+)
+NATIVE_ENGINE_ENTROPY = config("NATIVE_ENGINE_ENTROPY", default=True, cast=bool)
+NATIVE_ENGINE_MAX_FILE_BYTES = config(
+    "NATIVE_ENGINE_MAX_FILE_BYTES", default=10 * 1024 * 1024, cast=int
+)
+# Файлов в одной задаче пула процессов
+NATIVE_ENGINE_CHUNK_FILES = config("NATIVE_ENGINE_CHUNK_FILES", default=200, cast=int)
+
+# Commit history scanning
+# Блобы истории больше этого размера не скачиваются и не сканируются
+SCAN_HISTORY_MAX_BLOB_BYTES = config(
+    "SCAN_HISTORY_MAX_BLOB_BYTES", default=5 * 1024 * 1024, cast=int
+)
+
+# Dependency vulnerability scanning
+# Выгрузка OSV: JSON-файл, ZIP (all.zip) или каталог с ними
+DEPENDENCY_ADVISORY_DB = config(
+    "DEPENDENCY_ADVISORY_DB", default=str(BASE_DIR / "advisories")
+)
+
+# Repository mirror cache
+REPO_CACHE_ENABLED = config("REPO_CACHE_ENABLED", default=True, cast=bool)
+REPO_CACHE_DIR = config(
+    "REPO_CACHE_DIR",
+    default=os.path.join(tempfile.gettempdir(), "github_osint_repo_cache"),
+)
+REPO_CACHE_MAX_SIZE_MB = config("REPO_CACHE_MAX_SIZE_MB", default=10240, cast=int)
+
+# GitHub API client
+GITHUB_API_URL = config("GITHUB_API_URL", default="https://api.github.com")
+GITHUB_TOKEN = config("GITHUB_TOKEN", default="")
+GITHUB_API_TIMEOUT = config("GITHUB_API_TIMEOUT", default=10, cast=int)
+GITHUB_POOL_SIZE = config("GITHUB_POOL_SIZE", default=10, cast=int)
+# Сколько ответов /repos/{owner}/{repo} хранить для условных запросов по ETag
+GITHUB_ETAG_CACHE_SIZE = config("GITHUB_ETAG_CACHE_SIZE", default=1024, cast=int)
+
+# Clone strategy planning (по метаданным GitHub до скачивания)
+# Репозитории больше лимита не скачиваются
+REPO_MAX_SIZE_MB = config("REPO_MAX_SIZE_MB", default=2048, cast=int)
+# Начиная с этого размера - blobless partial clone со sparse checkout
+REPO_PARTIAL_CLONE_MIN_MB = config("REPO_PARTIAL_CLONE_MIN_MB", default=200, cast=int)
+# Вендорные каталоги, не попадающие в sparse checkout и распаковку ZIP
+REPO_SKIP_DIRS = config(
+    "REPO_SKIP_DIRS",
+    default="node_modules,vendor,bower_components,.git",
+    cast=Csv(),
+)
+# Локальные file:// URL вместо GitHub - только для manage.py benchmark_pipeline
+REPO_ALLOW_FILE_URLS = config("REPO_ALLOW_FILE_URLS", default=False, cast=bool)
+
+# ZIP archive download (fallback when git clone fails)
+REPO_ZIP_TIMEOUT = config("REPO_ZIP_TIMEOUT", default=30, cast=int)
+REPO_ZIP_MAX_BYTES = config("REPO_ZIP_MAX_BYTES", default=500 * 1024 * 1024, cast=int)
+# Архивы меньше этого размера не сбрасываются на диск
+REPO_ZIP_SPOOL_BYTES = config(
+    "REPO_ZIP_SPOOL_BYTES", default=16 * 1024 * 1024, cast=int
+)
+REPO_ZIP_MAX_FILE_BYTES = config(
+    "REPO_ZIP_MAX_FILE_BYTES", default=10 * 1024 * 1024, cast=int
+)
+REPO_ZIP_MAX_EXTRACTED_BYTES = config(
+    "REPO_ZIP_MAX_EXTRACTED_BYTES", default=2 * 1024 * 1024 * 1024, cast=int
+)
+# Архив с большим числом записей отклоняется до распаковки
+REPO_ZIP_MAX_ENTRIES = config("REPO_ZIP_MAX_ENTRIES", default=200000, cast=int)
+
+# Filesystem walker
+# Потоков для параллельного обхода каталогов верхнего уровня
+SCAN_WALK_WORKERS = config("SCAN_WALK_WORKERS", default=4, cast=int)
+
+# Pre-scan exclusions (синтаксис .gitignore; дополняются .gitignore, .osintignore
+# репозитория и исключениями из запроса)
+SCAN_EXCLUDE_PATTERNS = config(
+    "SCAN_EXCLUDE_PATTERNS",
+    default=(
+        "node_modules/,vendor/,bower_components/,jspm_packages/,.yarn/,dist/,"
+        "target/,.gradle/,__pycache__/,*.min.js,*.min.css,*.map,*.bundle.js,"
+        "*.chunk.js,*.svg,package-lock.json,yarn.lock,pnpm-lock.yaml,"
+        "composer.lock,Gemfile.lock,poetry.lock,Pipfile.lock,Cargo.lock,go.sum"
+    ),
+    cast=Csv(),
+)
+# Файлы, которые сканируются, даже если их скрывает .gitignore
+SCAN_EXCLUDE_PROTECTED_PATTERNS = config(
+    "SCAN_EXCLUDE_PROTECTED_PATTERNS",
+    default=".env,.env.*,*.pem,*.key,id_rsa*,id_dsa*,id_ecdsa*,id_ed25519*,*.tfvars",
+    cast=Csv(),
+)
+SCAN_EXCLUDE_USE_GITIGNORE = config(
+    "SCAN_EXCLUDE_USE_GITIGNORE", default=True, cast=bool
+)
+# Файлы больше лимита не сканируются на секреты
+SCAN_EXCLUDE_MAX_FILE_BYTES = config(
+    "SCAN_EXCLUDE_MAX_FILE_BYTES", default=5 * 1024 * 1024, cast=int
+)
+
+# Sharded scanning of large repositories
+SCAN_SHARD_WORKERS = config("SCAN_SHARD_WORKERS", default=os.cpu_count() or 1, cast=int)
+SCAN_SHARD_MIN_BYTES = config(
+    "SCAN_SHARD_MIN_BYTES", default=50 * 1024 * 1024, cast=int
+)
+SCAN_SHARD_RETRIES = config("SCAN_SHARD_RETRIES", default=2, cast=int)
+
+# Incremental secret scanning
+SCAN_INCREMENTAL_ENABLED = config("SCAN_INCREMENTAL_ENABLED", default=True, cast=bool)
+SCAN_INCREMENTAL_MAX_FILES = config(
+    "SCAN_INCREMENTAL_MAX_FILES", default=2000, cast=int
+)
+
+# Blob-level finding cache
+SCAN_BLOB_CACHE_ENABLED = config("SCAN_BLOB_CACHE_ENABLED", default=True, cast=bool)
+# Доля известных блобов, ниже которой репозиторий сканируется целиком
+SCAN_BLOB_CACHE_MIN_HIT_RATIO = config(
+    "SCAN_BLOB_CACHE_MIN_HIT_RATIO", default=0.5, cast=float
+)
+
+# Scan results persistence
+SCAN_RESULTS_BATCH_SIZE = config("SCAN_RESULTS_BATCH_SIZE", default=1000, cast=int)
+SCAN_RESULTS_USE_COPY = config("SCAN_RESULTS_USE_COPY", default=False, cast=bool)
+# Поля, по которым отбрасываются дубликаты находок (пусто - без дедупликации)
+SCAN_RESULTS_DEDUPE_FIELDS = config(
+    "SCAN_RESULTS_DEDUPE_FIELDS", default="", cast=Csv()
+)
+# Находок на одной странице деталей сканирования
+SCAN_RESULTS_PAGE_SIZE = config("SCAN_RESULTS_PAGE_SIZE", default=50, cast=int)
+# Размер пачки серверного курсора при выгрузке находок
+SCAN_EXPORT_CHUNK_SIZE = config("SCAN_EXPORT_CHUNK_SIZE", default=2000, cast=int)
+
+# Live scan progress (SSE)
+# Не чаще одной записи прогресса в базу за интервал, сек
+SCAN_PROGRESS_INTERVAL = config("SCAN_PROGRESS_INTERVAL", default=1.0, cast=float)
+# Опрос базы, если LISTEN/NOTIFY недоступен (не PostgreSQL)
+SCAN_PROGRESS_POLL_INTERVAL = config(
+    "SCAN_PROGRESS_POLL_INTERVAL", default=2.0, cast=float
+)
+SCAN_PROGRESS_KEEPALIVE = config("SCAN_PROGRESS_KEEPALIVE", default=15.0, cast=float)
+# Максимальная длительность одного SSE-соединения; браузер переподключится сам
+SCAN_PROGRESS_STREAM_SECONDS = config(
+    "SCAN_PROGRESS_STREAM_SECONDS", default=600, cast=int
+)
+
+# Prometheus metrics
+# Токен для /metrics (Authorization: Bearer ...); пустой - доступ только персоналу
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
 # Logging
 LOGGING = {
     "version": 1,
@@ -20,6 +20,8 @@ from django.urls import path, include
 from django.views.generic import TemplateView
 from django.contrib.auth import views as auth_views
 
+from scanner.views import metrics
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -27,4 +29,5 @@ urlpatterns = [
     path("logout/", auth_views.LogoutView.as_view(), name="logout"),
     path("", TemplateView.as_view(template_name="home.html"), name="home"),
     path("scanner/", include("scanner.urls")),
+    path("metrics", metrics, name="metrics"),
 ]
@@ -1,5 +1,33 @@
 from django.contrib import admin
-from .models import ScanRequest, ScanResult
+from .models import (
+    Notification,
+    ScanRequest,
+    ScanResult,
+    ScanResultSummary,
+    ScanStageTiming,
+)
+
+
+class ScanResultSummaryInline(admin.TabularInline):
+    model = ScanResultSummary
+    fields = ["status", "bug_type", "secret_type", "confidence", "count"]
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class ScanStageTimingInline(admin.TabularInline):
+    model = ScanStageTiming
+    fields = ["stage", "seconds", "calls", "bytes", "items"]
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(ScanRequest)
@@ -14,10 +42,11 @@ class ScanRequestAdmin(admin.ModelAdmin):
         "has_local_path",
         "created_at",
     ]
-    list_filter = ["scan_type", "scan_depth", "status", "created_at"]
+    list_filter = ["scan_type", "scan_depth", "engine", "status", "created_at"]
     search_fields = ["repository_url", "user__username", "local_path"]
     readonly_fields = ["created_at", "updated_at", "local_path_display"]
     list_select_related = ["user"]
+    inlines = [ScanResultSummaryInline, ScanStageTimingInline]
 
     fieldsets = (
         (
@@ -32,7 +61,17 @@ class ScanRequestAdmin(admin.ModelAdmin):
                 )
             },
         ),
-        ("Статус", {"fields": ("status", "local_path_display", "error_message")}),
+        (
+            "Статус",
+            {"fields": ("status", "engine", "local_path_display", "error_message")},
+        ),
+        (
+            "Коммиты",
+            {
+                "fields": ("commit_sha", "base_commit_sha", "repository_info"),
+                "classes": ("collapse",),
+            },
+        ),
         (
             "Временные метки",
             {"fields": ("created_at", "updated_at"), "classes": ("collapse",)},
@@ -70,6 +109,33 @@ class ScanResultAdmin(admin.ModelAdmin):
         "file_path",
     ]
     list_filter = ["status", "bug_type", "confidence", "created_at"]
-    search_fields = ["file_path", "scan_request__repository_url", "description"]
+    # Только file_path: для него есть триграммный индекс по UPPER(file_path),
+    # OR с другими колонками заставил бы PostgreSQL читать всю таблицу
+    search_fields = ["file_path"]
     readonly_fields = ["created_at", "updated_at"]
     list_select_related = ["scan_request"]
+    # COUNT(*) по всей таблице находок на каждой странице списка слишком дорог
+    show_full_result_count = False
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = [
+        "id",
+        "scan_request",
+        "kind",
+        "recipient",
+        "status",
+        "attempts",
+        "sent_at",
+    ]
+    list_filter = ["status", "kind", "created_at"]
+    search_fields = ["recipient", "scan_request__repository_url"]
+    readonly_fields = [
+        "created_at",
+        "updated_at",
+        "sent_at",
+        "last_error",
+        "claim_token",
+    ]
+    list_select_related = ["scan_request"]
@@ -0,0 +1,249 @@
+import json
+import os
+import re
+import threading
+import zipfile
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Суффиксы, означающие версию до релиза (1.0rc1 < 1.0)
+PRE_RELEASE_TAGS = frozenset(
+    "dev a alpha b beta c pre preview rc cr m milestone snapshot".split()
+)
+# Суффиксы, равнозначные релизу (Maven: 1.0.Final == 1.0)
+RELEASE_TAGS = frozenset("final ga release".split())
+
+SEVERITY_CONFIDENCE = {
+    "CRITICAL": "high",
+    "HIGH": "high",
+    "MODERATE": "medium",
+    "MEDIUM": "medium",
+    "LOW": "low",
+}
+
+VERSION_TOKEN_RE = re.compile(r"\d+|[a-z]+")
+
+
+def normalize_package_name(ecosystem, name):
+    if ecosystem == "PyPI":
+        return re.sub(r"[-_.]+", "-", name).lower()
+    if ecosystem in ("Packagist", "Maven"):
+        return name.lower()
+    return name
+
+
+def version_key(version):
+    """
+    Ключ сравнения версий, общий для PyPI, npm, Maven и Packagist:
+    числовой релиз без хвостовых нулей, затем суффикс - предрелизы
+    меньше релиза, остальные суффиксы (post, Final, сборки) больше.
+    """
+    version = version.strip().lower().lstrip("v=")
+    match = re.match(r"\d+(?:\.\d+)*", version)
+    release = tuple(int(part) for part in match.group().split(".")) if match else ()
+    while release and release[-1] == 0:
+        release = release[:-1]
+
+    rest = version[match.end() :] if match else version
+    tokens = tuple(
+        (1, int(token)) if token.isdigit() else (0, token)
+        for token in VERSION_TOKEN_RE.findall(rest)
+        if token not in RELEASE_TAGS
+    )
+    if not tokens:
+        return (release, (1,))
+    if tokens[0][0] == 0 and tokens[0][1] in PRE_RELEASE_TAGS:
+        return (release, (0, tokens))
+    return (release, (2, tokens))
+
+
+class Advisory:
+    __slots__ = ("id", "summary", "confidence", "fixed", "aliases")
+
+    def __init__(self, id, summary, confidence, fixed=None, aliases=()):
+        self.id = id
+        self.summary = summary
+        self.confidence = confidence
+        self.fixed = fixed
+        self.aliases = aliases
+
+
+# Конец интервала без исправленной версии
+UNBOUNDED = ((float("inf"),), (3,))
+
+
+class IntervalIndex:
+    """
+    Статический индекс интервалов версий одного пакета.
+
+    Интервалы отсортированы по началу; для каждой позиции хранится максимум
+    концов на префиксе, поэтому поиск - бинарный поиск по началу и обратный
+    проход только по интервалам, которые еще могут содержать версию.
+    Конец интервала - пара (ключ версии, включительно).
+    """
+
+    def __init__(self, intervals):
+        intervals.sort(key=lambda item: item[0])
+        self.starts = [start for start, _, _ in intervals]
+        self.intervals = intervals
+        self.max_ends = []
+        for _, end, _ in intervals:
+            previous = self.max_ends[-1] if self.max_ends else end
+            self.max_ends.append(max(previous, end))
+
+    def find(self, key):
+        advisories = []
+        probe = (key, True)
+        for i in range(bisect_right(self.starts, key) - 1, -1, -1):
+            if self.max_ends[i] < probe:
+                break
+            _, end, advisory = self.intervals[i]
+            if probe <= end:
+                advisories.append(advisory)
+        return advisories
+
+
+def affected_intervals(affected):
+    """Интервалы (начало, конец, исправленная версия) из ranges записи OSV"""
+    for affected_range in affected.get("ranges", ()):
+        if affected_range.get("type") not in ("ECOSYSTEM", "SEMVER"):
+            continue
+        start = None
+        for event in affected_range.get("events", ()):
+            if "introduced" in event:
+                start = version_key(event["introduced"])
+            elif start is not None and "fixed" in event:
+                yield start, (version_key(event["fixed"]), False), event["fixed"]
+                start = None
+            elif start is not None and "last_affected" in event:
+                yield start, (version_key(event["last_affected"]), True), None
+                start = None
+        if start is not None:
+            yield start, (UNBOUNDED, True), None
+
+
+class AdvisoryDatabase:
+    """
+    Локальная база уязвимостей в формате OSV: каталог *.json, JSON-список
+    или ZIP-выгрузка (all.zip из osv-vulnerabilities). Загружается один раз
+    на процесс и повторно - только при изменении файла.
+    """
+
+    _cache = {}
+    _lock = threading.Lock()
+
+    def __init__(self, advisories):
+        ranges = defaultdict(list)
+        exact = defaultdict(list)
+        for data in advisories:
+            self._add(data, ranges, exact)
+
+        self.index = {
+            key: IntervalIndex(intervals) for key, intervals in ranges.items()
+        }
+        self.exact = dict(exact)
+        logger.info(
+            f"База уязвимостей: {len(advisories)} записей, "
+            f"{len(set(self.index) | {key[:2] for key in self.exact})} пакетов"
+        )
+
+    @staticmethod
+    def _add(data, ranges, exact):
+        severity = (data.get("database_specific") or {}).get("severity") or ""
+        for affected in data.get("affected", ()):
+            package = affected.get("package") or {}
+            ecosystem = package.get("ecosystem", "").split(":")[0]
+            name = package.get("name")
+            if not ecosystem or not name:
+                continue
+            key = (ecosystem, normalize_package_name(ecosystem, name))
+
+            intervals = list(affected_intervals(affected))
+            advisory = Advisory(
+                data.get("id", "UNKNOWN"),
+                data.get("summary") or (data.get("details") or "")[:200],
+                SEVERITY_CONFIDENCE.get(severity.upper(), "medium"),
+                ", ".join(fixed for _, _, fixed in intervals if fixed) or None,
+                tuple(data.get("aliases", ())),
+            )
+            for start, end, _ in intervals:
+                ranges[key].append((start, end, advisory))
+            for version in affected.get("versions", ()):
+                exact[key + (version_key(version),)].append(advisory)
+
+    def lookup(self, ecosystem, name, version):
+        """Уязвимости, затрагивающие версию пакета (без повторов)"""
+        key = (ecosystem, normalize_package_name(ecosystem, name))
+        version = version_key(version)
+        found = {}
+        index = self.index.get(key)
+        if index is not None:
+            for advisory in index.find(version):
+                found[advisory.id] = advisory
+        for advisory in self.exact.get(key + (version,), ()):
+            found[advisory.id] = advisory
+        return list(found.values())
+
+    @classmethod
+    def load(cls, path=None):
+        """База из DEPENDENCY_ADVISORY_DB или None, если она не найдена"""
+        path = str(path or settings.DEPENDENCY_ADVISORY_DB)
+        signature = _signature(path)
+        if not signature:
+            logger.warning(f"База уязвимостей не найдена: {path}")
+            return None
+
+        with cls._lock:
+            cached = cls._cache.get(path)
+            if cached is None or cached[0] != signature:
+                cached = (signature, cls(list(_read_advisories(path))))
+                cls._cache[path] = cached
+        return cached[1]
+
+
+def _advisory_files(path):
+    if not os.path.isdir(path):
+        yield path
+        return
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            if name.endswith((".json", ".zip")):
+                yield os.path.join(root, name)
+
+
+def _signature(path):
+    """
+    Пути, mtime и размеры файлов базы. mtime каталога меняется только при
+    добавлении и удалении файлов, но не при их перезаписи на месте.
+    Пустой кортеж - базы нет.
+    """
+    try:
+        return tuple(
+            (file, stat.st_mtime_ns, stat.st_size)
+            for file, stat in ((file, os.stat(file)) for file in _advisory_files(path))
+        )
+    except OSError:
+        return ()
+
+
+def _read_advisories(path):
+    if os.path.isdir(path):
+        for file in _advisory_files(path):
+            yield from _read_advisories(file)
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for name in archive.namelist():
+                if name.endswith(".json"):
+                    yield from _as_list(json.loads(archive.read(name)))
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield from _as_list(json.load(f))
+
+
+def _as_list(data):
+    return data if isinstance(data, list) else [data]
@@ -0,0 +1,143 @@
+import os
+import shutil
+import stat
+import tempfile
+import zipfile
+
+import requests
+from django.conf import settings
+
+from .github_client import GitHubAPIError, get_github_client
+import logging
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Файлы, в которых детекторы секретов ничего не найдут
+BINARY_EXTENSIONS = frozenset("""
+    .png .jpg .jpeg .gif .bmp .ico .webp .tiff .psd
+    .mp3 .mp4 .avi .mov .wav .flac .ogg .webm
+    .zip .tar .gz .tgz .bz2 .xz .7z .rar .jar .war
+    .woff .woff2 .ttf .otf .eot
+    .exe .dll .so .dylib .o .a .class .pyc .wasm
+    .pdf .doc .docx .xls .xlsx .ppt .pptx
+    .bin .dat .db .sqlite .iso .dmg
+    """.split())
+
+
+class ArchiveError(Exception):
+    """Архив не удалось скачать или он превышает лимиты"""
+
+
+def resolve_default_branch(owner, repo_name):
+    """
+    Ветка по умолчанию из метаданных репозитория.
+    None, если API недоступно - тогда архив берется по HEAD.
+    """
+    try:
+        metadata = get_github_client().get_repository(owner, repo_name)
+    except (GitHubAPIError, requests.RequestException, ValueError) as e:
+        logger.info(f"Метаданные репозитория недоступны: {e}")
+        return None
+    return metadata.get("default_branch") if metadata else None
+
+
+def archive_url(owner, repo_name, branch=None):
+    if branch:
+        return f"https://github.com/{owner}/{repo_name}/archive/refs/heads/{branch}.zip"
+    # GitHub сам разрешает HEAD в ветку по умолчанию
+    return f"https://github.com/{owner}/{repo_name}/archive/HEAD.zip"
+
+
+def download_archive(url, max_bytes=None):
+    """
+    Скачивает архив потоково в SpooledTemporaryFile: небольшие архивы остаются
+    в памяти, большие сбрасываются на диск. Превышение max_bytes прерывает
+    загрузку. Возвращает файл, спозиционированный на начало.
+    """
+    max_bytes = max_bytes or settings.REPO_ZIP_MAX_BYTES
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.REPO_ZIP_SPOOL_BYTES)
+    try:
+        with get_github_client().stream(
+            url, timeout=settings.REPO_ZIP_TIMEOUT
+        ) as response:
+            if response.status_code != 200:
+                raise ArchiveError(f"Архив недоступен (статус: {response.status_code})")
+
+            length = response.headers.get("Content-Length")
+            if length and length.isdigit() and int(length) > max_bytes:
+                raise ArchiveError(f"Архив больше лимита: {int(length)} байт")
+
+            received = 0
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_BYTES):
+                received += len(chunk)
+                if received > max_bytes:
+                    raise ArchiveError(f"Архив больше лимита: {max_bytes} байт")
+                spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+
+    logger.info(f"Архив скачан: {received} байт")
+    spool.seek(0)
+    return spool
+
+
+def _member_path(name):
+    """Путь файла без каталога верхнего уровня <repo>-<branch>/, None - пропустить"""
+    parts = name.split("/", 1)
+    if len(parts) < 2 or not parts[1]:
+        return None
+    path = parts[1]
+    if path.startswith("/") or ".." in path.split("/"):
+        return None
+    return path
+
+
+def _should_extract(path, info, skip_dirs):
+    if info.is_dir():
+        return False
+    if stat.S_ISLNK(info.external_attr >> 16):
+        return False
+    if info.file_size > settings.REPO_ZIP_MAX_FILE_BYTES:
+        return False
+    if any(part in skip_dirs for part in path.split("/")[:-1]):
+        return False
+    return os.path.splitext(path)[1].lower() not in BINARY_EXTENSIONS
+
+
+def extract_archive(archive, download_path):
+    """
+    Распаковывает в download_path только файлы, пригодные для сканирования:
+    без вендорных каталогов, бинарных расширений, симлинков и слишком больших
+    файлов. Пути вне download_path (.., абсолютные) пропускаются; архив
+    больше REPO_ZIP_MAX_ENTRIES записей или REPO_ZIP_MAX_EXTRACTED_BYTES
+    после распаковки отклоняется. Возвращает (распаковано, пропущено).
+    """
+    skip_dirs = set(settings.REPO_SKIP_DIRS)
+    extracted = skipped = total = 0
+    with zipfile.ZipFile(archive) as zip_file:
+        members = zip_file.infolist()
+        if len(members) > settings.REPO_ZIP_MAX_ENTRIES:
+            raise ArchiveError(f"Слишком много файлов в архиве: {len(members)}")
+        for info in members:
+            path = _member_path(info.filename)
+            if path is None or info.is_dir():
+                continue
+            if not _should_extract(path, info, skip_dirs):
+                skipped += 1
+                continue
+
+            total += info.file_size
+            if total > settings.REPO_ZIP_MAX_EXTRACTED_BYTES:
+                raise ArchiveError("Распакованный архив больше лимита")
+
+            target = os.path.join(download_path, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with zip_file.open(info) as source, open(target, "wb") as dest:
+                shutil.copyfileobj(source, dest, DOWNLOAD_CHUNK_BYTES)
+            extracted += 1
+
+    logger.info(f"Распаковано файлов: {extracted}, пропущено: {skipped}")
+    return extracted, skipped
@@ -0,0 +1,205 @@
+import hashlib
+import os
+from collections import defaultdict
+
+from django.conf import settings
+from git import Repo
+from git.exc import GitCommandError, InvalidGitRepositoryError, NoSuchPathError
+
+from .models import BlobScanCache, ScanResult
+from .walker import FileManifest
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Поля ScanResult, которые не зависят от репозитория и хранятся в кеше
+CACHED_FIELDS = (
+    "str_number",
+    "secret_type",
+    "confidence",
+    "raw_context",
+    "description",
+)
+
+# Обычные и исполняемые файлы; симлинки и сабмодули не сканируются
+REGULAR_FILE_MODES = ("100644", "100755")
+
+
+def git_blob_sha(path):
+    """SHA-1 содержимого файла в формате git hash-object"""
+    digest = hashlib.sha1(f"blob {os.path.getsize(path)}\0".encode())
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_blob_manifest(repo_path):
+    """
+    Словарь {относительный путь: SHA блоба} для рабочей копии.
+    Для git-репозиториев берется из индекса, для распакованных ZIP - считается.
+    Записи skip-worktree (sparse checkout частичного клона) пропускаются:
+    их файлов нет на диске, они не сканируются и не должны попасть в кеш.
+    """
+    try:
+        output = Repo(repo_path).git.ls_files("-s", "-t", "-z")
+    except (InvalidGitRepositoryError, NoSuchPathError, GitCommandError):
+        return _hash_tree(repo_path)
+
+    manifest = {}
+    for entry in output.split("\0"):
+        if not entry:
+            continue
+        info, path = entry.split("\t", 1)
+        tag, mode, sha, _stage = info.split()
+        if tag != "S" and mode in REGULAR_FILE_MODES:
+            manifest[path] = sha
+
+    # Индекс может расходиться с рабочей копией - в кеш идут только файлы на диске
+    on_disk = {entry.path for entry in FileManifest.for_path(repo_path).files()}
+    return {path: sha for path, sha in manifest.items() if path in on_disk}
+
+
+def _hash_tree(repo_path):
+    manifest = {}
+    for entry in FileManifest.for_path(repo_path).files():
+        try:
+            manifest[entry.path] = git_blob_sha(os.path.join(repo_path, entry.path))
+        except OSError:
+            continue
+    return manifest
+
+
+class BlobCacheSession:
+    """
+    Кеш находок по блобам в рамках одного сканирования.
+    engine - движок и его версия (ScanEngineRegistry.cache_key), None отключает кеш.
+
+    Делит целевые файлы на уже известные кешу (их находки копируются без
+    запуска TruffleHog) и новые (paths_to_scan). После записи находок
+    сканирования commit() сохраняет в кеш результаты по новым блобам.
+    """
+
+    LOOKUP_CHUNK = 500
+
+    def __init__(self, repo_path, paths=None, engine=None):
+        self.repo_path = repo_path
+        self.enabled = settings.SCAN_BLOB_CACHE_ENABLED
+        self.engine = engine
+        self.manifest = {}
+        self.cached = {}
+        self.paths_to_scan = paths
+
+        if not self.enabled or not self.engine:
+            self.enabled = False
+            return
+
+        try:
+            manifest = build_blob_manifest(repo_path)
+        except Exception as e:
+            logger.warning(f"Не удалось построить список блобов: {e}")
+            self.enabled = False
+            return
+
+        targets = list(manifest) if paths is None else paths
+        self.manifest = {path: manifest[path] for path in targets if path in manifest}
+        self.cached = self._lookup(set(self.manifest.values()))
+
+        unknown = [
+            path for path, sha in self.manifest.items() if sha not in self.cached
+        ]
+        hits = len(self.manifest) - len(unknown)
+        if (
+            paths is None
+            and hits < len(self.manifest) * settings.SCAN_BLOB_CACHE_MIN_HIT_RATIO
+        ):
+            # Кеш почти пуст - дешевле отсканировать каталог целиком
+            self.cached = {}
+            self.paths_to_scan = None
+        else:
+            untracked = [path for path in targets if path not in self.manifest]
+            self.paths_to_scan = unknown + untracked
+
+        logger.info(
+            f"Кеш блобов: {hits} из {len(self.manifest)} файлов уже известны, "
+            f"используется кеш: {bool(self.cached)}"
+        )
+
+    def _lookup(self, shas):
+        cached = {}
+        shas = list(shas)
+        for i in range(0, len(shas), self.LOOKUP_CHUNK):
+            rows = BlobScanCache.objects.filter(
+                engine=self.engine, blob_sha__in=shas[i : i + self.LOOKUP_CHUNK]
+            ).values_list("blob_sha", "findings")
+            cached.update(rows)
+        return cached
+
+    def cached_results(self, scan_request):
+        """Несохраненные ScanResult для файлов, чьи блобы уже есть в кеше"""
+        for path, sha in self.manifest.items():
+            for entry in self.cached.get(sha, ()):
+                yield ScanResult(
+                    scan_request=scan_request,
+                    status=True,
+                    file_path=path,
+                    bug_type="SECRETS",
+                    **entry,
+                )
+
+    def commit(self, scan_request, exclude_paths=()):
+        """
+        Сохраняет в кеш находки (в том числе пустые) по отсканированным блобам.
+        Находки читаются из уже записанных ScanResult сканирования порциями по
+        LOOKUP_CHUNK файлов, чтобы память не росла с числом находок.
+        exclude_paths - файлы, которые не удалось отсканировать.
+        """
+        if not self.enabled:
+            return
+
+        scanned = (
+            self.manifest
+            if self.paths_to_scan is None
+            else {p: self.manifest[p] for p in self.paths_to_scan if p in self.manifest}
+        )
+        pending = [
+            (path, sha)
+            for path, sha in scanned.items()
+            if path not in exclude_paths and sha not in self.cached
+        ]
+
+        added = 0
+        seen = set()
+        for i in range(0, len(pending), self.LOOKUP_CHUNK):
+            chunk = dict(pending[i : i + self.LOOKUP_CHUNK])
+            findings = defaultdict(list)
+            rows = (
+                ScanResult.objects.filter(
+                    scan_request=scan_request,
+                    bug_type="SECRETS",
+                    status=True,
+                    file_path__in=list(chunk),
+                )
+                .order_by("id")
+                .values_list("file_path", *CACHED_FIELDS)
+            )
+            for path, *values in rows.iterator():
+                findings[path].append(dict(zip(CACHED_FIELDS, values)))
+
+            entries = []
+            for path, sha in chunk.items():
+                if sha in seen:
+                    continue
+                seen.add(sha)
+                entries.append(
+                    BlobScanCache(
+                        blob_sha=sha, engine=self.engine, findings=findings[path]
+                    )
+                )
+            BlobScanCache.objects.bulk_create(
+                entries,
+                batch_size=settings.SCAN_RESULTS_BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            added += len(entries)
+        logger.info(f"В кеш блобов добавлено {added} записей")
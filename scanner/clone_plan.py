@@ -0,0 +1,78 @@
+import requests
+from django.conf import settings
+
+from .github_client import GitHubAPIError, get_github_client, parse_github_repo
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Стратегии получения рабочей копии, от самой дешевой для повторных сканирований
+MIRROR = "mirror"  # worktree из локального bare-зеркала (RepositoryMirrorCache)
+SHALLOW = "shallow"  # git clone --depth=1 --single-branch
+PARTIAL = "partial"  # git clone --filter=blob:none + sparse checkout
+TARBALL = "tarball"  # потоковый ZIP-архив без git-метаданных
+REFUSE = "refuse"  # репозиторий больше лимита, скачивание не начинается
+
+
+class ClonePlan:
+    """
+    Выбранный способ скачивания репозитория.
+
+    size_kb, branch и archived берутся из метаданных GitHub API (размер
+    в килобайтах, как его отдает API); без метаданных они равны None/False.
+    """
+
+    def __init__(self, strategy, branch=None, size_kb=None, archived=False, reason=""):
+        self.strategy = strategy
+        self.branch = branch
+        self.size_kb = size_kb
+        self.archived = archived
+        self.reason = reason
+
+    @property
+    def refused(self):
+        return self.strategy == REFUSE
+
+    def __str__(self):
+        size = f"{self.size_kb / 1024:.1f} МБ" if self.size_kb is not None else "?"
+        return f"{self.strategy} (ветка: {self.branch or 'HEAD'}, размер: {size}): {self.reason}"
+
+
+def plan_clone(repo_url, include_history=False):
+    """
+    Выбирает стратегию скачивания по метаданным репозитория (кешируются
+    клиентом GitHub по ETag). Если метаданные недоступны - поверхностный
+    клон или зеркало, как раньше.
+    """
+    parsed = parse_github_repo(repo_url)
+    metadata = None
+    if parsed:
+        try:
+            metadata = get_github_client().get_repository(*parsed)
+        except (GitHubAPIError, requests.RequestException, ValueError) as e:
+            logger.info(f"Метаданные для планирования недоступны: {e}")
+
+    fallback = MIRROR if settings.REPO_CACHE_ENABLED else SHALLOW
+    if not metadata:
+        return ClonePlan(fallback, reason="метаданные недоступны")
+
+    size_mb = metadata.get("size", 0) / 1024
+    plan = dict(
+        branch=metadata.get("default_branch"),
+        size_kb=metadata.get("size"),
+        archived=bool(metadata.get("archived")),
+    )
+
+    if size_mb > settings.REPO_MAX_SIZE_MB:
+        return ClonePlan(
+            REFUSE,
+            reason=f"размер больше лимита {settings.REPO_MAX_SIZE_MB} МБ",
+            **plan,
+        )
+    if size_mb >= settings.REPO_PARTIAL_CLONE_MIN_MB:
+        # Большой репозиторий: блобы докачиваются только для нужных файлов
+        return ClonePlan(PARTIAL, reason="большой репозиторий", **plan)
+    if plan["archived"] and not include_history:
+        # Архивный репозиторий не меняется - зеркало и история не нужны
+        return ClonePlan(TARBALL, reason="архивный репозиторий", **plan)
+    return ClonePlan(fallback, reason="небольшой репозиторий", **plan)
@@ -0,0 +1,208 @@
+import json
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+from bisect import bisect_right
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXACT_VERSION_RE = re.compile(r"^v?\d+(?:\.\d+)*(?:[-+][0-9A-Za-z.-]+)?$")
+REQUIREMENT_RE = re.compile(
+    r"^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*===?\s*([^\s;,#]+)"
+)
+GRADLE_STRING_RE = re.compile(
+    r"""\b\w+\s*\(?\s*['"]([^:'"\s]+):([^:'"\s]+):([^:'"@\s]+)[^'"]*['"]"""
+)
+GRADLE_MAP_RE = re.compile(
+    r"""group\s*:\s*['"]([^'"]+)['"]\s*,\s*name\s*:\s*['"]([^'"]+)['"]\s*,"""
+    r"""\s*version\s*:\s*['"]([^'"]+)['"]"""
+)
+LOCK_PACKAGE_RE = re.compile(r'^\s*"((?:[^"]*/)?node_modules/[^"]+)"\s*:\s*\{', re.M)
+
+
+class Dependency:
+    __slots__ = ("ecosystem", "name", "version", "file_path", "line")
+
+    def __init__(self, ecosystem, name, version, file_path, line=1):
+        self.ecosystem = ecosystem
+        self.name = name
+        self.version = version
+        self.file_path = file_path
+        self.line = line
+
+
+class LineIndex:
+    """Номер строки по смещению в тексте за O(log n)"""
+
+    def __init__(self, text):
+        self.newlines = [match.start() for match in re.finditer("\n", text)]
+
+    def line(self, offset):
+        return bisect_right(self.newlines, offset - 1) + 1 if offset >= 0 else 1
+
+
+def _exact_version(spec):
+    spec = spec.strip().lstrip("=")
+    return spec.lstrip("v") if EXACT_VERSION_RE.match(spec) else None
+
+
+def parse_requirements(text):
+    """Только закрепленные версии (==, ===) - диапазон нельзя сопоставить с уязвимостью"""
+    for number, line in enumerate(text.splitlines(), 1):
+        match = REQUIREMENT_RE.match(line.strip())
+        if match:
+            yield match.group(1), match.group(2), number
+
+
+def parse_package_json(text):
+    data = json.loads(text)
+    lines = LineIndex(text)
+    for section in ("dependencies", "devDependencies", "optionalDependencies"):
+        for name, spec in (data.get(section) or {}).items():
+            version = _exact_version(spec) if isinstance(spec, str) else None
+            if version:
+                yield name, version, lines.line(text.find(f'"{name}"'))
+
+
+def parse_package_lock(text):
+    data = json.loads(text)
+    packages = data.get("packages")
+    if packages:
+        # lockfileVersion 2/3: строки ключей находятся одним проходом
+        lines = LineIndex(text)
+        offsets = {m.group(1): m.start(1) for m in LOCK_PACKAGE_RE.finditer(text)}
+        for path, info in packages.items():
+            if not path or info.get("link") or not info.get("version"):
+                continue
+            name = info.get("name") or path.rsplit("node_modules/", 1)[-1]
+            yield name, info["version"], lines.line(offsets.get(path, -1))
+        return
+
+    # lockfileVersion 1: вложенные dependencies
+    stack = [data.get("dependencies") or {}]
+    while stack:
+        for name, info in stack.pop().items():
+            if info.get("version"):
+                yield name, info["version"], 1
+            if info.get("dependencies"):
+                stack.append(info["dependencies"])
+
+
+def parse_pom(text):
+    root = ElementTree.fromstring(text)
+    for element in root.iter():
+        # Пространство имен POM не нужно для поиска по тегам
+        element.tag = element.tag.split("}", 1)[-1]
+
+    properties = {
+        child.tag: (child.text or "").strip() for child in root.findall("properties/*")
+    }
+    project_version = root.findtext("version") or root.findtext("parent/version")
+    if project_version:
+        properties.setdefault("project.version", project_version.strip())
+
+    lines = LineIndex(text)
+    for dependency in root.iter("dependency"):
+        group = (dependency.findtext("groupId") or "").strip()
+        artifact = (dependency.findtext("artifactId") or "").strip()
+        version = (dependency.findtext("version") or "").strip()
+        version = re.sub(
+            r"\$\{([^}]+)\}", lambda m: properties.get(m.group(1), m.group(0)), version
+        )
+        if group and artifact and version and "${" not in version:
+            offset = text.find(f"<artifactId>{artifact}</artifactId>")
+            yield f"{group}:{artifact}", _range_floor(version), lines.line(offset)
+
+
+def _range_floor(version):
+    # Maven допускает диапазоны вида [1.2,2.0) - берется нижняя граница
+    return version.strip("[(").split(",")[0].strip() if version[0] in "[(" else version
+
+
+def parse_gradle(text):
+    for number, line in enumerate(text.splitlines(), 1):
+        for pattern in (GRADLE_STRING_RE, GRADLE_MAP_RE):
+            for group, artifact, version in pattern.findall(line):
+                if "$" not in version and "+" not in version:
+                    yield f"{group}:{artifact}", version, number
+
+
+def parse_composer_json(text):
+    data = json.loads(text)
+    lines = LineIndex(text)
+    for section in ("require", "require-dev"):
+        for name, spec in (data.get(section) or {}).items():
+            if "/" not in name:
+                # php и расширения ext-* не являются пакетами Packagist
+                continue
+            version = _exact_version(spec) if isinstance(spec, str) else None
+            if version:
+                yield name, version, lines.line(text.find(f'"{name}"'))
+
+
+MANIFEST_PARSERS = {
+    "requirements.txt": ("PyPI", parse_requirements),
+    "package.json": ("npm", parse_package_json),
+    "package-lock.json": ("npm", parse_package_lock),
+    "pom.xml": ("Maven", parse_pom),
+    "build.gradle": ("Maven", parse_gradle),
+    "composer.json": ("Packagist", parse_composer_json),
+}
+
+
+def manifest_parser(filename):
+    """(экосистема, парсер) для файла зависимостей или None"""
+    if filename.startswith("requirements") and filename.endswith(".txt"):
+        return MANIFEST_PARSERS["requirements.txt"]
+    return MANIFEST_PARSERS.get(filename)
+
+
+def find_manifests(file_manifest):
+    """
+    Относительные пути файлов зависимостей из манифеста рабочей копии
+    (walker.FileManifest), без скрытых и вендорных каталогов
+    """
+    return [
+        entry.path
+        for entry in file_manifest.files(include_hidden=False, include_vendored=False)
+        if entry.manifest
+    ]
+
+
+def collect_dependencies(repo_path, manifests):
+    """
+    Разбирает файлы зависимостей. Если рядом с package.json лежит
+    package-lock.json, берутся точные версии из lock-файла.
+    Возвращает (зависимости, ошибки разбора {путь: текст ошибки}).
+    """
+    manifest_set = set(manifests)
+    dependencies = []
+    errors = {}
+    for path in manifests:
+        directory, name = os.path.split(path)
+        if (
+            name == "package.json"
+            and os.path.join(directory, "package-lock.json") in manifest_set
+        ):
+            continue
+
+        ecosystem, parser = manifest_parser(name)
+        try:
+            with open(
+                os.path.join(repo_path, path), encoding="utf-8", errors="replace"
+            ) as f:
+                text = f.read()
+            for package, version, line in parser(text):
+                dependencies.append(Dependency(ecosystem, package, version, path, line))
+        except (
+            ValueError,
+            TypeError,
+            AttributeError,
+            ElementTree.ParseError,
+            OSError,
+        ) as e:
+            logger.warning(f"Не удалось разобрать {path}: {e}")
+            errors[path] = str(e)[:500]
+    return dependencies, errors
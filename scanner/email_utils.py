@@ -1,136 +1,241 @@
+import tempfile
+
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
+from django.db.models import Q, Sum
+from django.urls import reverse
 import logging
 
+from .export import encode, iter_csv, iter_results
+from .models import Notification
+
 logger = logging.getLogger(__name__)
 
+CONFIDENCE_BADGES = {
+    "high": " ВЫСОКАЯ",
+    "medium": " СРЕДНЯЯ",
+    "low": " НИЗКАЯ",
+}
+
+# Сжатый отчет до этого размера собирается в памяти, больше - во временном файле
+REPORT_SPOOL_BYTES = 1024 * 1024
+
+SIGNATURE = """
+С уважением,
+Сервис анализа безопасности GitHub репозиториев
+"""
+
 
 class EmailNotifier:
+    """
+    Уведомления о сканированиях. Методы send_* только ставят письмо в
+    очередь (Notification); собирает и отправляет его NotificationOutbox.
+    """
+
+    @staticmethod
+    def _enqueue(scan_request, kind, recipient, error_message=None):
+        if not recipient:
+            logger.warning(
+                f"Нет адреса для уведомления {kind} по сканированию {scan_request.id}"
+            )
+            return None
+        return Notification.objects.create(
+            scan_request=scan_request,
+            kind=kind,
+            recipient=recipient,
+            error_message=error_message,
+        )
+
     @staticmethod
-    def send_scan_results_email(
-        user_email, user_name, repository_url, scan_results, scan_request_id
-    ):
+    def send_scan_completion_notification(scan_request):
         """
-        Отправляет email с результатами сканирования
+        Ставит в очередь уведомление о завершении сканирования
         """
         try:
-            # Подготавливаем данные для письма
-            context = {
-                "user_name": user_name,
-                "repository_url": repository_url,
-                "scan_results": scan_results,
-                "scan_request_id": scan_request_id,
-                "total_findings": len(scan_results),
-                "high_confidence_findings": len(
-                    [r for r in scan_results if r.confidence == "high"]
-                ),
-                "secrets_found": len(
-                    [r for r in scan_results if r.bug_type == "SECRETS"]
-                ),
-                "dependencies_found": len(
-                    [r for r in scan_results if r.bug_type == "DEPENDENCIES"]
-                ),
-            }
-
-            subject = f" Отчет о сканировании репозитория #{scan_request_id}"
-
-            text_message = f"""
+            EmailNotifier._enqueue(scan_request, "COMPLETED", scan_request.user.email)
+
+            # Дополнительно можно отправлять уведомление администратору
+            if hasattr(settings, "ADMIN_EMAIL") and settings.ADMIN_EMAIL:
+                EmailNotifier._enqueue(scan_request, "ADMIN", settings.ADMIN_EMAIL)
+
+        except Exception as e:
+            logger.error(
+                f"Ошибка при постановке уведомления о завершении сканирования: {e}"
+            )
+
+    @staticmethod
+    def send_scan_error_notification(scan_request, error_message):
+        """
+        Ставит в очередь уведомление об ошибке сканирования
+        """
+        try:
+            EmailNotifier._enqueue(
+                scan_request,
+                "ERROR",
+                scan_request.user.email,
+                error_message=str(error_message),
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при постановке уведомления об ошибке: {e}")
+
+    @staticmethod
+    def build_message(notification, connection=None):
+        """Письмо для уведомления из очереди"""
+        builders = {
+            "COMPLETED": EmailNotifier.build_scan_results_email,
+            "ERROR": EmailNotifier.build_error_email,
+            "ADMIN": EmailNotifier.build_admin_email,
+        }
+        message = builders[notification.kind](notification)
+        message.connection = connection
+        return message
+
+    @staticmethod
+    def _summary_counts(scan_request):
+        """Счетчики отчета одним агрегирующим запросом к ScanResultSummary"""
+        found = Q(status=True)
+        counts = scan_request.result_summary.aggregate(
+            rows=Sum("count"),
+            total=Sum("count", filter=found),
+            high=Sum("count", filter=found & Q(confidence="high")),
+            secrets=Sum("count", filter=found & Q(bug_type="SECRETS")),
+            dependencies=Sum("count", filter=found & Q(bug_type="DEPENDENCIES")),
+        )
+        return {key: value or 0 for key, value in counts.items()}
+
+    @staticmethod
+    def build_scan_results_email(notification):
+        """
+        Отчет о сканировании: счетчики, первые NOTIFICATION_INLINE_RESULTS
+        записей в тексте письма и полный отчет в сжатом CSV, если записей больше.
+        Отчет больше NOTIFICATION_ATTACHMENT_MAX_BYTES заменяется ссылкой.
+        """
+        scan_request = notification.scan_request
+        user_name = scan_request.user.username
+        counts = EmailNotifier._summary_counts(scan_request)
+        inline_limit = settings.NOTIFICATION_INLINE_RESULTS
+
+        lines = [f"""
 Здравствуйте, {user_name}!
 
 Отчет о сканировании репозитория готов.
 
-Репозиторий: {repository_url}
-ID сканирования: #{scan_request_id}
+Репозиторий: {scan_request.repository_url}
+ID сканирования: #{scan_request.id}
 
 Общие результаты:
-- Всего находок: {context["total_findings"]}
-- С высокой уверенностью: {context["high_confidence_findings"]}
-- Секреты: {context["secrets_found"]}
-- Зависимости: {context["dependencies_found"]}
+- Всего находок: {counts["total"]}
+- С высокой уверенностью: {counts["high"]}
+- Секреты: {counts["secrets"]}
+- Зависимости: {counts["dependencies"]}
 
 Детали найденных уязвимостей:
-
-"""
-
-            for i, result in enumerate(scan_results, 1):
-                status = "Найдено" if result.status else " Не найдено"
-                confidence_badge = {
-                    "high": " ВЫСОКАЯ",
-                    "medium": " СРЕДНЯЯ",
-                    "low": " НИЗКАЯ",
-                }.get(result.confidence, "⚪ НЕИЗВЕСТНО")
-
-                text_message += f"""
+"""]
+
+        # Сначала находки, затем системные записи
+        results = scan_request.scan_results.only(
+            "scan_request",
+            "status",
+            "file_path",
+            "str_number",
+            "bug_type",
+            "confidence",
+            "description",
+        ).order_by("-status", "id")[:inline_limit]
+        for i, result in enumerate(results, 1):
+            status = "Найдено" if result.status else " Не найдено"
+            lines.append(f"""
 {i}. {status}
    Файл: {result.file_path}
    Строка: {result.str_number}
    Тип: {result.get_bug_type_display()}
-   Уверенность: {confidence_badge}
+   Уверенность: {CONFIDENCE_BADGES.get(result.confidence, "⚪ НЕИЗВЕСТНО")}
    Описание: {result.description or "Нет описания"}
-
-"""
-
-            text_message += """
-С уважением,
-Сервис анализа безопасности GitHub репозиториев
-
-Примечание: Это автоматическое уведомление. Пожалуйста, не отвечайте на это письмо.
-"""
-
-            # Отправляем email
-            send_mail(
-                subject=subject,
-                message=text_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user_email],
-                fail_silently=False,
-            )
-
-            logger.info(
-                f"Email уведомление отправлено пользователю {user_email} для сканирования {scan_request_id}"
-            )
-            return True
-
-        except Exception as e:
-            logger.error(f"Ошибка при отправке email уведомления: {e}")
-            return False
+""")
+
+        report = None
+        if counts["rows"] > inline_limit:
+            report = EmailNotifier._build_report(scan_request)
+            lines.append(f"\nПоказано {inline_limit} из {counts['rows']} записей. ")
+            if report is not None:
+                lines.append("Полный отчет - во вложении (CSV, gzip).\n")
+            else:
+                lines.append(EmailNotifier._report_link_text(scan_request))
+        lines.append(SIGNATURE)
+        lines.append(
+            "\nПримечание: Это автоматическое уведомление. "
+            "Пожалуйста, не отвечайте на это письмо.\n"
+        )
+
+        message = EmailMessage(
+            subject=f" Отчет о сканировании репозитория #{scan_request.id}",
+            body="".join(lines),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[notification.recipient],
+        )
+        if report is not None:
+            with report:
+                message.attach(
+                    f"scan_results_{scan_request.id}.csv.gz",
+                    report.read(),
+                    "application/gzip",
+                )
+        return message
 
     @staticmethod
-    def send_scan_completion_notification(scan_request):
+    def _build_report(scan_request):
         """
-        Отправляет уведомление о завершении сканирования
+        Полный отчет (CSV, gzip) потоком во временный файл: находки читаются
+        курсором, сжатые блоки пишутся по мере готовности. Возвращает файл,
+        открытый с начала, или None, если отчет больше
+        NOTIFICATION_ATTACHMENT_MAX_BYTES.
         """
+        limit = settings.NOTIFICATION_ATTACHMENT_MAX_BYTES
+        chunks = encode(
+            iter_csv(iter_results(scan_request.scan_results.all())), compress=True
+        )
+        report = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_BYTES)
+        size = 0
         try:
-            user = scan_request.user
-            scan_results = scan_request.scan_results.all()
-
-            # Отправляем email пользователю
-            EmailNotifier.send_scan_results_email(
-                user_email=user.email,
-                user_name=user.username,
-                repository_url=scan_request.repository_url,
-                scan_results=scan_results,
-                scan_request_id=scan_request.id,
-            )
-
-            # Дополнительно можно отправлять уведомление администратору
-            if hasattr(settings, "ADMIN_EMAIL") and settings.ADMIN_EMAIL:
-                EmailNotifier._send_admin_notification(scan_request, scan_results)
+            for chunk in chunks:
+                size += len(chunk)
+                if size > limit:
+                    report.close()
+                    logger.warning(
+                        f"Отчет сканирования {scan_request.id} больше {limit} байт "
+                        "и не будет приложен к письму"
+                    )
+                    return None
+                report.write(chunk)
+        except Exception:
+            report.close()
+            raise
+        finally:
+            # Курсор выгрузки закрывается сразу и при досрочном выходе
+            chunks.close()
+        report.seek(0)
+        return report
 
-        except Exception as e:
-            logger.error(
-                f"Ошибка при отправке уведомления о завершении сканирования: {e}"
+    @staticmethod
+    def _report_link_text(scan_request):
+        """Текст вместо вложения: ссылка на выгрузку, если задан SITE_URL"""
+        limit_mb = settings.NOTIFICATION_ATTACHMENT_MAX_BYTES / (1024 * 1024)
+        text = f"Полный отчет больше {limit_mb:g} МБ и не приложен к письму. "
+        if not settings.SITE_URL:
+            return (
+                text
+                + f"Его можно выгрузить на странице сканирования #{scan_request.id}.\n"
             )
+        url = settings.SITE_URL.rstrip("/") + reverse(
+            "export_scan_results", args=[scan_request.id, "csv"]
+        )
+        return text + f"Выгрузка: {url}?gzip=1\n"
 
     @staticmethod
-    def _send_admin_notification(scan_request, scan_results):
-        """
-        Отправляет уведомление администратору
-        """
-        try:
-            subject = f" Сканирование #{scan_request.id} завершено"
-
-            message = f"""
+    def build_admin_email(notification):
+        scan_request = notification.scan_request
+        counts = EmailNotifier._summary_counts(scan_request)
+        body = f"""
 Администратору,
 
 Сканирование репозитория завершено.
@@ -141,35 +246,21 @@ ID сканирования: #{scan_request_id}
 - ID сканирования: #{scan_request.id}
 - Тип сканирования: {scan_request.get_scan_type_display()}
 - Глубина: {scan_request.get_scan_depth_display()}
-- Найдено уязвимостей: {len(scan_results)}
+- Найдено уязвимостей: {counts["total"]}
 
 Время: {scan_request.updated_at.strftime("%Y-%m-%d %H:%M:%S")}
 """
-
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[settings.ADMIN_EMAIL],
-                fail_silently=True,
-            )
-
-            logger.info(
-                f"Уведомление администратору отправлено для сканирования {scan_request.id}"
-            )
-
-        except Exception as e:
-            logger.error(f"Ошибка при отправке уведомления администратору: {e}")
+        return EmailMessage(
+            subject=f" Сканирование #{scan_request.id} завершено",
+            body=body,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[notification.recipient],
+        )
 
     @staticmethod
-    def send_scan_error_notification(scan_request, error_message):
-        """
-        Отправляет уведомление об ошибке сканирования
-        """
-        try:
-            subject = f" Ошибка сканирования репозитория #{scan_request.id}"
-
-            message = f"""
+    def build_error_email(notification):
+        scan_request = notification.scan_request
+        body = f"""
 Здравствуйте, {scan_request.user.username}!
 
 К сожалению, при сканировании вашего репозитория произошла ошибка.
@@ -177,25 +268,13 @@ ID сканирования: #{scan_request_id}
 Репозиторий: {scan_request.repository_url}
 ID сканирования: #{scan_request.id}
 
-Ошибка: {error_message}
+Ошибка: {notification.error_message}
 
 Пожалуйста, попробуйте запустить сканирование еще раз или обратитесь в поддержку.
-
-С уважением,
-Сервис анализа безопасности GitHub репозиториев
-"""
-
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[scan_request.user.email],
-                fail_silently=False,
-            )
-
-            logger.info(
-                f"Уведомление об ошибке отправлено пользователю {scan_request.user.email}"
-            )
-
-        except Exception as e:
-            logger.error(f"Ошибка при отправке уведомления об ошибке: {e}")
+{SIGNATURE}"""
+        return EmailMessage(
+            subject=f" Ошибка сканирования репозитория #{scan_request.id}",
+            body=body,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[notification.recipient],
+        )
@@ -0,0 +1,155 @@
+import os
+import shutil
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ScanWorkerEngines
+from .trufflehog import parse_version, probe_capabilities, run_help
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ToolInfo:
+    """Сведения о внешней утилите без специфичных возможностей"""
+
+    def __init__(self, path, version, sources=()):
+        self.path = path
+        self.version = version
+        self.sources = list(sources)
+
+    def as_dict(self):
+        return {"path": self.path, "version": self.version, "sources": self.sources}
+
+
+def probe_git(path):
+    return ToolInfo(path, parse_version(run_help([path, "--version"])))
+
+
+def probe_native(path):
+    """Встроенный движок доступен, если установлен пакет truffleHogRegexes"""
+    try:
+        import truffleHogRegexes
+    except ImportError:
+        return None
+
+    from .native_engine import ENGINE_VERSION
+
+    return ToolInfo(truffleHogRegexes.__file__, ENGINE_VERSION, ["filesystem"])
+
+
+class ScanEngineRegistry:
+    """
+    Реестр внешних движков сканирования.
+
+    Каждый инструмент определяется один раз на процесс и повторно - только
+    при смене бинарника (другой путь или mtime). Результат пробы должен
+    иметь атрибуты path, version, sources и метод as_dict().
+    Движки без бинарника (binary_setting=None) пробуются один раз.
+    """
+
+    _engines = {}
+    _cache = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def register(cls, name, binary_setting, probe):
+        cls._engines[name] = (binary_setting, probe)
+
+    @classmethod
+    def get(cls, name):
+        """Возвращает результат пробы движка или None, если он не установлен"""
+        binary_setting, probe = cls._engines[name]
+        if binary_setting is None:
+            path = key = None
+        else:
+            path = shutil.which(getattr(settings, binary_setting))
+            if not path:
+                return None
+
+            try:
+                key = (path, os.stat(path).st_mtime)
+            except OSError:
+                return None
+
+        with cls._lock:
+            cached = cls._cache.get(name)
+            if cached is None or cached[0] != key:
+                logger.info(f"Определение движка {name}: {path or 'встроенный'}")
+                cached = (key, probe(path))
+                cls._cache[name] = cached
+        return cached[1]
+
+    @classmethod
+    def find(cls, source):
+        """Имя первого доступного движка, поддерживающего источник source"""
+        for name in cls._engines:
+            info = cls.get(name)
+            if info is not None and source in info.sources:
+                return name
+        return None
+
+    @classmethod
+    def cache_key(cls, name):
+        """Идентификатор движка и его версии для кеша находок"""
+        info = cls.get(name)
+        return f"{name} {info.version}" if info is not None else None
+
+    @classmethod
+    def supported_scan_types(cls):
+        """Типы сканирований, которые может выполнить текущий процесс"""
+        # Без базы OSV сканирование зависимостей только перечисляет манифесты
+        scan_types = ["DEPENDENCIES"]
+        if cls.find("filesystem") or cls.find("git"):
+            scan_types.append("SECRETS")
+        return scan_types
+
+    @classmethod
+    def describe(cls):
+        engines = {}
+        for name in cls._engines:
+            info = cls.get(name)
+            engines[name] = (
+                {"available": True, **info.as_dict()}
+                if info is not None
+                else {"available": False}
+            )
+        return engines
+
+    @classmethod
+    def report(cls, worker_id):
+        """
+        Сохраняет возможности движков процесса воркера (см. workers())
+        и удаляет записи остановленных воркеров.
+        """
+        ScanWorkerEngines.objects.update_or_create(
+            worker_id=worker_id,
+            defaults={
+                "engines": cls.describe(),
+                "scan_types": cls.supported_scan_types(),
+            },
+        )
+        ScanWorkerEngines.objects.filter(updated_at__lt=cls._deadline()).delete()
+
+    @staticmethod
+    def _deadline(stale_timeout=None):
+        if stale_timeout is None:
+            stale_timeout = settings.SCAN_STALE_TIMEOUT
+        return timezone.now() - timedelta(seconds=stale_timeout)
+
+    @classmethod
+    def workers(cls, stale_timeout=None):
+        """Воркеры, присылавшие сведения о движках за последние stale_timeout секунд"""
+        return list(
+            ScanWorkerEngines.objects.filter(
+                updated_at__gte=cls._deadline(stale_timeout)
+            ).order_by("worker_id")
+        )
+
+
+ScanEngineRegistry.register("trufflehog", "TRUFFLEHOG_BINARY", probe_capabilities)
+ScanEngineRegistry.register("git", "GIT_BINARY", probe_git)
+ScanEngineRegistry.register("native", None, probe_native)
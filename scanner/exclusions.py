@@ -0,0 +1,335 @@
+import os
+import re
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .native_engine import BINARY_SNIFF_BYTES, is_binary
+from .walker import FileManifest
+import logging
+
+logger = logging.getLogger(__name__)
+
+IGNORE_FILES = (".gitignore", ".osintignore")
+
+# Причины исключения файла
+PATTERN = "pattern"
+BINARY = "binary"
+SIZE = "size"
+
+
+def _glob_to_regex(glob):
+    """Шаблон .gitignore (без ! и завершающего /) -> регулярное выражение"""
+    anchored = "/" in glob
+    glob = glob.lstrip("/")
+    parts = []
+    i = 0
+    while i < len(glob):
+        char = glob[i]
+        if glob.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if glob.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[" and "]" in glob[i + 1 :]:
+            end = glob.index("]", i + 1)
+            body = glob[i + 1 : end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append(f"[{body}]")
+            i = end + 1
+            continue
+        else:
+            parts.append(re.escape(char))
+        i += 1
+
+    # Шаблон без / в начале или середине совпадает на любой глубине
+    prefix = "" if anchored else "(?:.*/)?"
+    return prefix + "".join(parts)
+
+
+class IgnoreRules:
+    """
+    Правила в синтаксисе .gitignore (поддерживаются #, !, ведущий и
+    завершающий /, *, **, ?, [...]). Побеждает последнее совпавшее правило;
+    файл в исключенном каталоге вернуть через ! нельзя, как и в git.
+    Исключение - защищенные файлы (protect()): к ним применяются только
+    правила, добавленные после protect(), в том числе правила каталогов.
+    """
+
+    def __init__(self):
+        # Подряд идущие правила с одинаковыми (negate, base) склеиваются
+        # в одно регулярное выражение: [negate, base, для файлов, для каталогов]
+        self._groups = []
+        self._compiled = None
+        self._dirs = {"": False}
+        self._protected = None
+        self._overrides = None
+
+    def protect(self, patterns):
+        """
+        Файлы по шаблонам patterns не скрываются уже добавленными правилами,
+        даже если исключен их каталог; последующие правила действуют как обычно.
+        """
+        patterns = [pattern.strip().rstrip("/") for pattern in patterns]
+        patterns = [pattern for pattern in patterns if pattern]
+        if patterns:
+            self._protected = re.compile(
+                "|".join(f"(?:{_glob_to_regex(pattern)})" for pattern in patterns)
+            )
+            self._overrides = IgnoreRules()
+        return self
+
+    def add(self, lines, base=""):
+        """Добавляет строки правил; base - каталог файла правил относительно корня"""
+        lines = list(lines)
+        if self._overrides is not None:
+            self._overrides.add(lines, base)
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate or line.startswith("\\"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            pattern = _glob_to_regex(line)
+
+            if self._groups and self._groups[-1][:2] == [negate, base]:
+                group = self._groups[-1]
+            else:
+                group = [negate, base, [], []]
+                self._groups.append(group)
+            if not dir_only:
+                group[2].append(pattern)
+            group[3].append(pattern)
+        self._compiled = None
+        self._dirs = {"": False}
+        return self
+
+    def _compile(self):
+        def combine(patterns):
+            if not patterns:
+                return None
+            return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+
+        self._compiled = [
+            (negate, base, combine(files), combine(dirs))
+            for negate, base, files, dirs in reversed(self._groups)
+        ]
+
+    def _last_match(self, path, is_dir):
+        """True - исключить, False - включить, None - ни одно правило не совпало"""
+        if self._compiled is None:
+            self._compile()
+        for negate, base, files, dirs in self._compiled:
+            if base:
+                if not path.startswith(base + "/"):
+                    continue
+                relative = path[len(base) + 1 :]
+            else:
+                relative = path
+            regex = dirs if is_dir else files
+            if regex is not None and regex.fullmatch(relative):
+                return not negate
+        return None
+
+    def directory_excluded(self, directory):
+        excluded = self._dirs.get(directory)
+        if excluded is None:
+            excluded = self.directory_excluded(os.path.dirname(directory)) or bool(
+                self._last_match(directory, is_dir=True)
+            )
+            self._dirs[directory] = excluded
+        return excluded
+
+    def excluded(self, path):
+        if self._protected is not None and self._protected.fullmatch(path):
+            return self._overrides.excluded(path)
+        if self.directory_excluded(os.path.dirname(path)):
+            return True
+        return bool(self._last_match(path, is_dir=False))
+
+    def excluded_directories(self, keep=()):
+        """
+        Верхние исключенные каталоги среди уже проверенных; каталоги из keep
+        (с включенными файлами внутри) не исключаются целиком.
+        """
+        result = []
+        for directory, excluded in self._dirs.items():
+            if not excluded or directory in keep:
+                continue
+            parent = os.path.dirname(directory)
+            if not self._dirs.get(parent) or parent in keep:
+                result.append(directory)
+        return sorted(result)
+
+
+def _read_ignore_file(path):
+    try:
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            return handle.readlines()
+    except OSError as e:
+        logger.warning(f"Не удалось прочитать {path}: {e}")
+        return []
+
+
+def build_rules(manifest, extra_patterns=""):
+    """
+    Правила в порядке возрастания приоритета: SCAN_EXCLUDE_PATTERNS,
+    .gitignore репозитория, .osintignore и исключения из запроса.
+    Файлы по SCAN_EXCLUDE_PROTECTED_PATTERNS первые два источника не скрывают
+    даже через исключенный каталог (secrets/ в .gitignore не спрячет
+    secrets/.env); .osintignore и запрос исключают их как обычно.
+    """
+    ignore_files = {name: [] for name in IGNORE_FILES}
+    for entry in manifest.files():
+        name = os.path.basename(entry.path)
+        if name in ignore_files:
+            ignore_files[name].append(entry.path)
+
+    def add_files(rules, paths):
+        # Файлы правил из вложенных каталогов уточняют корневые
+        for path in sorted(paths, key=lambda path: (path.count("/"), path)):
+            base = os.path.dirname(path)
+            rules.add(_read_ignore_file(os.path.join(manifest.root, path)), base)
+
+    rules = IgnoreRules().add(settings.SCAN_EXCLUDE_PATTERNS)
+    if settings.SCAN_EXCLUDE_USE_GITIGNORE:
+        add_files(rules, ignore_files[".gitignore"])
+    rules.protect(settings.SCAN_EXCLUDE_PROTECTED_PATTERNS)
+    add_files(rules, ignore_files[".osintignore"])
+    rules.add((extra_patterns or "").splitlines())
+    return rules
+
+
+def _sniff_binary(path):
+    try:
+        with open(path, "rb") as handle:
+            return is_binary(handle.read(BINARY_SNIFF_BYTES))
+    except OSError:
+        return False
+
+
+class ScanExclusions:
+    """
+    Файлы рабочей копии, которые не нужно сканировать на секреты: по правилам
+    (build_rules), бинарные (по расширению или NUL-байту в начале файла) и
+    больше SCAN_EXCLUDE_MAX_FILE_BYTES.
+
+    Результат используется движками: included - список файлов для
+    встроенного движка и шардов TruffleHog, exclude_file() - файл для
+    trufflehog filesystem --exclude-paths при сканировании каталога целиком.
+    """
+
+    def __init__(self, manifest, excluded, excluded_directories=()):
+        self.manifest = manifest
+        self.excluded = excluded
+        self.excluded_directories = list(excluded_directories)
+
+    @classmethod
+    def build(cls, repo_path, extra_patterns="", max_bytes=None):
+        if max_bytes is None:
+            max_bytes = settings.SCAN_EXCLUDE_MAX_FILE_BYTES
+        manifest = FileManifest.for_path(repo_path)
+        rules = build_rules(manifest, extra_patterns)
+
+        excluded = {}
+        candidates = []
+        for entry in manifest.files():
+            if rules.excluded(entry.path):
+                excluded[entry.path] = PATTERN
+            elif entry.size > max_bytes:
+                excluded[entry.path] = SIZE
+            elif entry.binary:
+                excluded[entry.path] = BINARY
+            elif entry.size:
+                candidates.append(entry.path)
+
+        # Бинарные файлы с текстовым или без расширения - по первым байтам
+        full_paths = [os.path.join(manifest.root, path) for path in candidates]
+        with ThreadPoolExecutor(max_workers=settings.SCAN_WALK_WORKERS) as executor:
+            for path, binary in zip(
+                candidates, executor.map(_sniff_binary, full_paths, chunksize=64)
+            ):
+                if binary:
+                    excluded[path] = BINARY
+
+        # Каталог с защищенными файлами нельзя исключать целиком:
+        # остальные его файлы попадут в exclude_file() по одному
+        kept = set()
+        for entry in manifest.files():
+            if entry.path not in excluded:
+                parent = os.path.dirname(entry.path)
+                while parent and parent not in kept:
+                    kept.add(parent)
+                    parent = os.path.dirname(parent)
+
+        exclusions = cls(manifest, excluded, rules.excluded_directories(kept))
+        counts = Counter(excluded.values())
+        logger.info(
+            f"Исключено из сканирования: {len(excluded)} файлов, "
+            f"{exclusions.excluded_size() / (1024 * 1024):.1f} МБ "
+            f"(правила: {counts[PATTERN]}, бинарные: {counts[BINARY]}, "
+            f"большие: {counts[SIZE]})"
+        )
+        return exclusions
+
+    @property
+    def included(self):
+        return [
+            entry.path
+            for entry in self.manifest.files()
+            if entry.path not in self.excluded
+        ]
+
+    def filter(self, paths):
+        return [path for path in paths if path not in self.excluded]
+
+    def drop_results(self, results):
+        """Результаты (ScanResult) без находок в исключенных файлах"""
+        return (result for result in results if result.file_path not in self.excluded)
+
+    def excluded_size(self):
+        return sum(size for _, size in self.manifest.sizes(list(self.excluded)))
+
+    def included_size(self):
+        return self.manifest.total_size() - self.excluded_size()
+
+    def exclude_file(self):
+        """
+        Временный файл регулярных выражений для --exclude-paths (удаляет
+        вызывающий): исключенные каталоги целиком и отдельные файлы вне них.
+        Пути абсолютные - TruffleHog сравнивает их с путями от корня сканирования.
+        """
+        root = self.manifest.root
+        directories = set(self.excluded_directories)
+        lines = [
+            f"^{re.escape(os.path.join(root, directory))}/"
+            for directory in sorted(directories)
+        ]
+        for path in sorted(self.excluded):
+            parent = os.path.dirname(path)
+            while parent and parent not in directories:
+                parent = os.path.dirname(parent)
+            if not parent:
+                lines.append(f"^{re.escape(os.path.join(root, path))}$")
+
+        handle = tempfile.NamedTemporaryFile(
+            "w", prefix="trufflehog_exclude_", suffix=".txt", delete=False
+        )
+        with handle:
+            handle.write("\n".join(lines) + "\n")
+        return handle.name
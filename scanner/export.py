@@ -0,0 +1,180 @@
+import csv
+import json
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+SARIF_LEVELS = {"high": "error", "medium": "warning", "low": "note"}
+
+EXPORT_FIELDS = (
+    "id",
+    "status",
+    "bug_type",
+    "secret_type",
+    "confidence",
+    "file_path",
+    "str_number",
+    "commit_sha",
+    "author",
+    "description",
+    "error_message",
+)
+
+EXPORT_BUFFER_BYTES = 64 * 1024
+
+# Формат: (content type, расширение файла)
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "sarif": ("application/sarif+json", "sarif"),
+}
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: write возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def iter_results(queryset):
+    """Находки без raw_context, читаемые курсором пачками по SCAN_EXPORT_CHUNK_SIZE"""
+    return (
+        queryset.only("scan_request", *EXPORT_FIELDS)
+        .order_by("id")
+        .iterator(chunk_size=settings.SCAN_EXPORT_CHUNK_SIZE)
+    )
+
+
+def _row(result):
+    return {field: getattr(result, field) for field in EXPORT_FIELDS}
+
+
+def iter_csv(results):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for result in results:
+        yield writer.writerow([getattr(result, field) for field in EXPORT_FIELDS])
+
+
+def iter_ndjson(results):
+    for result in results:
+        yield json.dumps(_row(result), ensure_ascii=False) + "\n"
+
+
+def iter_sarif(scan_request, results, detectors=()):
+    """
+    SARIF 2.1.0 для CI. Документ пишется по частям: заголовок, находки
+    по одной, закрывающие скобки. Системные записи (status=False) не выгружаются.
+    """
+    run = {
+        "tool": {
+            "driver": {
+                "name": "github-osint-scanner",
+                "informationUri": scan_request.repository_url,
+                "rules": [{"id": detector, "name": detector} for detector in detectors],
+            }
+        },
+        "versionControlProvenance": [
+            {
+                "repositoryUri": scan_request.repository_url,
+                **(
+                    {"revisionId": scan_request.commit_sha}
+                    if scan_request.commit_sha
+                    else {}
+                ),
+            }
+        ],
+    }
+    header = json.dumps(
+        {"$schema": SARIF_SCHEMA, "version": "2.1.0", "runs": [run]},
+        ensure_ascii=False,
+    )
+    # Вставляем массив results перед закрытием объекта run
+    yield header[: -len("}]}")] + ', "results": ['
+
+    first = True
+    for result in results:
+        if not result.status:
+            continue
+        yield ("" if first else ",") + json.dumps(
+            _sarif_result(result), ensure_ascii=False
+        )
+        first = False
+    yield "]}]}\n"
+
+
+def _sarif_result(result):
+    location = {"artifactLocation": {"uri": result.file_path}}
+    if result.str_number > 0:
+        location["region"] = {"startLine": result.str_number}
+
+    sarif = {
+        "ruleId": result.secret_type or result.bug_type,
+        "level": SARIF_LEVELS.get(result.confidence, "warning"),
+        "message": {
+            "text": result.description
+            or f"{result.secret_type or result.bug_type}: {result.file_path}"
+        },
+        "locations": [{"physicalLocation": location}],
+    }
+    properties = {
+        key: value
+        for key, value in (("commit", result.commit_sha), ("author", result.author))
+        if value
+    }
+    if properties:
+        sarif["properties"] = properties
+    return sarif
+
+
+def _batched(chunks, size=EXPORT_BUFFER_BYTES):
+    """Склеивает мелкие куски (строка на находку) в блоки около size байт"""
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= size:
+            yield b"".join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def encode(chunks, compress=False):
+    """UTF-8, при compress - потоковое сжатие gzip без буферизации всего файла"""
+    if not compress:
+        yield from _batched(chunks)
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for data in _batched(chunks):
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def aiterate(chunks):
+    """
+    Асинхронная обертка для ответа под ASGI: каждый блок берется через
+    sync_to_async по одному. Синхронный итератор StreamingHttpResponse
+    под ASGI собирает целиком (sync_to_async(list)) до отправки первого байта.
+    Поток тот же, что у представления (thread_sensitive), - курсор базы
+    принадлежит его соединению.
+    """
+    done = object()
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await next_chunk(chunks, done)
+            if chunk is done:
+                return
+            yield chunk
+    finally:
+        # Клиент оборвал загрузку - курсор закрывается сразу, а не сборщиком мусора
+        await sync_to_async(chunks.close, thread_sensitive=True)()
@@ -1,11 +1,18 @@
 from django import forms
+from .engines import ScanEngineRegistry
 from .models import ScanRequest
 
 
 class ScanRequestForm(forms.ModelForm):
     class Meta:
         model = ScanRequest
-        fields = ["repository_url", "scan_depth", "include_history", "scan_type"]
+        fields = [
+            "repository_url",
+            "scan_depth",
+            "include_history",
+            "scan_type",
+            "exclude_patterns",
+        ]
         widgets = {
             "repository_url": forms.URLInput(
                 attrs={
@@ -16,10 +23,34 @@ class ScanRequestForm(forms.ModelForm):
             "scan_depth": forms.Select(attrs={"class": "form-control"}),
             "scan_type": forms.Select(attrs={"class": "form-control"}),
             "include_history": forms.CheckboxInput(attrs={"class": "form-check-input"}),
+            "exclude_patterns": forms.Textarea(
+                attrs={
+                    "class": "form-control font-monospace",
+                    "rows": 3,
+                    "placeholder": "docs/\n*.generated.js\n!dist/config.js",
+                }
+            ),
         }
         labels = {
             "repository_url": "URL репозитория",
             "scan_depth": "Глубина сканирования",
             "include_history": "Включить историю коммитов",
             "scan_type": "Тип сканирования",
+            "exclude_patterns": "Исключения",
         }
+        help_texts = {
+            "exclude_patterns": (
+                "Шаблоны в синтаксисе .gitignore, по одному на строку; "
+                "!шаблон возвращает файл в сканирование"
+            ),
+        }
+
+    def clean_scan_type(self):
+        scan_type = self.cleaned_data["scan_type"]
+        workers = ScanEngineRegistry.workers()
+        # Без запущенных воркеров запрос просто подождет в очереди
+        if workers and not any(scan_type in worker.scan_types for worker in workers):
+            raise forms.ValidationError(
+                "Ни один воркер сейчас не может выполнить этот тип сканирования"
+            )
+        return scan_type
@@ -0,0 +1,226 @@
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def parse_github_repo(repo_url):
+    """Извлекает (owner, repo) из URL GitHub или возвращает None"""
+    parts = repo_url.rstrip("/").split("/")
+    if "github.com" not in parts:
+        return None
+
+    github_index = parts.index("github.com")
+    if len(parts) < github_index + 3:
+        return None
+
+    owner = parts[github_index + 1]
+    repo_name = parts[github_index + 2].replace(".git", "")
+    return owner, repo_name
+
+
+class GitHubAPIError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RateLimitExceeded(GitHubAPIError):
+    """Лимит запросов GitHub API исчерпан до reset_at (unix time)"""
+
+    def __init__(self, reset_at, status_code=None):
+        super().__init__(
+            f"Лимит запросов GitHub API исчерпан до {time.ctime(reset_at)}",
+            status_code,
+        )
+        self.reset_at = reset_at
+
+
+class RateLimiter:
+    """
+    Корзина токенов, синхронизируемая с заголовками X-RateLimit-*.
+
+    Емкость - остаток лимита из последнего ответа, пополнение - в момент
+    X-RateLimit-Reset. Между ответами остаток уменьшается локально, чтобы
+    параллельные запросы не уходили заведомо сверх лимита. Пока лимит
+    неизвестен, уходит один запрос, остальные ждут его заголовков
+    (не дольше probe_timeout секунд).
+    """
+
+    def __init__(self, probe_timeout=30):
+        self.remaining = None
+        self.reset_at = 0
+        self.probe_timeout = probe_timeout
+        self._probing = False
+        self._lock = threading.Lock()
+        self._probed = threading.Condition(self._lock)
+
+    def acquire(self, max_wait=0):
+        """Забирает токен; ждет пополнения не дольше max_wait секунд"""
+        with self._lock:
+            while True:
+                now = time.time()
+                if self.remaining is not None and now < self.reset_at:
+                    break
+                if not self._probing:
+                    # Лимит неизвестен или уже обновился - узнаем из ответа
+                    self.remaining = None
+                    self._probing = True
+                    return
+                if not self._probed.wait(self.probe_timeout):
+                    # Первый запрос завис - следующий узнает лимит сам
+                    self._probing = False
+
+            if self.remaining > 0:
+                self.remaining -= 1
+                return
+            wait = self.reset_at - now
+            if wait > max_wait:
+                raise RateLimitExceeded(self.reset_at)
+
+        logger.info(f"Ожидание обновления лимита GitHub API: {wait:.0f} с")
+        time.sleep(wait)
+
+    def update(self, headers):
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        with self._lock:
+            if remaining is not None and reset is not None:
+                self.remaining = int(remaining)
+                self.reset_at = int(reset)
+            self._release()
+
+    def release(self):
+        """Запрос завершился без ответа: лимит узнает следующий запрос"""
+        with self._lock:
+            self._release()
+
+    def _release(self):
+        self._probing = False
+        self._probed.notify_all()
+
+    def exhaust(self, headers):
+        """Отмечает исчерпанный лимит по 403/429 с Retry-After или X-RateLimit-Reset"""
+        retry_after = headers.get("Retry-After")
+        with self._lock:
+            self.remaining = 0
+            if retry_after and retry_after.isdigit():
+                self.reset_at = time.time() + int(retry_after)
+            elif headers.get("X-RateLimit-Reset"):
+                self.reset_at = int(headers["X-RateLimit-Reset"])
+            else:
+                self.reset_at = time.time() + 60
+            self._release()
+            return self.reset_at
+
+
+class GitHubClient:
+    """
+    HTTP-клиент GitHub с пулом соединений (keep-alive), кешем метаданных
+    репозиториев по ETag и учетом лимита запросов API.
+
+    Один экземпляр на процесс (get_github_client); base_url можно направить
+    на локальный сервер-заглушку через GITHUB_API_URL.
+    """
+
+    def __init__(self, base_url=None, token=None):
+        self.base_url = (base_url or settings.GITHUB_API_URL).rstrip("/")
+        self.timeout = settings.GITHUB_API_TIMEOUT
+        self.rate_limiter = RateLimiter()
+        self._etag_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=settings.GITHUB_POOL_SIZE,
+            pool_maxsize=settings.GITHUB_POOL_SIZE,
+            max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.5),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept"] = "application/vnd.github+json"
+
+        token = token if token is not None else settings.GITHUB_TOKEN
+        self._auth_headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+    def get_json(self, path, max_wait=0):
+        """
+        Условный GET к API. Возвращает JSON ответа или None при 404.
+        Ответ 304 (не расходует лимит) отдается из кеша ETag.
+        """
+        url = f"{self.base_url}{path}"
+        headers = dict(self._auth_headers)
+        with self._cache_lock:
+            cached = self._etag_cache.get(url)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        self.rate_limiter.acquire(max_wait)
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            self.rate_limiter.release()
+            raise
+        self.rate_limiter.update(response.headers)
+
+        if response.status_code == 304 and cached:
+            self._remember(url, *cached)
+            return cached[1]
+        if response.status_code == 404:
+            return None
+        if response.status_code in (403, 429) and (
+            response.headers.get("X-RateLimit-Remaining") == "0"
+            or "Retry-After" in response.headers
+        ):
+            raise RateLimitExceeded(
+                self.rate_limiter.exhaust(response.headers), response.status_code
+            )
+        if response.status_code != 200:
+            raise GitHubAPIError(
+                f"GitHub API вернул статус {response.status_code}",
+                response.status_code,
+            )
+
+        data = response.json()
+        if response.headers.get("ETag"):
+            self._remember(url, response.headers["ETag"], data)
+        return data
+
+    def _remember(self, url, etag, data):
+        with self._cache_lock:
+            self._etag_cache[url] = (etag, data)
+            self._etag_cache.move_to_end(url)
+            while len(self._etag_cache) > settings.GITHUB_ETAG_CACHE_SIZE:
+                self._etag_cache.popitem(last=False)
+
+    def get_repository(self, owner, repo_name):
+        """Метаданные /repos/{owner}/{repo} или None, если репозиторий не найден"""
+        return self.get_json(f"/repos/{owner}/{repo_name}")
+
+    def stream(self, url, timeout=None):
+        """Потоковый GET (архивы) через общий пул соединений"""
+        return self.session.get(
+            url,
+            headers=self._auth_headers if url.startswith(self.base_url) else None,
+            stream=True,
+            timeout=timeout or self.timeout,
+        )
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_github_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GitHubClient()
+        return _client
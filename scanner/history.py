@@ -0,0 +1,223 @@
+import subprocess
+import threading
+
+from django.conf import settings
+
+from .native_engine import build_detector_pattern, is_binary, scan_buffer
+from .trufflehog import TruffleHogProcess, check_process
+import logging
+
+logger = logging.getLogger(__name__)
+
+EMPTY_SHA = "0" * 40
+COMMIT_MARKER = "\x01"
+REGULAR_FILE_MODES = ("100644", "100755")
+
+
+class BlobIntroduction:
+    """Коммит, в котором блоб впервые появился в истории"""
+
+    __slots__ = ("blob_sha", "path", "commit_sha", "author")
+
+    def __init__(self, blob_sha, path, commit_sha, author):
+        self.blob_sha = blob_sha
+        self.path = path
+        self.commit_sha = commit_sha
+        self.author = author
+
+
+def _git(repo_path, *args, **kwargs):
+    return subprocess.run(
+        [settings.GIT_BINARY, "-C", repo_path, *args],
+        capture_output=True,
+        text=True,
+        check=True,
+        **kwargs,
+    ).stdout
+
+
+def iter_introduced_blobs(repo_path):
+    """
+    Обходит историю всех веток от старых коммитов к новым и отдает каждый
+    добавленный или измененный блоб один раз - с первым коммитом, где он
+    появился. Вывод git log читается потоково.
+    """
+    seen = set()
+    process = subprocess.Popen(
+        [
+            settings.GIT_BINARY,
+            "-C",
+            repo_path,
+            "-c",
+            "core.quotePath=false",
+            "log",
+            "--all",
+            "--reverse",
+            "--no-renames",
+            "--raw",
+            "--no-abbrev",
+            f"--format={COMMIT_MARKER}%H%x00%an <%ae>",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        errors="replace",
+    )
+    commit_sha = author = None
+    try:
+        for line in process.stdout:
+            line = line.rstrip("\n")
+            if line.startswith(COMMIT_MARKER):
+                commit_sha, author = line[1:].split("\0", 1)
+                continue
+            if not line.startswith(":"):
+                continue
+
+            # :<старый режим> <новый режим> <старый sha> <новый sha> <статус>\t<путь>
+            info, path = line[1:].split("\t", 1)
+            _, mode, _, blob_sha, _ = info.split()
+            if blob_sha == EMPTY_SHA or mode not in REGULAR_FILE_MODES:
+                continue
+            if blob_sha in seen:
+                continue
+            seen.add(blob_sha)
+            yield BlobIntroduction(blob_sha, path, commit_sha, author)
+    finally:
+        process.stdout.close()
+        process.wait()
+
+
+def missing_objects(repo_path):
+    """
+    Объекты, не скачанные в partial clone. Обращение к ним через cat-file
+    вызвало бы докачку по одному объекту, поэтому они пропускаются.
+    """
+    try:
+        if (
+            _git(repo_path, "config", "--get", "remote.origin.promisor").strip()
+            != "true"
+        ):
+            return set()
+    except subprocess.CalledProcessError:
+        return set()
+
+    output = _git(repo_path, "rev-list", "--objects", "--all", "--missing=print")
+    return {line[1:].strip() for line in output.splitlines() if line.startswith("?")}
+
+
+def blob_sizes(repo_path, shas):
+    output = _git(repo_path, "cat-file", "--batch-check", input="\n".join(shas) + "\n")
+    sizes = {}
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) == 3 and parts[1] == "blob":
+            sizes[parts[0]] = int(parts[2])
+    return sizes
+
+
+def iter_blob_contents(repo_path, shas):
+    """Содержимое блобов через один процесс git cat-file --batch"""
+    process = subprocess.Popen(
+        [settings.GIT_BINARY, "-C", repo_path, "cat-file", "--batch"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+
+    def feed():
+        try:
+            for sha in shas:
+                process.stdin.write(f"{sha}\n".encode())
+            process.stdin.close()
+        except (BrokenPipeError, ValueError):
+            pass
+
+    # Запись в отдельном потоке: иначе заполненные буферы stdin/stdout заблокируют оба процесса
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    try:
+        for _ in shas:
+            header = process.stdout.readline().split()
+            if len(header) != 3:
+                continue
+            sha, size = header[0].decode(), int(header[2])
+            data = process.stdout.read(size)
+            process.stdout.read(1)
+            yield sha, data
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+        writer.join()
+
+
+class HistorySecretScan:
+    """
+    Сканирование всей истории коммитов встроенным движком.
+
+    Каждый уникальный блоб читается из объектной базы (git cat-file --batch)
+    и сканируется один раз; находки приписываются коммиту и автору, которые
+    впервые добавили блоб. Рабочая копия для этого не нужна.
+    """
+
+    failed_shards = ()
+    failed_paths = frozenset()
+    # progress.ScanProgressReporter: файлами считаются уникальные блобы
+    progress = None
+
+    def __init__(self, repo_path):
+        self.repo_path = repo_path
+        self.max_bytes = settings.SCAN_HISTORY_MAX_BLOB_BYTES
+
+    def __iter__(self):
+        introductions = {
+            blob.blob_sha: blob for blob in iter_introduced_blobs(self.repo_path)
+        }
+        missing = missing_objects(self.repo_path)
+        sizes = blob_sizes(
+            self.repo_path, [sha for sha in introductions if sha not in missing]
+        )
+        shas = [sha for sha, size in sizes.items() if 0 < size <= self.max_bytes]
+        logger.info(
+            f"История: уникальных блобов {len(introductions)}, "
+            f"к сканированию {len(shas)}, не скачано {len(missing)}"
+        )
+
+        if self.progress is not None:
+            self.progress.set_totals(len(shas), sum(sizes[sha] for sha in shas))
+
+        pattern, names = build_detector_pattern(settings.NATIVE_ENGINE_ENTROPY)
+        for sha, data in iter_blob_contents(self.repo_path, shas):
+            if self.progress is not None:
+                self.progress.add_files(1, len(data))
+            if is_binary(data):
+                continue
+            blob = introductions[sha]
+            for finding in scan_buffer(data, blob.path, pattern, names):
+                location = finding["SourceMetadata"]["Data"].pop("Filesystem")
+                finding["SourceMetadata"]["Data"]["Git"] = {
+                    **location,
+                    "commit": blob.commit_sha,
+                    "email": blob.author,
+                }
+                yield finding
+
+
+class TruffleHogHistoryScan:
+    """Сканирование истории через trufflehog git (находки уже содержат коммит)"""
+
+    failed_shards = ()
+    failed_paths = frozenset()
+
+    def __init__(self, capabilities, repo_path):
+        self.capabilities = capabilities
+        self.repo_path = repo_path
+
+    def __iter__(self):
+        args = self.capabilities.build_git_command(self.repo_path)
+        logger.info(f"Запуск: {' '.join(args)}")
+        process = TruffleHogProcess(
+            args, cwd=self.repo_path, timeout=settings.TRUFFLEHOG_TIMEOUT
+        )
+        yield from process
+        check_process(process)
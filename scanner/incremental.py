@@ -0,0 +1,127 @@
+from django.conf import settings
+from git import Repo
+from git.exc import GitCommandError, InvalidGitRepositoryError, NoSuchPathError
+
+from .models import ScanRequest, ScanResult
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def get_head_commit(repo_path):
+    """SHA текущего HEAD рабочей копии или None, если это не git-репозиторий"""
+    try:
+        return Repo(repo_path).head.commit.hexsha
+    except (InvalidGitRepositoryError, NoSuchPathError, ValueError, GitCommandError):
+        return None
+
+
+class IncrementalScanPlan:
+    """
+    План инкрементального сканирования секретов.
+
+    base_scan - последнее завершенное сканирование того же репозитория,
+    changed_files - файлы, измененные между base_scan.commit_sha и HEAD.
+    Если base_scan равен None, нужно полное сканирование.
+    """
+
+    def __init__(self, head_sha, base_scan=None, changed_files=None):
+        self.head_sha = head_sha
+        self.base_scan = base_scan
+        self.changed_files = changed_files
+
+    @property
+    def is_incremental(self):
+        return self.base_scan is not None
+
+    @classmethod
+    def build(cls, scan_request, repo_path, engine=None):
+        """engine - движок текущего сканирования; база ищется среди его сканирований"""
+        head_sha = get_head_commit(repo_path)
+        if (
+            not head_sha
+            or not settings.SCAN_INCREMENTAL_ENABLED
+            or scan_request.include_history
+        ):
+            return cls(head_sha)
+
+        base_scan = (
+            ScanRequest.objects.filter(
+                repository_url=scan_request.repository_url,
+                scan_type="SECRETS",
+                status="COMPLETED",
+                commit_sha__isnull=False,
+                engine=engine,
+                include_history=False,
+                # С другими исключениями база могла не видеть нужные файлы
+                exclude_patterns=scan_request.exclude_patterns,
+            )
+            .exclude(id=scan_request.id)
+            .order_by("-created_at")
+            .first()
+        )
+        if base_scan is None:
+            return cls(head_sha)
+
+        changed_files = cls._changed_files(repo_path, base_scan.commit_sha, head_sha)
+        if changed_files is None:
+            return cls(head_sha)
+
+        logger.info(
+            f"Инкрементальное сканирование от {base_scan.commit_sha[:8]} "
+            f"(сканирование #{base_scan.id}): изменено файлов {len(changed_files)}"
+        )
+        return cls(head_sha, base_scan, changed_files)
+
+    @staticmethod
+    def _changed_files(repo_path, base_sha, head_sha):
+        """
+        Список файлов, измененных между base_sha и head_sha.
+        None, если база недоступна (shallow clone, force push) или изменений
+        слишком много, чтобы инкрементальный режим был выгоден.
+        """
+        if base_sha == head_sha:
+            return []
+
+        try:
+            repo = Repo(repo_path)
+            if not repo.is_ancestor(base_sha, head_sha):
+                logger.info(f"Коммит {base_sha[:8]} не является предком HEAD")
+                return None
+            output = repo.git.diff(
+                "--name-only", "--no-renames", "-z", base_sha, head_sha
+            )
+        except (GitCommandError, ValueError) as e:
+            logger.info(f"Базовый коммит {base_sha[:8]} недоступен: {e}")
+            return None
+
+        changed_files = [path for path in output.split("\0") if path]
+        if len(changed_files) > settings.SCAN_INCREMENTAL_MAX_FILES:
+            logger.info(
+                f"Изменено {len(changed_files)} файлов, выполняется полное сканирование"
+            )
+            return None
+        return changed_files
+
+    def carried_forward_results(self, scan_request):
+        """
+        Несохраненные копии находок базового сканирования в неизмененных файлах
+        """
+        changed = set(self.changed_files)
+        previous = ScanResult.objects.filter(
+            scan_request=self.base_scan, bug_type="SECRETS", status=True
+        ).iterator(chunk_size=settings.SCAN_RESULTS_BATCH_SIZE)
+        for result in previous:
+            if result.file_path in changed:
+                continue
+            yield ScanResult(
+                scan_request=scan_request,
+                status=result.status,
+                file_path=result.file_path,
+                str_number=result.str_number,
+                bug_type=result.bug_type,
+                secret_type=result.secret_type,
+                confidence=result.confidence,
+                raw_context=result.raw_context,
+                description=result.description,
+            )
@@ -0,0 +1,252 @@
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .engines import ScanEngineRegistry
+from .models import ScanRequest, ScanResult
+import logging
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("DOWNLOADING", "SCANNING")
+
+
+class ScanJobQueue:
+    """
+    Очередь сканирований в базе данных поверх ScanRequest.status.
+
+    PENDING-запросы забираются воркерами через SELECT ... FOR UPDATE SKIP LOCKED,
+    поэтому несколько процессов и хостов могут разбирать одну очередь.
+    """
+
+    @staticmethod
+    def claim_next(worker_id, max_active_per_user=None, scan_types=None):
+        """
+        Атомарно забирает следующий запрос из очереди и переводит его в DOWNLOADING.
+        scan_types ограничивает типы сканирований, которые умеет выполнять воркер.
+        Возвращает id запроса или None, если брать нечего.
+        """
+        if max_active_per_user is None:
+            max_active_per_user = settings.SCAN_MAX_ACTIVE_PER_USER
+
+        with transaction.atomic():
+            queryset = ScanRequest.objects.filter(status="PENDING")
+            if scan_types is not None:
+                queryset = queryset.filter(scan_type__in=scan_types)
+
+            if max_active_per_user:
+                busy_users = (
+                    ScanRequest.objects.filter(status__in=ACTIVE_STATUSES)
+                    .values("user_id")
+                    .annotate(active=Count("id"))
+                    .filter(active__gte=max_active_per_user)
+                    .values("user_id")
+                )
+                queryset = queryset.exclude(user_id__in=busy_users)
+
+            skipped_users = set()
+            while True:
+                scan_request = (
+                    queryset.exclude(user_id__in=skipped_users)
+                    .select_for_update(skip_locked=True)
+                    .order_by("created_at")
+                    .only("id", "attempts", "user_id")
+                    .first()
+                )
+                if scan_request is None:
+                    return None
+                if not max_active_per_user or ScanJobQueue._user_has_capacity(
+                    scan_request.user_id, max_active_per_user
+                ):
+                    break
+                skipped_users.add(scan_request.user_id)
+
+            ScanRequest.objects.filter(id=scan_request.id).update(
+                status="DOWNLOADING",
+                worker_id=worker_id,
+                heartbeat_at=timezone.now(),
+                attempts=scan_request.attempts + 1,
+            )
+
+        logger.info(f"Воркер {worker_id} взял сканирование {scan_request.id}")
+        return scan_request.id
+
+    @staticmethod
+    def _user_has_capacity(user_id, max_active_per_user):
+        """
+        Блокирует строку пользователя до конца транзакции и пересчитывает его
+        активные сканирования. Подзапрос busy_users в claim_next читается без
+        блокировок, и параллельные воркеры могли бы превысить лимит; под
+        блокировкой пользователя следующий воркер увидит уже закоммиченный захват.
+        """
+        list(User.objects.select_for_update().filter(id=user_id).values_list("id"))
+        active = ScanRequest.objects.filter(
+            user_id=user_id, status__in=ACTIVE_STATUSES
+        ).count()
+        return active < max_active_per_user
+
+    @staticmethod
+    def touch(scan_request_id, worker_id):
+        """Обновляет heartbeat запроса, пока он принадлежит этому воркеру"""
+        return ScanRequest.objects.filter(
+            id=scan_request_id, worker_id=worker_id, status__in=ACTIVE_STATUSES
+        ).update(heartbeat_at=timezone.now())
+
+    @staticmethod
+    def release(scan_request_id, worker_id):
+        """Снимает владение запросом после завершения обработки"""
+        ScanRequest.objects.filter(id=scan_request_id, worker_id=worker_id).update(
+            worker_id=None, heartbeat_at=None
+        )
+
+    @staticmethod
+    @contextmanager
+    def heartbeat(scan_request_id, worker_id, interval=None):
+        """
+        Периодически обновляет heartbeat_at в фоновом потоке,
+        пока выполняется тело блока with.
+        """
+        if interval is None:
+            interval = settings.SCAN_HEARTBEAT_INTERVAL
+
+        stop_event = threading.Event()
+
+        def beat():
+            try:
+                while not stop_event.wait(interval):
+                    # Временная ошибка базы не должна останавливать heartbeat:
+                    # иначе requeue_stale вернет живое задание в очередь
+                    try:
+                        ScanJobQueue.touch(scan_request_id, worker_id)
+                    except Exception as e:
+                        logger.error(
+                            f"Ошибка heartbeat для сканирования {scan_request_id}: {e}"
+                        )
+                        close_old_connections()
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop_event.set()
+            thread.join()
+
+    @staticmethod
+    def requeue_stale(stale_timeout=None, max_attempts=None):
+        """
+        Возвращает в очередь запросы, чей воркер перестал присылать heartbeat.
+        Запросы, исчерпавшие лимит попыток, помечаются как FAILED.
+        """
+        if stale_timeout is None:
+            stale_timeout = settings.SCAN_STALE_TIMEOUT
+        if max_attempts is None:
+            max_attempts = settings.SCAN_MAX_ATTEMPTS
+
+        deadline = timezone.now() - timedelta(seconds=stale_timeout)
+
+        with transaction.atomic():
+            stale = list(
+                ScanRequest.objects.select_for_update(skip_locked=True)
+                .filter(status__in=ACTIVE_STATUSES, heartbeat_at__lt=deadline)
+                .values_list("id", "attempts")
+            )
+            if not stale:
+                return 0
+
+            exhausted = [pk for pk, attempts in stale if attempts >= max_attempts]
+            retry = [pk for pk, attempts in stale if attempts < max_attempts]
+
+            # Частичные результаты упавшего воркера не должны дублироваться;
+            # сводки пересчитывает ScanResultQuerySet.delete
+            ScanResult.objects.filter(scan_request_id__in=retry).delete()
+
+            ScanRequest.objects.filter(id__in=retry).update(
+                status="PENDING", worker_id=None, heartbeat_at=None
+            )
+            ScanRequest.objects.filter(id__in=exhausted).update(
+                status="FAILED",
+                worker_id=None,
+                heartbeat_at=None,
+                error_message="Воркер сканирования перестал отвечать",
+            )
+
+        logger.warning(
+            f"Возвращено в очередь: {retry}, помечено как FAILED: {exhausted}"
+        )
+        return len(stale)
+
+    @staticmethod
+    def make_worker_id(index=0):
+        return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+class ScanWorker:
+    """
+    Воркер, который забирает запросы из ScanJobQueue и выполняет
+    ScanProcessor.process_scan под heartbeat.
+    """
+
+    def __init__(self, worker_id, stop_event, poll_interval=None):
+        self.worker_id = worker_id
+        self.stop_event = stop_event
+        self.poll_interval = (
+            settings.SCAN_POLL_INTERVAL if poll_interval is None else poll_interval
+        )
+        self._scan_types = None
+        self._scan_types_checked = 0.0
+
+    def scan_types(self):
+        """
+        Типы сканирования, для которых на хосте есть движок. Поиск бинарников
+        повторяется раз в SCAN_ENGINES_REFRESH_INTERVAL, а не на каждом опросе.
+        """
+        now = time.monotonic()
+        if (
+            self._scan_types is None
+            or now - self._scan_types_checked >= settings.SCAN_ENGINES_REFRESH_INTERVAL
+        ):
+            self._scan_types = ScanEngineRegistry.supported_scan_types()
+            self._scan_types_checked = now
+        return self._scan_types
+
+    def run(self):
+        from .services import ScanProcessor
+
+        logger.info(f"Воркер {self.worker_id} запущен")
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                try:
+                    # Берем только то, для чего на этом хосте есть движок
+                    scan_request_id = ScanJobQueue.claim_next(
+                        self.worker_id,
+                        scan_types=self.scan_types(),
+                    )
+                except Exception as e:
+                    logger.error(f"Воркер {self.worker_id}: ошибка очереди: {e}")
+                    scan_request_id = None
+
+                if scan_request_id is None:
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+
+                try:
+                    with ScanJobQueue.heartbeat(scan_request_id, self.worker_id):
+                        ScanProcessor.process_scan(scan_request_id, self.worker_id)
+                finally:
+                    ScanJobQueue.release(scan_request_id, self.worker_id)
+        finally:
+            connection.close()
+            logger.info(f"Воркер {self.worker_id} остановлен")
@@ -0,0 +1,54 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scanner.engines import ScanEngineRegistry
+from scanner.native_engine import NativeSecretScan
+from scanner.services import ScanProcessor
+from scanner.trufflehog import TruffleHogError
+
+
+class Command(BaseCommand):
+    help = "Сравнивает скорость встроенного движка и TruffleHog на локальном каталоге"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Каталог для сканирования")
+        parser.add_argument(
+            "--repeat", type=int, default=3, help="Количество прогонов каждого движка"
+        )
+        parser.add_argument(
+            "--engine",
+            action="append",
+            choices=["native", "trufflehog"],
+            help="Движок для замера (по умолчанию - все доступные)",
+        )
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options["path"])
+        if not os.path.isdir(path):
+            raise CommandError(f"Каталог не найден: {path}")
+
+        scanners = {
+            "native": lambda: NativeSecretScan(path),
+            "trufflehog": lambda: ScanProcessor._scan_with_trufflehog_brew(path),
+        }
+        for name in options["engine"] or list(scanners):
+            if ScanEngineRegistry.get(name) is None:
+                self.stdout.write(self.style.WARNING(f"{name}: недоступен"))
+                continue
+
+            timings = []
+            findings = 0
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                try:
+                    findings = sum(1 for _ in scanners[name]())
+                except TruffleHogError as e:
+                    raise CommandError(f"{name}: {e}")
+                timings.append(time.perf_counter() - started)
+
+            self.stdout.write(
+                f"{name}: находок {findings}, "
+                f"лучшее {min(timings):.3f} с, среднее {sum(timings) / len(timings):.3f} с"
+            )
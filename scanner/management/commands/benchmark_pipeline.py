@@ -0,0 +1,434 @@
+import json
+import logging
+import os
+import random
+import resource
+import shutil
+import stat
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from scanner.models import Notification, ScanRequest, ScanStageTiming
+from scanner.notifications import NotificationOutbox
+from scanner.services import ScanProcessor
+
+BENCHMARK_USER = "pipeline-benchmark"
+
+# Заглушка TruffleHog v3: понимает --version/--help, filesystem и --exclude-paths,
+# находит посаженные ключи AWS и добавляет FINDINGS_PER_FILE синтетических
+# находок на файл
+STUB_TEMPLATE = """#!{python}
+import json
+import logging
+import os
+import re
+import sys
+
+FINDINGS_PER_FILE = {findings_per_file}
+SECRET_RE = re.compile(r"AKIA[0-9A-Z]{{16}}")
+HELP = '''usage: trufflehog [<flags>] <command> [<args> ...]
+  --json  Output in JSON format.
+  --no-verification  Don't verify the results.
+  --no-update  Don't check for updates.
+  -x, --exclude-paths=EXCLUDE-PATHS  Path to file with newline separated regexes.
+Commands:
+  git [<flags>] <uri>
+  filesystem [<flags>] <path>...
+'''
+
+
+def emit(path, line, detector, raw):
+    data = {{"Filesystem": {{"file": path, "line": line}}}}
+    finding = {{
+        "DetectorName": detector,
+        "SourceMetadata": {{"Data": data}},
+        "Raw": raw,
+        "Verified": False,
+    }}
+    sys.stdout.write(json.dumps(finding) + "\\n")
+
+
+def files(target):
+    if os.path.isfile(target):
+        yield target
+        return
+    for root, dirs, names in os.walk(target):
+        dirs[:] = [name for name in dirs if name != ".git"]
+        for name in names:
+            yield os.path.join(root, name)
+
+
+args = sys.argv[1:]
+if args[:1] == ["--version"]:
+    print("trufflehog 3.63.0 (benchmark stub)")
+    sys.exit(0)
+if "--help" in args:
+    print(HELP)
+    sys.exit(0)
+
+excludes = []
+if "--exclude-paths" in args:
+    index = args.index("--exclude-paths")
+    with open(args[index + 1]) as handle:
+        excludes = [re.compile(line.strip()) for line in handle if line.strip()]
+    del args[index : index + 2]
+
+for target in (arg for arg in args[1:] if not arg.startswith("--")):
+    for path in files(target):
+        if any(exclude.search(path) for exclude in excludes):
+            continue
+        with open(path, errors="ignore") as handle:
+            for number, text in enumerate(handle, 1):
+                for match in SECRET_RE.finditer(text):
+                    emit(path, number, "AWS", match.group(0))
+        for index in range(FINDINGS_PER_FILE):
+            emit(path, 1, "Generic Secret", f"synthetic-{{index}}")
+"""
+
+
+def write_stub(directory, findings_per_file):
+    path = os.path.join(directory, "trufflehog")
+    with open(path, "w") as handle:
+        handle.write(
+            STUB_TEMPLATE.format(
+                python=sys.executable, findings_per_file=findings_per_file
+            )
+        )
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP)
+    return path
+
+
+def build_repository(directory, files, file_size, secrets, seed, vendor_files=0):
+    """
+    Синтетический репозиторий: files файлов по ~file_size байт в каталогах
+    по 100 файлов, в secrets из них посажен ключ AWS, и еще vendor_files
+    таких же файлов в node_modules/ (для проверки исключений). Возвращает
+    file:// URL bare-копии, из которой клонирует пайплайн.
+    """
+    rng = random.Random(seed)
+    work = os.path.join(directory, "work")
+    total = files + vendor_files
+    planted = set(rng.sample(range(total), min(secrets, total)))
+    alphabet = string.ascii_letters + string.digits + " _=.,()"
+
+    for index in range(total):
+        package = os.path.join(work, f"pkg{index // 100:03d}")
+        if index >= files:
+            package = os.path.join(work, "node_modules", f"dep{index // 100:03d}")
+        os.makedirs(package, exist_ok=True)
+        lines = []
+        size = 0
+        while size < file_size:
+            line = "".join(rng.choices(alphabet, k=rng.randint(20, 100)))
+            lines.append(line)
+            size += len(line) + 1
+        if index in planted:
+            key = "AKIA" + "".join(rng.choices(string.ascii_uppercase, k=16))
+            lines.insert(rng.randrange(len(lines)), f'AWS_ACCESS_KEY_ID = "{key}"')
+        with open(os.path.join(package, f"module{index}.py"), "w") as handle:
+            handle.write("\n".join(lines) + "\n")
+
+    git = [
+        settings.GIT_BINARY,
+        "-c",
+        "user.name=benchmark",
+        "-c",
+        "user.email=benchmark@example.com",
+    ]
+    for args in (
+        ["init", "-q", work],
+        ["-C", work, "add", "-A"],
+        ["-C", work, "commit", "-q", "-m", "Synthetic benchmark repository"],
+        ["clone", "-q", "--bare", work, os.path.join(directory, "repo.git")],
+    ):
+        subprocess.run(git + args, check=True, capture_output=True)
+    shutil.rmtree(work)
+    return "file://" + os.path.join(directory, "repo.git")
+
+
+class PeakRSS:
+    """Пиковый RSS процесса внутри блока (опрос /proc/self/statm)"""
+
+    INTERVAL = 0.01
+
+    def __init__(self):
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    @staticmethod
+    def current():
+        try:
+            with open("/proc/self/statm") as handle:
+                pages = int(handle.read().split()[1])
+            return pages * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            # Без procfs - пик за все время процесса (Linux: килобайты)
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _sample(self):
+        while not self._stop.wait(self.INTERVAL):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+        return False
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет пайплайн сканирования целиком (скачивание, разбор вывода "
+        "TruffleHog, запись, отображение, письма) на синтетическом репозитории "
+        "с заглушкой TruffleHog. Пишет в текущую базу, записи удаляются после замера."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--files", type=int, default=1000, help="Файлов в репо")
+        parser.add_argument(
+            "--file-size", type=int, default=2048, help="Размер файла, байт"
+        )
+        parser.add_argument(
+            "--secrets", type=int, default=50, help="Файлов с посаженным ключом"
+        )
+        parser.add_argument(
+            "--findings-per-file",
+            type=int,
+            default=0,
+            help="Дополнительных находок заглушки TruffleHog на каждый файл",
+        )
+        parser.add_argument(
+            "--vendor-files",
+            type=int,
+            default=0,
+            help="Файлов в node_modules/ (исключаются до сканирования)",
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Прогонов")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--json", action="store_true", help="Результат одной строкой JSON"
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Не удалять сканирования и временный каталог",
+        )
+
+    def handle(self, *args, **options):
+        if options["files"] < 1 or options["repeat"] < 1:
+            raise CommandError("--files и --repeat должны быть положительными")
+
+        directory = tempfile.mkdtemp(prefix="pipeline_benchmark_")
+        try:
+            started = time.perf_counter()
+            url = build_repository(
+                directory,
+                options["files"],
+                options["file_size"],
+                options["secrets"],
+                options["seed"],
+                options["vendor_files"],
+            )
+            stub = write_stub(directory, options["findings_per_file"])
+            if options["verbosity"] > 1:
+                self.stdout.write(
+                    f"Репозиторий {url} создан за {time.perf_counter() - started:.2f} с"
+                )
+
+            # Только сам пайплайн: без кеша блобов, инкремента, зеркал и GitHub API
+            overrides = override_settings(
+                REPO_ALLOW_FILE_URLS=True,
+                REPO_CACHE_ENABLED=False,
+                SCAN_BLOB_CACHE_ENABLED=False,
+                SCAN_INCREMENTAL_ENABLED=False,
+                SCAN_NATIVE_ENGINE_DEPTHS=[],
+                TRUFFLEHOG_BINARY=stub,
+                EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            )
+            # Журнал сканера на каждый файл и находку исказил бы замер
+            scanner_logger = logging.getLogger("scanner")
+            level = scanner_logger.level
+            if options["verbosity"] < 2:
+                scanner_logger.setLevel(logging.WARNING)
+            try:
+                with overrides:
+                    runs = [self._run(url, options) for _ in range(options["repeat"])]
+            finally:
+                scanner_logger.setLevel(level)
+        finally:
+            if options["keep"]:
+                self.stdout.write(f"Временный каталог сохранен: {directory}")
+            else:
+                shutil.rmtree(directory, ignore_errors=True)
+
+        report = self._summarize(runs, options)
+        if options["json"]:
+            self.stdout.write(json.dumps(report, ensure_ascii=False))
+        else:
+            self._print(report)
+
+    def _run(self, url, options):
+        user, created = User.objects.get_or_create(
+            username=BENCHMARK_USER, defaults={"email": "benchmark@example.com"}
+        )
+        if created:
+            # Пользователь только для force_login в замере отображения
+            user.set_unusable_password()
+            user.save(update_fields=["password"])
+        scan_request = ScanRequest.objects.create(
+            user=user,
+            repository_url=url,
+            scan_type="SECRETS",
+            scan_depth="STANDARD",
+            status="DOWNLOADING",
+        )
+        try:
+            with PeakRSS() as pipeline_rss:
+                ScanProcessor.process_scan(scan_request.id)
+            scan_request.refresh_from_db()
+            if scan_request.status != "COMPLETED":
+                raise CommandError(
+                    f"Сканирование завершилось со статусом {scan_request.status}: "
+                    f"{scan_request.error_message}"
+                )
+
+            with PeakRSS() as render_rss:
+                render_seconds, rendered = self._render(scan_request, user)
+
+            notifications = NotificationOutbox.claim_batch(
+                batch_size=Notification.objects.filter(
+                    scan_request=scan_request
+                ).count(),
+                scan_request=scan_request,
+            )
+            with PeakRSS() as email_rss:
+                NotificationOutbox.deliver(notifications, connection=get_connection())
+
+            stages = {
+                timing.stage: timing
+                for timing in ScanStageTiming.objects.filter(scan_request=scan_request)
+            }
+            return {
+                "stages": stages,
+                "render_seconds": render_seconds,
+                "rendered": rendered,
+                "rss": {
+                    "pipeline": pipeline_rss.peak,
+                    "render": render_rss.peak,
+                    "email": email_rss.peak,
+                },
+            }
+        finally:
+            if not options["keep"]:
+                scan_request.delete()
+
+    @staticmethod
+    def _render(scan_request, user):
+        """Страница деталей и полная выгрузка CSV; возвращает (секунды, строк)"""
+        client = Client()
+        client.force_login(user)
+        started = time.perf_counter()
+        response = client.get(reverse("scan_request_detail", args=[scan_request.id]))
+        if response.status_code != 200:
+            raise CommandError(f"Страница деталей вернула {response.status_code}")
+        export = client.get(
+            reverse("export_scan_results", args=[scan_request.id, "csv"])
+        )
+        rows = sum(chunk.count(b"\n") for chunk in export.streaming_content) - 1
+        return time.perf_counter() - started, rows
+
+    @staticmethod
+    def _summarize(runs, options):
+        def stage_value(run, stage, field):
+            timing = run["stages"].get(stage)
+            return getattr(timing, field) if timing is not None else 0
+
+        # (этап, ScanStageTiming.stage, единица элементов). parse - время жизни
+        # процесса TruffleHog вместе с разбором JSON; при потоковой записи
+        # находок в него входит и ожидание записи (persist)
+        stages = [
+            ("download", "CLONE", "файлов"),
+            ("parse", "TRUFFLEHOG", "находок"),
+            ("persist", "PERSIST", "записей"),
+            ("email", "EMAIL", "писем"),
+            ("pipeline", "TOTAL", None),
+        ]
+        report = {
+            "files": options["files"],
+            "file_size": options["file_size"],
+            "secrets": options["secrets"],
+            "findings_per_file": options["findings_per_file"],
+            "vendor_files": options["vendor_files"],
+            "repeat": options["repeat"],
+            "stages": {},
+        }
+        for name, stage, unit in stages:
+            seconds = statistics.median(
+                stage_value(run, stage, "seconds") for run in runs
+            )
+            report["stages"][name] = {
+                "seconds": seconds,
+                "bytes": stage_value(runs[-1], stage, "bytes"),
+                "items": stage_value(runs[-1], stage, "items"),
+                "unit": unit,
+            }
+        report["stages"]["render"] = {
+            "seconds": statistics.median(run["render_seconds"] for run in runs),
+            "bytes": 0,
+            "items": runs[-1]["rendered"],
+            "unit": "записей",
+        }
+        report["peak_rss_mb"] = {
+            phase: round(max(run["rss"][phase] for run in runs) / 1024 / 1024, 1)
+            for phase in ("pipeline", "render", "email")
+        }
+        # ru_maxrss в Linux - в килобайтах
+        report["children_peak_rss_mb"] = round(
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1
+        )
+        return report
+
+    def _print(self, report):
+        self.stdout.write(
+            f"Репозиторий: {report['files']} файлов по {report['file_size']} байт, "
+            f"ключей: {report['secrets']}, "
+            f"доп. находок на файл: {report['findings_per_file']}, "
+            f"файлов в node_modules: {report['vendor_files']}, "
+            f"прогонов: {report['repeat']} (медиана)"
+        )
+        for name in ("download", "parse", "persist", "render", "email", "pipeline"):
+            stage = report["stages"][name]
+            seconds = stage["seconds"]
+            line = f"{name:<9} {seconds:8.3f} с"
+            if seconds > 0 and stage["bytes"]:
+                line += f"  {stage['bytes'] / 1024 / 1024 / seconds:9.1f} МБ/с"
+            if seconds > 0 and stage["unit"]:
+                line += f"  {stage['items'] / seconds:10.0f} {stage['unit']}/с"
+            self.stdout.write(line)
+
+        rss = report["peak_rss_mb"]
+        self.stdout.write(
+            f"Пик RSS, МБ: пайплайн {rss['pipeline']}, отображение {rss['render']}, "
+            f"письма {rss['email']}; дочерние процессы "
+            f"{report['children_peak_rss_mb']}"
+        )
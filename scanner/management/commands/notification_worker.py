@@ -0,0 +1,59 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from scanner.notifications import NotificationOutbox
+
+
+class Command(BaseCommand):
+    help = "Отправляет письма из очереди уведомлений"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.NOTIFICATION_BATCH_SIZE,
+            help="Писем на одно SMTP-соединение",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.NOTIFICATION_POLL_INTERVAL,
+            help="Пауза между опросами пустой очереди, сек",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Отправить накопившиеся письма и завершиться",
+        )
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            sent = NotificationOutbox.drain(options["batch_size"])
+            self.stdout.write(f"Отправлено писем: {sent}")
+            return
+
+        stop_event = threading.Event()
+
+        def shutdown(signum, frame):
+            self.stdout.write("Остановка воркера уведомлений...")
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        self.stdout.write("Воркер уведомлений запущен")
+        while not stop_event.is_set():
+            close_old_connections()
+            try:
+                NotificationOutbox.requeue_stale()
+                sent = NotificationOutbox.drain(options["batch_size"])
+            except Exception as e:
+                self.stderr.write(f"Ошибка очереди уведомлений: {e}")
+                sent = 0
+
+            if not sent:
+                stop_event.wait(options["poll_interval"])
@@ -0,0 +1,67 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from scanner.engines import ScanEngineRegistry
+from scanner.job_queue import ScanJobQueue, ScanWorker
+
+
+class Command(BaseCommand):
+    help = "Запускает воркеры, обрабатывающие очередь сканирований"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.SCAN_WORKER_CONCURRENCY,
+            help="Количество параллельных воркеров в процессе",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.SCAN_POLL_INTERVAL,
+            help="Пауза между опросами пустой очереди, сек",
+        )
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+
+        def shutdown(signum, frame):
+            self.stdout.write("Остановка воркеров...")
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        threads = []
+        for index in range(options["workers"]):
+            worker = ScanWorker(
+                ScanJobQueue.make_worker_id(index),
+                stop_event,
+                poll_interval=options["poll_interval"],
+            )
+            thread = threading.Thread(target=worker.run, name=worker.worker_id)
+            thread.start()
+            threads.append(thread)
+
+        self.stdout.write(f"Запущено воркеров: {len(threads)}")
+
+        # Главный поток публикует движки процесса для /scanner/engines/
+        # и следит за зависшими заданиями упавших воркеров
+        process_id = ScanJobQueue.make_worker_id().rsplit(":", 1)[0]
+        while True:
+            try:
+                ScanEngineRegistry.report(process_id)
+            except Exception as e:
+                self.stderr.write(f"Ошибка при публикации движков: {e}")
+            if stop_event.wait(settings.SCAN_HEARTBEAT_INTERVAL):
+                break
+            try:
+                ScanJobQueue.requeue_stale()
+            except Exception as e:
+                self.stderr.write(f"Ошибка при возврате зависших заданий: {e}")
+
+        for thread in threads:
+            thread.join()
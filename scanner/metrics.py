@@ -0,0 +1,223 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.db.models import Count, Q, Sum
+
+from .models import Notification, ScanRequest, ScanStageTiming
+import logging
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы корзин гистограммы длительности этапов, секунды
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+_current_recorder = ContextVar("scan_timing_recorder", default=None)
+_current_timer = ContextVar("stage_timer", default=None)
+
+
+class ScanTimingRecorder:
+    """
+    Замеры этапов одного сканирования. Пока действует bind(), StageTimer
+    в этом потоке (и в задачах, запущенных через contextvars.copy_context)
+    складывает замеры сюда; при выходе они записываются в ScanStageTiming.
+    """
+
+    def __init__(self, scan_request_id):
+        self.scan_request_id = scan_request_id
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def current():
+        return _current_recorder.get()
+
+    def add(self, stage, seconds=0, calls=0, bytes=0, items=0):
+        with self._lock:
+            totals = self.stages.setdefault(
+                stage, {"seconds": 0, "calls": 0, "bytes": 0, "items": 0}
+            )
+            totals["seconds"] += seconds
+            totals["calls"] += calls
+            totals["bytes"] += bytes
+            totals["items"] += items
+
+    @contextmanager
+    def bind(self):
+        token = _current_recorder.set(self)
+        try:
+            yield self
+        finally:
+            _current_recorder.reset(token)
+            self.save()
+
+    def save(self):
+        with self._lock:
+            stages, self.stages = self.stages, {}
+        for stage, totals in stages.items():
+            try:
+                ScanStageTiming.record(self.scan_request_id, stage, **totals)
+            except Exception as e:
+                # Метрики не должны ронять сканирование
+                logger.warning(
+                    f"Не удалось сохранить замер {stage} "
+                    f"сканирования {self.scan_request_id}: {e}"
+                )
+
+
+def record_stage(stage, seconds=0, calls=0, bytes=0, items=0):
+    """Добавляет замер к текущему сканированию, если оно есть"""
+    recorder = ScanTimingRecorder.current()
+    if recorder is not None:
+        recorder.add(stage, seconds, calls, bytes, items)
+
+
+class StageTimer:
+    """
+    Замер одного вызова этапа:
+
+        with StageTimer("PERSIST") as timer:
+            ...
+            timer.add(items=len(batch))
+
+    Для функций целиком - декоратор timed; объем работы внутри такой
+    функции добавляется к ее замеру через StageTimer.current().
+    """
+
+    def __init__(self, stage, bytes=0, items=0):
+        self.stage = stage
+        self.bytes = bytes
+        self.items = items
+        self.seconds = 0.0
+        self._started = None
+        self._token = None
+
+    @staticmethod
+    def current():
+        """Самый внутренний действующий замер или None"""
+        return _current_timer.get()
+
+    def add(self, bytes=0, items=0):
+        self.bytes += bytes
+        self.items += items
+
+    def __enter__(self):
+        self._token = _current_timer.set(self)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.seconds = time.perf_counter() - self._started
+        _current_timer.reset(self._token)
+        record_stage(self.stage, self.seconds, 1, self.bytes, self.items)
+        return False
+
+
+def timed(stage):
+    """Декоратор: каждый вызов функции замеряется как этап stage"""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with StageTimer(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+def _format_bound(bound):
+    return f"{float(bound):g}"
+
+
+def render_metrics():
+    """
+    Метрики в текстовом формате Prometheus. Считаются по базе, а не в памяти
+    процесса: сканирования и письма обрабатываются отдельными воркерами.
+    """
+    lines = []
+
+    aggregates = {
+        "observations": Count("id"),
+        "seconds_sum": Sum("seconds"),
+        "calls_sum": Sum("calls"),
+        "bytes_sum": Sum("bytes"),
+        "items_sum": Sum("items"),
+    }
+    for index, bound in enumerate(DURATION_BUCKETS):
+        aggregates[f"le_{index}"] = Count("id", filter=Q(seconds__lte=bound))
+    stages = list(
+        ScanStageTiming.objects.values("stage").annotate(**aggregates).order_by("stage")
+    )
+
+    name = "osint_scan_stage_duration_seconds"
+    lines.append(f"# HELP {name} Длительность этапа за одно сканирование")
+    lines.append(f"# TYPE {name} histogram")
+    for row in stages:
+        stage = row["stage"].lower()
+        for index, bound in enumerate(DURATION_BUCKETS):
+            labels = _labels(stage=stage, le=_format_bound(bound))
+            lines.append(f"{name}_bucket{{{labels}}} {row[f'le_{index}']}")
+        labels = _labels(stage=stage, le="+Inf")
+        lines.append(f"{name}_bucket{{{labels}}} {row['observations']}")
+        lines.append(f"{name}_sum{{{_labels(stage=stage)}}} {row['seconds_sum'] or 0}")
+        lines.append(f"{name}_count{{{_labels(stage=stage)}}} {row['observations']}")
+
+    counters = (
+        ("calls", "Вызовы этапа (шарды, пачки записи, письма)"),
+        ("bytes", "Обработанные этапом байты"),
+        ("items", "Обработанные этапом элементы (файлы, находки, зависимости)"),
+    )
+    for field, help_text in counters:
+        name = f"osint_scan_stage_{field}_total"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for row in stages:
+            labels = _labels(stage=row["stage"].lower())
+            lines.append(f"{name}{{{labels}}} {row[f'{field}_sum'] or 0}")
+
+    scans = dict(
+        ScanRequest.objects.order_by().values_list("status").annotate(count=Count("id"))
+    )
+    name = "osint_scan_requests"
+    lines.append(f"# HELP {name} Сканирования по статусам")
+    lines.append(f"# TYPE {name} gauge")
+    for status, _ in ScanRequest.STATUS_CHOICES:
+        lines.append(f"{name}{{{_labels(status=status)}}} {scans.get(status, 0)}")
+
+    name = "osint_scan_queue_depth"
+    lines.append(f"# HELP {name} Сканирования в очереди (PENDING)")
+    lines.append(f"# TYPE {name} gauge")
+    lines.append(f"{name} {scans.get('PENDING', 0)}")
+
+    notifications = dict(
+        Notification.objects.order_by()
+        .values_list("status")
+        .annotate(count=Count("id"))
+    )
+    name = "osint_notifications"
+    lines.append(f"# HELP {name} Уведомления по статусам")
+    lines.append(f"# TYPE {name} gauge")
+    for status, _ in Notification.STATUS_CHOICES:
+        count = notifications.get(status, 0)
+        lines.append(f"{name}{{{_labels(status=status)}}} {count}")
+
+    name = "osint_notification_queue_depth"
+    lines.append(f"# HELP {name} Письма, ожидающие отправки (PENDING)")
+    lines.append(f"# TYPE {name} gauge")
+    lines.append(f"{name} {notifications.get('PENDING', 0)}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanner", "0002_scanrequest_error_message_scanrequest_local_path_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scanrequest",
+            name="attempts",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="scanrequest",
+            name="heartbeat_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="scanrequest",
+            name="worker_id",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="scanrequest",
+            index=models.Index(
+                fields=["status", "created_at"], name="scanner_sca_status_1068e4_idx"
+            ),
+        ),
+    ]
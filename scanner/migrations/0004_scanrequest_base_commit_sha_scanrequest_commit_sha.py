@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanner", "0003_scanrequest_attempts_scanrequest_heartbeat_at_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scanrequest",
+            name="base_commit_sha",
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name="scanrequest",
+            name="commit_sha",
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanner", "0004_scanrequest_base_commit_sha_scanrequest_commit_sha"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BlobScanCache",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("blob_sha", models.CharField(max_length=40)),
+                ("engine", models.CharField(max_length=100)),
+                ("findings", models.JSONField(default=list)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("blob_sha", "engine"), name="unique_blob_scan_cache"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanner", "0005_blobscancache"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="scanrequest",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("PENDING", "В ожидании"),
+                    ("DOWNLOADING", "Скачивание репозитория"),
+                    ("SCANNING", "Сканирование"),
+                    ("COMPLETED", "Завершено"),
+                    ("PARTIAL", "Завершено частично"),
+                    ("FAILED", "Ошибка"),
+                ],
+                default="PENDING",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanner", "0006_alter_scanrequest_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scanrequest",
+            name="engine",
+            field=models.CharField(
+                blank=True,
+                choices=[("trufflehog", "TruffleHog"), ("native", "Встроенный")],
+                max_length=20,
+                null=True,
+            ),
+        ),
+    ]
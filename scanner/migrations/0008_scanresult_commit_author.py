@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanner", "0007_scanrequest_engine"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scanresult",
+            name="author",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="scanresult",
+            name="commit_sha",
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+    ]
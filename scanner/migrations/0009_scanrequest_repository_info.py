@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanner", "0008_scanresult_commit_author"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scanrequest",
+            name="repository_info",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,147 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def build_summaries(apps, schema_editor):
+    ScanResult = apps.get_model("scanner", "ScanResult")
+    ScanResultSummary = apps.get_model("scanner", "ScanResultSummary")
+    db_alias = schema_editor.connection.alias
+
+    rows = (
+        ScanResult.objects.using(db_alias)
+        .values("scan_request_id", "status", "bug_type", "secret_type", "confidence")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    summaries = {}
+    for row in rows.iterator():
+        key = (
+            row["scan_request_id"],
+            row["status"],
+            row["bug_type"],
+            row["secret_type"] or "",
+            row["confidence"] or "",
+        )
+        summaries[key] = summaries.get(key, 0) + row["count"]
+
+    ScanResultSummary.objects.using(db_alias).bulk_create(
+        [
+            ScanResultSummary(
+                scan_request_id=scan_request_id,
+                status=status,
+                bug_type=bug_type,
+                secret_type=secret_type,
+                confidence=confidence,
+                count=count,
+            )
+            for (
+                scan_request_id,
+                status,
+                bug_type,
+                secret_type,
+                confidence,
+            ), count in summaries.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanner", "0009_scanrequest_repository_info"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScanResultSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("status", models.BooleanField(default=False)),
+                ("bug_type", models.CharField(max_length=20)),
+                (
+                    "secret_type",
+                    models.CharField(blank=True, default="", max_length=100),
+                ),
+                ("confidence", models.CharField(blank=True, default="", max_length=10)),
+                ("count", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="scanrequest",
+            index=models.Index(
+                fields=["user", "-created_at"], name="scanner_sca_user_id_091b18_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="scanresult",
+            index=models.Index(
+                fields=["scan_request", "id"], name="scanner_sca_scan_re_f45f5e_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="scanresult",
+            index=models.Index(
+                fields=["scan_request", "secret_type", "id"],
+                name="scanner_sca_scan_re_e210e3_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="scanresult",
+            index=models.Index(
+                fields=["scan_request", "confidence", "id"],
+                name="scanner_sca_scan_re_db1c74_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="scanresult",
+            index=models.Index(
+                fields=["bug_type", "confidence", "status"],
+                name="scanner_sca_bug_typ_cd8de9_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="scanresult",
+            index=models.Index(
+                fields=["created_at"], name="scanner_sca_created_e5e078_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="scanresultsummary",
+            name="scan_request",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="result_summary",
+                to="scanner.scanrequest",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="scanresultsummary",
+            constraint=models.UniqueConstraint(
+                fields=(
+                    "scan_request",
+                    "status",
+                    "bug_type",
+                    "secret_type",
+                    "confidence",
+                ),
+                name="unique_scan_result_summary",
+            ),
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+# Поиск в админке идет через UPPER(file_path) LIKE UPPER('%...%'),
+# поэтому индекс строится по тому же выражению
+CREATE_INDEX = (
+    "CREATE INDEX IF NOT EXISTS scanner_scanresult_file_path_trgm "
+    "ON scanner_scanresult USING gin (UPPER(file_path::text) gin_trgm_ops)"
+)
+DROP_INDEX = "DROP INDEX IF EXISTS scanner_scanresult_file_path_trgm"
+
+
+def create_trigram_index(apps, schema_editor):
+    # На других СУБД (SQLite в разработке) индекс не нужен
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(CREATE_INDEX)
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanner", "0010_scan_result_indexes_summary"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanner", "0013_scanprogress"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScanStageTiming",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "stage",
+                    models.CharField(
+                        choices=[
+                            ("TOTAL", "Сканирование целиком"),
+                            ("CLONE", "Скачивание репозитория"),
+                            ("TRUFFLEHOG", "TruffleHog"),
+                            ("PERSIST", "Запись находок"),
+                            ("DEPENDENCIES", "Проверка зависимостей"),
+                            ("EMAIL", "Отправка писем"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("seconds", models.FloatField(default=0)),
+                ("calls", models.PositiveIntegerField(default=0)),
+                ("bytes", models.BigIntegerField(default=0)),
+                ("items", models.PositiveIntegerField(default=0)),
+                (
+                    "scan_request",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stage_timings",
+                        to="scanner.scanrequest",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("scan_request", "stage"),
+                        name="unique_scan_stage_timing",
+                    )
+                ],
+            },
+        ),
+    ]
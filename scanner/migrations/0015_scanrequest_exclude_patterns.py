@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanner", "0014_scanstagetiming"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scanrequest",
+            name="exclude_patterns",
+            field=models.TextField(blank=True, default=""),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanner", "0015_scanrequest_exclude_patterns"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScanWorkerEngines",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("worker_id", models.CharField(max_length=255, unique=True)),
+                ("engines", models.JSONField(default=dict)),
+                ("scan_types", models.JSONField(default=list)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
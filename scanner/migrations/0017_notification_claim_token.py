@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scanner", "0016_scanworkerengines"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="claim_token",
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from collections import Counter
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F
 from django.contrib.auth.models import User
 
 
@@ -21,11 +24,17 @@ class ScanRequest(BaseModel):
         ("DEPENDENCIES", "Dependencies"),
     ]
 
+    ENGINE_CHOICES = [
+        ("trufflehog", "TruffleHog"),
+        ("native", "Встроенный"),
+    ]
+
     STATUS_CHOICES = [
         ("PENDING", "В ожидании"),
         ("DOWNLOADING", "Скачивание репозитория"),
         ("SCANNING", "Сканирование"),
         ("COMPLETED", "Завершено"),
+        ("PARTIAL", "Завершено частично"),
         ("FAILED", "Ошибка"),
     ]
 
@@ -40,10 +49,131 @@ class ScanRequest(BaseModel):
     local_path = models.CharField(max_length=2550, null=True, blank=True)
     error_message = models.TextField(blank=True, null=True)
 
+    # Поля очереди заданий (см. scanner/job_queue.py)
+    worker_id = models.CharField(max_length=255, null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    # Коммит, на котором выполнено сканирование, и база инкрементального режима
+    commit_sha = models.CharField(max_length=40, null=True, blank=True)
+    base_commit_sha = models.CharField(max_length=40, null=True, blank=True)
+
+    # Движок, выполнивший сканирование секретов (выбирается по scan_depth)
+    engine = models.CharField(
+        max_length=20, choices=ENGINE_CHOICES, null=True, blank=True
+    )
+
+    # Сведения о скачанном репозитории (utils.get_repository_info)
+    repository_info = models.JSONField(null=True, blank=True)
+
+    # Дополнительные исключения в синтаксисе .gitignore (см. scanner/exclusions.py)
+    exclude_patterns = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            # Список сканирований пользователя (scan_requests_list)
+            models.Index(fields=["user", "-created_at"]),
+        ]
+
     def __str__(self):
         return f"Scan {self.id} - {self.repository_url}"
 
 
+class ScanProgress(BaseModel):
+    """
+    Ход выполнения сканирования. Обновляется воркером (progress.ScanProgressReporter)
+    и отдается странице деталей через SSE (views.scan_progress_stream).
+    """
+
+    scan_request = models.OneToOneField(
+        ScanRequest, on_delete=models.CASCADE, related_name="progress"
+    )
+    stage = models.CharField(max_length=30, blank=True, default="")
+    files_total = models.PositiveIntegerField(default=0)
+    files_done = models.PositiveIntegerField(default=0)
+    bytes_total = models.BigIntegerField(default=0)
+    bytes_done = models.BigIntegerField(default=0)
+    findings = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return (
+            f"{self.scan_request_id}: {self.stage} {self.files_done}/{self.files_total}"
+        )
+
+
+class ScanStageTiming(BaseModel):
+    """
+    Время и объем работы одного этапа сканирования (metrics.StageTimer).
+    Повторные вызовы этапа (шарды TruffleHog, пачки записи) суммируются
+    в одну строку; по этим строкам строятся гистограммы /metrics.
+    """
+
+    STAGE_CHOICES = [
+        ("TOTAL", "Сканирование целиком"),
+        ("CLONE", "Скачивание репозитория"),
+        ("TRUFFLEHOG", "TruffleHog"),
+        ("PERSIST", "Запись находок"),
+        ("DEPENDENCIES", "Проверка зависимостей"),
+        ("EMAIL", "Отправка писем"),
+    ]
+
+    scan_request = models.ForeignKey(
+        ScanRequest, on_delete=models.CASCADE, related_name="stage_timings"
+    )
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES)
+    seconds = models.FloatField(default=0)
+    calls = models.PositiveIntegerField(default=0)
+    bytes = models.BigIntegerField(default=0)
+    items = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scan_request", "stage"], name="unique_scan_stage_timing"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.scan_request_id} {self.stage}: {self.seconds:.2f} с"
+
+    @classmethod
+    def record(cls, scan_request_id, stage, seconds=0, calls=0, bytes=0, items=0):
+        """Прибавляет замер к строке этапа, создавая ее при первом замере"""
+        increments = {
+            "seconds": F("seconds") + seconds,
+            "calls": F("calls") + calls,
+            "bytes": F("bytes") + bytes,
+            "items": F("items") + items,
+        }
+        lookup = {"scan_request_id": scan_request_id, "stage": stage}
+        if cls.objects.filter(**lookup).update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    seconds=seconds, calls=calls, bytes=bytes, items=items, **lookup
+                )
+        except IntegrityError:
+            # Строку успел создать параллельный замер
+            cls.objects.filter(**lookup).update(**increments)
+
+
+class ScanResultQuerySet(models.QuerySet):
+    def delete(self):
+        """Удаляет результаты и пересчитывает сводки затронутых сканирований"""
+        scan_request_ids = set(
+            self.order_by().values_list("scan_request_id", flat=True).distinct()
+        )
+        with transaction.atomic(using=self.db):
+            deleted = super().delete()
+            ScanResultSummary.rebuild(scan_request_ids, using=self.db)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class ScanResult(BaseModel):
     BUG_TYPE_CHOICES = [
         ("SECRETS", "Secrets"),
@@ -71,5 +201,293 @@ class ScanResult(BaseModel):
     description = models.TextField(blank=True, null=True)
     error_message = models.TextField(blank=True, null=True)
 
+    # Коммит и автор, добавившие секрет (сканирование истории)
+    commit_sha = models.CharField(max_length=40, null=True, blank=True)
+    author = models.CharField(max_length=255, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Постраничный вывод находок сканирования и фильтры страницы деталей
+            models.Index(fields=["scan_request", "id"]),
+            models.Index(fields=["scan_request", "secret_type", "id"]),
+            models.Index(fields=["scan_request", "confidence", "id"]),
+            # Фильтры админки
+            models.Index(fields=["bug_type", "confidence", "status"]),
+            models.Index(fields=["created_at"]),
+        ]
+
     def __str__(self):
         return f"Result for {self.scan_request.id} - {self.file_path}"
+
+    objects = ScanResultQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        """
+        Новый результат прибавляется к сводке; при изменении (например,
+        confidence или status в админке) он переносится из старой корзины в новую.
+        """
+        using = kwargs.get("using") or self._state.db
+        update_fields = kwargs.get("update_fields")
+        with transaction.atomic(using=using):
+            previous = None
+            if not self._state.adding:
+                previous = (
+                    ScanResult.objects.using(using)
+                    .select_for_update()
+                    .filter(pk=self.pk)
+                    .values(*ScanResultSummary.KEY_FIELDS)
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            if previous is None:
+                ScanResultSummary.record([self], using=self._state.db)
+                return
+
+            current = dict(previous)
+            updated = (
+                None
+                if update_fields is None
+                else {self._meta.get_field(name).attname for name in update_fields}
+            )
+            for field in ScanResultSummary.KEY_FIELDS:
+                if updated is None or field in updated:
+                    current[field] = getattr(self, field)
+            ScanResultSummary.move(
+                ScanResultSummary.key(previous),
+                ScanResultSummary.key(current),
+                using=self._state.db,
+            )
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get("using") or self._state.db
+        with transaction.atomic(using=using):
+            deleted = super().delete(*args, **kwargs)
+            ScanResultSummary.rebuild([self.scan_request_id], using=using)
+        return deleted
+
+
+class BlobScanCache(BaseModel):
+    """
+    Результаты детекторов для одного git-блоба (SHA-1 в формате git hash-object),
+    общие для всех репозиториев и форков. Пустой findings означает чистый блоб.
+    """
+
+    blob_sha = models.CharField(max_length=40)
+    engine = models.CharField(max_length=100)
+    findings = models.JSONField(default=list)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["blob_sha", "engine"], name="unique_blob_scan_cache"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.blob_sha} ({self.engine})"
+
+
+class ScanResultSummary(BaseModel):
+    """
+    Количество результатов сканирования по (status, bug_type, детектор,
+    confidence). Обновляется при каждой записи ScanResult, чтобы списки и
+    сводки не считали находки по всей таблице.
+    """
+
+    scan_request = models.ForeignKey(
+        ScanRequest, on_delete=models.CASCADE, related_name="result_summary"
+    )
+    status = models.BooleanField(default=False)
+    bug_type = models.CharField(max_length=20)
+    secret_type = models.CharField(max_length=100, blank=True, default="")
+    confidence = models.CharField(max_length=10, blank=True, default="")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "scan_request",
+                    "status",
+                    "bug_type",
+                    "secret_type",
+                    "confidence",
+                ],
+                name="unique_scan_result_summary",
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.scan_request_id} {self.secret_type or self.bug_type}: {self.count}"
+        )
+
+    # Поля ScanResult, по которым результаты раскладываются в корзины сводки
+    KEY_FIELDS = ("scan_request_id", "status", "bug_type", "secret_type", "confidence")
+
+    @staticmethod
+    def key(result):
+        """Корзина результата: ScanResult или словарь значений KEY_FIELDS"""
+        if not isinstance(result, dict):
+            result = {
+                field: getattr(result, field) for field in ScanResultSummary.KEY_FIELDS
+            }
+        return (
+            result["scan_request_id"],
+            bool(result["status"]),
+            result["bug_type"],
+            result["secret_type"] or "",
+            result["confidence"] or "",
+        )
+
+    @staticmethod
+    def _lookup(key):
+        scan_request_id, status, bug_type, secret_type, confidence = key
+        return {
+            "scan_request_id": scan_request_id,
+            "status": status,
+            "bug_type": bug_type,
+            "secret_type": secret_type,
+            "confidence": confidence,
+        }
+
+    @classmethod
+    def move(cls, old_key, new_key, using=None):
+        """Переносит один измененный результат из корзины old_key в new_key"""
+        if old_key == new_key:
+            return
+        manager = cls.objects.using(using) if using else cls.objects
+        lookup = cls._lookup(old_key)
+        manager.filter(count__gt=0, **lookup).update(count=F("count") - 1)
+        # Пустые корзины не хранятся, как и после rebuild
+        manager.filter(count=0, **lookup).delete()
+        cls._add(Counter([new_key]), using=using)
+
+    @classmethod
+    def record(cls, results, using=None):
+        """Прибавляет записанные результаты к счетчикам (внутри транзакции записи)"""
+        cls._add(Counter(cls.key(result) for result in results), using=using)
+
+    @classmethod
+    def _add(cls, counts, using=None):
+        manager = cls.objects.using(using) if using else cls.objects
+        for key, count in counts.items():
+            lookup = cls._lookup(key)
+            if manager.filter(**lookup).update(count=F("count") + count):
+                continue
+            try:
+                with transaction.atomic(using=using):
+                    manager.create(count=count, **lookup)
+            except IntegrityError:
+                # Строку успел создать параллельный писатель
+                manager.filter(**lookup).update(count=F("count") + count)
+
+    @classmethod
+    def rebuild(cls, scan_request_ids, using=None):
+        """
+        Пересчитывает сводки сканирований по оставшимся ScanResult
+        (после удаления результатов, см. ScanResultQuerySet.delete)
+        """
+        scan_request_ids = list(scan_request_ids)
+        if not scan_request_ids:
+            return
+        results = ScanResult.objects.using(using) if using else ScanResult.objects
+        manager = cls.objects.using(using) if using else cls.objects
+        rows = (
+            results.filter(scan_request_id__in=scan_request_ids)
+            .order_by()
+            .values_list(
+                "scan_request_id", "status", "bug_type", "secret_type", "confidence"
+            )
+            .annotate(count=Count("id"))
+        )
+        counts = Counter()
+        for scan_request_id, status, bug_type, secret_type, confidence, count in rows:
+            key = (
+                scan_request_id,
+                status,
+                bug_type,
+                secret_type or "",
+                confidence or "",
+            )
+            counts[key] += count
+
+        with transaction.atomic(using=using):
+            manager.filter(scan_request_id__in=scan_request_ids).delete()
+            manager.bulk_create(
+                cls(
+                    scan_request_id=scan_request_id,
+                    status=status,
+                    bug_type=bug_type,
+                    secret_type=secret_type,
+                    confidence=confidence,
+                    count=count,
+                )
+                for (
+                    scan_request_id,
+                    status,
+                    bug_type,
+                    secret_type,
+                    confidence,
+                ), count in counts.items()
+            )
+
+
+class Notification(BaseModel):
+    """
+    Исходящее уведомление (outbox). Письмо собирается и отправляется
+    отдельным воркером (manage.py notification_worker), а не процессом
+    сканирования.
+    """
+
+    KIND_CHOICES = [
+        ("COMPLETED", "Сканирование завершено"),
+        ("ERROR", "Ошибка сканирования"),
+        ("ADMIN", "Уведомление администратора"),
+    ]
+
+    STATUS_CHOICES = [
+        ("PENDING", "В очереди"),
+        ("SENDING", "Отправляется"),
+        ("SENT", "Отправлено"),
+        ("FAILED", "Ошибка"),
+    ]
+
+    scan_request = models.ForeignKey(
+        ScanRequest, on_delete=models.CASCADE, related_name="notifications"
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    recipient = models.EmailField()
+    # Текст ошибки сканирования для уведомлений ERROR
+    error_message = models.TextField(blank=True, null=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDING")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, null=True)
+    # Токен пачки, забравшей письмо (NotificationOutbox.claim_batch)
+    claim_token = models.CharField(max_length=32, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.scan_request_id} -> {self.recipient}"
+
+
+class ScanWorkerEngines(BaseModel):
+    """
+    Движки, найденные процессом воркера сканирования (manage.py scan_worker).
+    Обновляется воркером каждые SCAN_HEARTBEAT_INTERVAL секунд; /scanner/engines/
+    показывает возможности воркеров, а не веб-процесса.
+    """
+
+    worker_id = models.CharField(max_length=255, unique=True)
+    engines = models.JSONField(default=dict)
+    scan_types = models.JSONField(default=list)
+
+    def __str__(self):
+        return self.worker_id
@@ -0,0 +1,205 @@
+import math
+import mmap
+import multiprocessing
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+
+from .walker import FileManifest
+import logging
+
+logger = logging.getLogger(__name__)
+
+ENGINE_VERSION = "1.0"
+
+BASE64_CHARS = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+HEX_CHARS = b"1234567890abcdefABCDEF"
+
+# Пороги энтропии Шеннона из truffleHog v2
+BASE64_ENTROPY_THRESHOLD = 4.5
+HEX_ENTROPY_THRESHOLD = 3.0
+
+ENTROPY_GROUP = "entropy"
+ENTROPY_PATTERN = rb"[A-Za-z0-9+/=]{20,}"
+
+BINARY_SNIFF_BYTES = 8192
+
+
+def build_detector_pattern(entropy=True):
+    """
+    Объединяет регулярные выражения truffleHogRegexes в одну альтернативу
+    с именованными группами, чтобы файл просматривался за один проход.
+    Возвращает (скомпилированный шаблон, {имя группы: имя детектора}).
+    """
+    from truffleHogRegexes.regexChecks import regexes
+
+    names = {}
+    parts = []
+    for index, (name, pattern) in enumerate(regexes.items()):
+        group = f"d{index}"
+        names[group] = name
+        parts.append(b"(?P<%s>%s)" % (group.encode(), pattern.pattern.encode()))
+
+    if entropy:
+        # Идет последней: при совпадении позиций приоритет у детекторов
+        parts.append(b"(?P<%s>%s)" % (ENTROPY_GROUP.encode(), ENTROPY_PATTERN))
+
+    return re.compile(b"|".join(parts)), names
+
+
+def shannon_entropy(data, charset):
+    if not data:
+        return 0.0
+    counts = Counter(byte for byte in data if byte in charset)
+    length = len(data)
+    return -sum(
+        (count / length) * math.log2(count / length) for count in counts.values()
+    )
+
+
+def is_high_entropy(token):
+    if all(byte in HEX_CHARS for byte in token):
+        return shannon_entropy(token, HEX_CHARS) > HEX_ENTROPY_THRESHOLD
+    return shannon_entropy(token, BASE64_CHARS) > BASE64_ENTROPY_THRESHOLD
+
+
+def scan_buffer(data, rel_path, pattern, names):
+    """
+    Ищет секреты в bytes или mmap. Возвращает находки в формате
+    JSON-вывода TruffleHog v3, чтобы дальше они обрабатывались одинаково.
+    """
+    findings = []
+    line, position = 1, 0
+    for match in pattern.finditer(data):
+        raw = match.group()
+        group = match.lastgroup
+        if group == ENTROPY_GROUP:
+            if not is_high_entropy(raw):
+                continue
+            detector, confidence = "High Entropy", "low"
+        else:
+            detector, confidence = names[group], "medium"
+
+        line += data[position : match.start()].count(b"\n")
+        position = match.start()
+        findings.append(
+            {
+                "DetectorName": detector,
+                "Confidence": confidence,
+                "Raw": raw.decode("utf-8", "replace"),
+                "SourceMetadata": {
+                    "Data": {"Filesystem": {"file": rel_path, "line": line}}
+                },
+            }
+        )
+    return findings
+
+
+def is_binary(head):
+    return b"\0" in head[:BINARY_SNIFF_BYTES]
+
+
+def scan_file(full_path, rel_path, pattern, names, max_bytes):
+    """Сканирует один файл через mmap, пропуская пустые, большие и бинарные"""
+    try:
+        size = os.path.getsize(full_path)
+        if size == 0 or size > max_bytes:
+            return []
+
+        with open(full_path, "rb") as f:
+            if is_binary(f.read(BINARY_SNIFF_BYTES)):
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return scan_buffer(data, rel_path, pattern, names)
+    except (OSError, ValueError):
+        return []
+
+
+def _scan_chunk(repo_path, paths, entropy, max_bytes):
+    pattern, names = build_detector_pattern(entropy)
+    findings = []
+    for path in paths:
+        findings.extend(
+            scan_file(os.path.join(repo_path, path), path, pattern, names, max_bytes)
+        )
+    return findings
+
+
+class NativeSecretScan:
+    """
+    Встроенный движок поиска секретов: регулярные выражения truffleHogRegexes
+    и энтропия Шеннона, без внешнего бинарника. Итерация отдает находки
+    в формате TruffleHog; большие репозитории сканируются в пуле процессов.
+    """
+
+    # Атрибуты совместимы с ShardedTruffleHogScan
+    failed_shards = ()
+    failed_paths = frozenset()
+    # progress.ScanProgressReporter, если ход сканирования нужно публиковать
+    progress = None
+    # exclusions.ScanExclusions - файлы, которые не нужно сканировать
+    exclusions = None
+
+    def __init__(self, repo_path, paths=None):
+        self.repo_path = repo_path
+        self.paths = paths
+        self.entropy = settings.NATIVE_ENGINE_ENTROPY
+        self.max_bytes = settings.NATIVE_ENGINE_MAX_FILE_BYTES
+        self.chunk_size = settings.NATIVE_ENGINE_CHUNK_FILES
+
+    def __iter__(self):
+        manifest = FileManifest.for_path(self.repo_path)
+        if self.paths is None:
+            # Бинарные по расширению и слишком большие файлы не читаются вовсе
+            paths = [
+                entry.path
+                for entry in manifest.files()
+                if not entry.binary and 0 < entry.size <= self.max_bytes
+            ]
+        else:
+            paths = self.paths
+        if self.exclusions is not None:
+            paths = self.exclusions.filter(paths)
+        chunks = [
+            paths[i : i + self.chunk_size]
+            for i in range(0, len(paths), self.chunk_size)
+        ]
+        workers = min(settings.SCAN_SHARD_WORKERS, len(chunks))
+        if self.progress is not None:
+            self.progress.set_totals(len(paths), self._size(manifest, paths))
+        logger.info(
+            f"Встроенный движок: {len(paths)} файлов, {len(chunks)} пачек, "
+            f"процессов: {workers}"
+        )
+
+        if workers <= 1:
+            for chunk in chunks:
+                yield from _scan_chunk(
+                    self.repo_path, chunk, self.entropy, self.max_bytes
+                )
+                self._chunk_done(manifest, chunk)
+            return
+
+        # spawn: воркер сканирования многопоточный, fork после потоков небезопасен
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {
+                pool.submit(
+                    _scan_chunk, self.repo_path, chunk, self.entropy, self.max_bytes
+                ): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                yield from future.result()
+                self._chunk_done(manifest, futures[future])
+
+    @staticmethod
+    def _size(manifest, paths):
+        return sum(size for _, size in manifest.sizes(paths))
+
+    def _chunk_done(self, manifest, chunk):
+        if self.progress is not None:
+            self.progress.add_files(len(chunk), self._size(manifest, chunk))
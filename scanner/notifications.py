@@ -0,0 +1,185 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .email_utils import EmailNotifier
+from .metrics import ScanTimingRecorder, StageTimer
+from .models import Notification
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationOutbox:
+    """
+    Очередь исходящих писем поверх Notification.status.
+
+    Пачка PENDING-уведомлений забирается через SELECT ... FOR UPDATE SKIP LOCKED
+    и отправляется через одно SMTP-соединение. Неудачные письма повторяются
+    с экспоненциальной задержкой до NOTIFICATION_MAX_ATTEMPTS попыток.
+    """
+
+    @staticmethod
+    def claim_batch(batch_size=None, scan_request=None):
+        """
+        Переводит до batch_size готовых к отправке уведомлений в SENDING
+        с новым claim_token пачки (scan_request - только уведомления этого
+        сканирования). Письмо отправляется, только пока токен не сменился.
+        """
+        if batch_size is None:
+            batch_size = settings.NOTIFICATION_BATCH_SIZE
+
+        token = uuid.uuid4().hex
+        with transaction.atomic():
+            queryset = Notification.objects.filter(status="PENDING").filter(
+                Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=timezone.now())
+            )
+            if scan_request is not None:
+                queryset = queryset.filter(scan_request=scan_request)
+            ids = list(
+                queryset.select_for_update(skip_locked=True)
+                .order_by("created_at")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if ids:
+                Notification.objects.filter(id__in=ids).update(
+                    status="SENDING", claim_token=token, updated_at=timezone.now()
+                )
+
+        return list(
+            Notification.objects.filter(id__in=ids)
+            .select_related("scan_request", "scan_request__user")
+            .order_by("created_at")
+        )
+
+    @staticmethod
+    def _claimed(notification):
+        """Строка, пока она принадлежит пачке, забравшей notification"""
+        return Notification.objects.filter(
+            id=notification.id, status="SENDING", claim_token=notification.claim_token
+        )
+
+    @staticmethod
+    def deliver(notifications, connection=None):
+        """
+        Отправляет пачку через одно соединение почтового бэкенда.
+        Возвращает количество отправленных писем.
+        """
+        if not notifications:
+            return 0
+
+        sent = 0
+        connection = connection or get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as e:
+            # Без соединения не отправится ни одно письмо пачки
+            for notification in notifications:
+                NotificationOutbox._fail(notification, e)
+            return 0
+
+        try:
+            for notification in notifications:
+                # Продлевает аренду; если requeue_stale уже вернул письмо в
+                # очередь и его забрал другой воркер, повторно не отправляем
+                if not NotificationOutbox._claimed(notification).update(
+                    updated_at=timezone.now()
+                ):
+                    logger.warning(
+                        f"Уведомление {notification.id} забрано другим воркером"
+                    )
+                    continue
+
+                try:
+                    NotificationOutbox._send(notification, connection)
+                except Exception as e:
+                    NotificationOutbox._fail(notification, e)
+                    continue
+
+                notification.status = "SENT"
+                notification.attempts += 1
+                notification.sent_at = timezone.now()
+                notification.last_error = None
+                NotificationOutbox._claimed(notification).update(
+                    status=notification.status,
+                    attempts=notification.attempts,
+                    sent_at=notification.sent_at,
+                    last_error=None,
+                    claim_token=None,
+                    updated_at=timezone.now(),
+                )
+                sent += 1
+        finally:
+            connection.close()
+
+        logger.info(f"Отправлено уведомлений: {sent} из {len(notifications)}")
+        return sent
+
+    @staticmethod
+    def _send(notification, connection):
+        """Сборка и отправка письма, замеряется как этап EMAIL сканирования"""
+        recorder = ScanTimingRecorder(notification.scan_request_id)
+        with recorder.bind(), StageTimer("EMAIL", items=1) as timer:
+            message = EmailNotifier.build_message(notification, connection)
+            timer.add(
+                bytes=sum(
+                    len(attachment[1])
+                    for attachment in message.attachments
+                    if isinstance(attachment, tuple)
+                )
+            )
+            # send_messages на открытом соединении не переподключается
+            if not connection.send_messages([message]):
+                raise RuntimeError("Почтовый бэкенд не принял письмо")
+
+    @staticmethod
+    def _fail(notification, error):
+        notification.attempts += 1
+        notification.last_error = str(error)[:1000]
+        if notification.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+            notification.status = "FAILED"
+            logger.error(f"Уведомление {notification.id} не отправлено: {error}")
+        else:
+            notification.status = "PENDING"
+            delay = settings.NOTIFICATION_RETRY_DELAY * 2 ** (notification.attempts - 1)
+            notification.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            logger.warning(
+                f"Уведомление {notification.id}: ошибка отправки, "
+                f"повтор через {delay} сек: {error}"
+            )
+        NotificationOutbox._claimed(notification).update(
+            status=notification.status,
+            attempts=notification.attempts,
+            last_error=notification.last_error,
+            next_attempt_at=notification.next_attempt_at,
+            claim_token=None,
+            updated_at=timezone.now(),
+        )
+
+    @staticmethod
+    def requeue_stale(stale_timeout=None):
+        """
+        Возвращает в очередь письма, зависшие в SENDING после падения воркера.
+        Токен сбрасывается, поэтому медленный, но живой воркер их уже не отправит.
+        """
+        if stale_timeout is None:
+            stale_timeout = settings.NOTIFICATION_STALE_TIMEOUT
+        deadline = timezone.now() - timedelta(seconds=stale_timeout)
+        return Notification.objects.filter(
+            status="SENDING", updated_at__lt=deadline
+        ).update(status="PENDING", claim_token=None)
+
+    @staticmethod
+    def drain(batch_size=None):
+        """Отправляет все готовые уведомления. Возвращает количество отправленных"""
+        sent = 0
+        while True:
+            batch = NotificationOutbox.claim_batch(batch_size)
+            if not batch:
+                return sent
+            sent += NotificationOutbox.deliver(batch)
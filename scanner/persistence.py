@@ -0,0 +1,139 @@
+import io
+
+from django.conf import settings
+from django.db import connections, router, transaction
+
+from .metrics import StageTimer
+from .models import ScanResult, ScanResultSummary
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ScanResultWriter:
+    """
+    Пакетная запись ScanResult.
+
+    Принимает несохраненные экземпляры ScanResult и пишет их пачками через
+    bulk_create (или COPY на PostgreSQL), опционально отбрасывая дубликаты
+    по набору полей dedupe_fields. guard вызывается в транзакции каждой
+    пачки до записи: исключение из него отменяет пачку.
+    """
+
+    def __init__(
+        self,
+        batch_size=None,
+        dedupe_fields=None,
+        use_copy=None,
+        progress=None,
+        guard=None,
+    ):
+        self.batch_size = batch_size or settings.SCAN_RESULTS_BATCH_SIZE
+        if dedupe_fields is None:
+            dedupe_fields = settings.SCAN_RESULTS_DEDUPE_FIELDS
+        self.dedupe_fields = tuple(dedupe_fields)
+        if use_copy is None:
+            use_copy = settings.SCAN_RESULTS_USE_COPY
+        self.db_alias = router.db_for_write(ScanResult)
+        self.use_copy = use_copy and connections[self.db_alias].vendor == "postgresql"
+
+        self.progress = progress
+        self.guard = guard
+        self.saved = 0
+        self.skipped = 0
+        self._buffer = []
+        self._seen = set()
+
+    def add(self, result):
+        """Добавляет результат в буфер, записывая буфер по заполнении"""
+        if self.dedupe_fields:
+            key = tuple(getattr(result, field) for field in self.dedupe_fields)
+            if key in self._seen:
+                self.skipped += 1
+                return
+            self._seen.add(key)
+
+        self._buffer.append(result)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленный буфер одной пачкой"""
+        if not self._buffer:
+            return
+
+        batch, self._buffer = self._buffer, []
+        # Пачка и счетчики сводки фиксируются вместе
+        with StageTimer("PERSIST", items=len(batch)):
+            with transaction.atomic(using=self.db_alias):
+                if self.guard is not None:
+                    self.guard()
+                if self.use_copy:
+                    self._copy(batch)
+                else:
+                    ScanResult.objects.using(self.db_alias).bulk_create(
+                        batch, batch_size=self.batch_size
+                    )
+                ScanResultSummary.record(batch, using=self.db_alias)
+        self.saved += len(batch)
+        if self.progress is not None:
+            self.progress.add_findings(len(batch))
+
+    def write_all(self, results, atomic=True):
+        """
+        Записывает все результаты, по умолчанию в одной транзакции.
+        С atomic=False каждая пачка фиксируется сразу, поэтому находки
+        из потока становятся видны в базе еще до окончания сканирования.
+        Возвращает количество сохраненных записей.
+        """
+        if atomic:
+            with transaction.atomic(using=self.db_alias):
+                self._write(results)
+        else:
+            self._write(results)
+
+        logger.info(
+            f"Сохранено находок: {self.saved}, отброшено дубликатов: {self.skipped}"
+        )
+        return self.saved
+
+    def _write(self, results):
+        try:
+            for result in results:
+                self.add(result)
+        finally:
+            # Уже полученные находки сохраняются, даже если источник упал
+            self.flush()
+
+    def _copy(self, batch):
+        """Быстрая запись через COPY ... FROM STDIN (только PostgreSQL)"""
+        connection = connections[self.db_alias]
+        fields = [
+            field for field in ScanResult._meta.concrete_fields if not field.primary_key
+        ]
+        columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+
+        buffer = io.StringIO()
+        for obj in batch:
+            values = [
+                field.get_db_prep_save(field.pre_save(obj, True), connection)
+                for field in fields
+            ]
+            buffer.write(",".join(self._copy_value(value) for value in values))
+            buffer.write("\n")
+        buffer.seek(0)
+
+        table = connection.ops.quote_name(ScanResult._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+
+    @staticmethod
+    def _copy_value(value):
+        # В CSV-формате COPY пустое значение без кавычек означает NULL
+        if value is None:
+            return ""
+        if isinstance(value, str):
+            return '"' + value.replace('"', '""') + '"'
+        return str(value)
@@ -0,0 +1,300 @@
+import asyncio
+import json
+import threading
+import time
+import weakref
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections, router
+
+from .models import ScanProgress
+import logging
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("stage", "files_total", "files_done", "bytes_total", "bytes_done", "findings")
+
+
+def channel_name(scan_request_id):
+    return f"scan_progress_{scan_request_id}"
+
+
+class ProgressBroker:
+    """
+    Оповещение подписчиков внутри одного процесса: публикация идет из потока
+    сканирования, подписчики - асинхронные SSE-потоки в своих event loop.
+    """
+
+    _subscribers = defaultdict(set)
+    _lock = threading.Lock()
+
+    @classmethod
+    def subscribe(cls, scan_request_id):
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(maxsize=1))
+        with cls._lock:
+            cls._subscribers[scan_request_id].add(subscription)
+        return subscription
+
+    @classmethod
+    def unsubscribe(cls, scan_request_id, subscription):
+        with cls._lock:
+            subscribers = cls._subscribers.get(scan_request_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del cls._subscribers[scan_request_id]
+
+    @classmethod
+    def publish(cls, scan_request_id):
+        with cls._lock:
+            subscribers = list(cls._subscribers.get(scan_request_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(cls._wake, queue)
+            except RuntimeError:
+                # Event loop подписчика уже закрыт
+                continue
+
+    @staticmethod
+    def _wake(queue):
+        if queue.empty():
+            queue.put_nowait(True)
+
+
+class ScanProgressReporter:
+    """
+    Счетчики хода сканирования в воркере. Запись в ScanProgress и оповещение
+    подписчиков (NOTIFY на PostgreSQL и ProgressBroker) выполняются не чаще
+    раза в SCAN_PROGRESS_INTERVAL секунд, смена этапа - сразу.
+    """
+
+    def __init__(self, scan_request_id, interval=None):
+        self.scan_request_id = scan_request_id
+        self.interval = (
+            settings.SCAN_PROGRESS_INTERVAL if interval is None else interval
+        )
+        self.values = dict.fromkeys(FIELDS, 0)
+        self.values["stage"] = ""
+        self._published_at = 0.0
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        with self._lock:
+            self.values["stage"] = name
+        self.publish(force=True)
+
+    def set_totals(self, files, size):
+        with self._lock:
+            self.values["files_total"] = files
+            self.values["bytes_total"] = size
+        self.publish()
+
+    def add_files(self, files, size=0):
+        with self._lock:
+            self.values["files_done"] += files
+            self.values["bytes_done"] += size
+        self.publish()
+
+    def add_findings(self, count):
+        with self._lock:
+            self.values["findings"] += count
+        self.publish()
+
+    def publish(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._published_at < self.interval:
+            return
+        self._published_at = now
+        with self._lock:
+            values = dict(self.values)
+
+        try:
+            ScanProgress.objects.update_or_create(
+                scan_request_id=self.scan_request_id, defaults=values
+            )
+            self._notify(values)
+        except Exception as e:
+            # Прогресс не должен ронять сканирование
+            logger.warning(
+                f"Не удалось опубликовать прогресс сканирования "
+                f"{self.scan_request_id}: {e}"
+            )
+
+    def _notify(self, values):
+        connection = connections[router.db_for_write(ScanProgress)]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_notify(%s, %s)",
+                    [channel_name(self.scan_request_id), json.dumps(values)],
+                )
+        ProgressBroker.publish(self.scan_request_id)
+
+
+class SharedNotifyConnection:
+    """
+    Одно соединение LISTEN на event loop процесса (PostgreSQL, psycopg2).
+    Сокет соединения отслеживается через loop.add_reader, уведомления
+    раздаются SSE-потокам через ProgressBroker, поэтому зрители не занимают
+    ни отдельных соединений с базой, ни потоков пула.
+    """
+
+    _instances = weakref.WeakKeyDictionary()
+
+    def __init__(self, loop, alias):
+        self.loop = loop
+        self.alias = alias
+        self.connection = None
+        self.channels = Counter()
+        # LISTEN/UNLISTEN выполняются в потоке по одному, без чтения сокета
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def for_loop(cls, alias):
+        loop = asyncio.get_running_loop()
+        shared = cls._instances.get(loop)
+        if shared is None:
+            shared = cls._instances[loop] = cls(loop, alias)
+        return shared
+
+    @property
+    def active(self):
+        return self.connection is not None
+
+    async def listen(self, scan_request_id):
+        channel = channel_name(scan_request_id)
+        async with self._lock:
+            self.channels[channel] += 1
+            if self.channels[channel] > 1 and self.active:
+                return
+            try:
+                if not self.active:
+                    # Новое соединение подписывается на каналы всех зрителей
+                    await asyncio.to_thread(self._connect)
+                    await self._execute([f'LISTEN "{name}"' for name in self.channels])
+                else:
+                    await self._execute([f'LISTEN "{channel}"'])
+            except Exception:
+                # Зритель без LISTEN не вызовет unlisten
+                self.channels[channel] -= 1
+                if not self.channels[channel]:
+                    del self.channels[channel]
+                raise
+
+    async def unlisten(self, scan_request_id):
+        channel = channel_name(scan_request_id)
+        async with self._lock:
+            self.channels[channel] -= 1
+            if self.channels[channel] > 0:
+                return
+            del self.channels[channel]
+            if self.active:
+                try:
+                    await self._execute([f'UNLISTEN "{channel}"'])
+                except Exception as e:
+                    logger.warning(f"UNLISTEN {channel} не выполнен: {e}")
+
+    def _connect(self):
+        wrapper = connections[self.alias]
+        connection = wrapper.get_new_connection(wrapper.get_connection_params())
+        if not hasattr(connection, "poll"):
+            # Только psycopg2 поддерживает чтение уведомлений через poll()
+            connection.close()
+            raise RuntimeError("драйвер не поддерживает poll()")
+        connection.autocommit = True
+        self.connection = connection
+
+    async def _execute(self, statements):
+        # Пока запрос выполняется в потоке, сокет не читается из event loop
+        self.loop.remove_reader(self.connection.fileno())
+        try:
+            await asyncio.to_thread(self._run, statements)
+        except Exception:
+            self._reset()
+            raise
+        self.loop.add_reader(self.connection.fileno(), self._on_readable)
+        # Уведомления, прочитанные драйвером во время запроса
+        self._dispatch()
+
+    def _run(self, statements):
+        with self.connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    def _on_readable(self):
+        try:
+            self.connection.poll()
+        except Exception as e:
+            logger.warning(f"Соединение LISTEN прогресса потеряно: {e}")
+            self._reset()
+            return
+        self._dispatch()
+
+    def _dispatch(self):
+        notifies = list(self.connection.notifies)
+        self.connection.notifies.clear()
+        for scan_request_id in {
+            notify.channel.rsplit("_", 1)[1] for notify in notifies
+        }:
+            ProgressBroker.publish(int(scan_request_id))
+
+    def _reset(self):
+        connection, self.connection = self.connection, None
+        if connection is None:
+            return
+        try:
+            self.loop.remove_reader(connection.fileno())
+            connection.close()
+        except Exception:
+            pass
+        # Зрители перечитают прогресс и перейдут на опрос
+        for channel in self.channels:
+            ProgressBroker.publish(int(channel.rsplit("_", 1)[1]))
+
+
+class ProgressListener:
+    """
+    Ожидание обновлений прогресса для SSE-потока через ProgressBroker.
+    На PostgreSQL брокер будит общее на процесс соединение LISTEN
+    (SharedNotifyConnection), иначе - воркер в том же процессе; в обоих
+    случаях база дополнительно опрашивается по таймауту.
+    """
+
+    def __init__(self, scan_request_id):
+        self.scan_request_id = scan_request_id
+        self._shared = None
+        self._subscription = None
+
+    async def open(self):
+        self._subscription = ProgressBroker.subscribe(self.scan_request_id)
+        alias = router.db_for_read(ScanProgress)
+        if connections[alias].vendor == "postgresql":
+            shared = SharedNotifyConnection.for_loop(alias)
+            try:
+                await shared.listen(self.scan_request_id)
+                self._shared = shared
+            except Exception as e:
+                logger.warning(f"LISTEN недоступен, используется опрос: {e}")
+        return self
+
+    @property
+    def timeout(self):
+        # Уведомления приходят сразу, опрос нужен только как страховка
+        if self._shared is not None and self._shared.active:
+            return settings.SCAN_PROGRESS_KEEPALIVE
+        return settings.SCAN_PROGRESS_POLL_INTERVAL
+
+    async def wait(self):
+        """True, если пришло уведомление; False по таймауту"""
+        try:
+            await asyncio.wait_for(self._subscription[1].get(), self.timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def close(self):
+        if self._subscription is not None:
+            ProgressBroker.unsubscribe(self.scan_request_id, self._subscription)
+        if self._shared is not None:
+            await self._shared.unlisten(self.scan_request_id)
@@ -0,0 +1,154 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from git import Repo
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RepositoryMirrorCache:
+    """
+    Локальный кеш bare-зеркал GitHub-репозиториев.
+
+    Зеркало хранится в <REPO_CACHE_DIR>/mirrors/<owner>/<repo>.git и
+    обновляется через git fetch, а каждое сканирование получает отдельный
+    git worktree, поэтому повторное сканирование стоит одного дельта-fetch.
+    Размер кеша ограничен REPO_CACHE_MAX_SIZE_MB с вытеснением по LRU.
+    """
+
+    # Только ветки и теги: refs/pull/* от GitHub многократно раздувают зеркало
+    FETCH_REFSPEC = "+refs/heads/*:refs/heads/*"
+
+    def __init__(self, cache_dir=None, max_size_mb=None):
+        self.cache_dir = str(cache_dir or settings.REPO_CACHE_DIR)
+        self.max_size_mb = (
+            settings.REPO_CACHE_MAX_SIZE_MB if max_size_mb is None else max_size_mb
+        )
+        self.mirrors_dir = os.path.join(self.cache_dir, "mirrors")
+        self.locks_dir = os.path.join(self.cache_dir, "locks")
+        os.makedirs(self.mirrors_dir, exist_ok=True)
+        os.makedirs(self.locks_dir, exist_ok=True)
+
+    def mirror_path(self, owner, repo_name):
+        return os.path.join(self.mirrors_dir, owner.lower(), f"{repo_name.lower()}.git")
+
+    def lock_path(self, owner, repo_name):
+        """
+        Файл блокировки по хешу owner/repo: склейка имен через разделитель
+        дает одинаковые файлы для разных репозиториев (a__b/c и a/b__c)
+        """
+        key = f"{owner.lower()}/{repo_name.lower()}".encode()
+        return os.path.join(self.locks_dir, f"{hashlib.sha256(key).hexdigest()}.lock")
+
+    @contextmanager
+    def lock(self, owner, repo_name, blocking=True):
+        """Межпроцессная блокировка зеркала одного репозитория"""
+        lock_path = self.lock_path(owner, repo_name)
+        with open(lock_path, "w") as lock_file:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(lock_file, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def checkout(self, owner, repo_name, git_url, dest):
+        """
+        Обновляет зеркало и создает в dest worktree на HEAD по умолчанию.
+        Возвращает dest.
+        """
+        with self.lock(owner, repo_name):
+            mirror = self._update_mirror(owner, repo_name, git_url)
+            mirror.git.worktree("add", "--detach", dest, "HEAD")
+            # mtime маркера используется для LRU-вытеснения
+            os.utime(mirror.git_dir)
+
+        logger.info(f"Worktree из зеркала {owner}/{repo_name}: {dest}")
+        self.evict()
+        return dest
+
+    def _update_mirror(self, owner, repo_name, git_url):
+        path = self.mirror_path(owner, repo_name)
+
+        if os.path.isdir(path):
+            mirror = Repo(path)
+            # Удаляем метаданные worktree уже очищенных сканирований
+            mirror.git.worktree("prune")
+            started = time.monotonic()
+            mirror.git.fetch("--prune", "--tags", "origin")
+            logger.info(
+                f"Зеркало {owner}/{repo_name} обновлено за "
+                f"{time.monotonic() - started:.1f} с"
+            )
+            return mirror
+
+        logger.info(f"Создание зеркала {owner}/{repo_name}: {path}")
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        mirror = Repo.clone_from(git_url, tmp_path, bare=True)
+        mirror.git.config("remote.origin.fetch", self.FETCH_REFSPEC)
+        os.rename(tmp_path, path)
+        return Repo(path)
+
+    def evict(self):
+        """Удаляет давно не использованные зеркала, пока кеш больше лимита"""
+        if not self.max_size_mb:
+            return
+
+        mirrors = []
+        for owner in os.listdir(self.mirrors_dir):
+            owner_dir = os.path.join(self.mirrors_dir, owner)
+            for name in os.listdir(owner_dir):
+                if not name.endswith(".git"):
+                    continue
+                path = os.path.join(owner_dir, name)
+                mirrors.append((os.stat(path).st_mtime, path, owner, name[:-4]))
+
+        sizes = {path: _tree_size(path) for _, path, _, _ in mirrors}
+        total = sum(sizes.values())
+        limit = self.max_size_mb * 1024 * 1024
+
+        for _, path, owner, repo_name in sorted(mirrors):
+            if total <= limit:
+                break
+            with self.lock(owner, repo_name, blocking=False) as locked:
+                if not locked or self._has_live_worktrees(path):
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                total -= sizes[path]
+                logger.info(f"Зеркало вытеснено из кеша: {owner}/{repo_name}")
+
+    @staticmethod
+    def _has_live_worktrees(path):
+        worktrees_dir = os.path.join(path, "worktrees")
+        if not os.path.isdir(worktrees_dir):
+            return False
+        for name in os.listdir(worktrees_dir):
+            try:
+                with open(os.path.join(worktrees_dir, name, "gitdir")) as f:
+                    if os.path.exists(f.read().strip()):
+                        return True
+            except OSError:
+                continue
+        return False
+
+
+def _tree_size(path):
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
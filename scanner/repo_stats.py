@@ -0,0 +1,125 @@
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from .walker import FileManifest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _git(repo_path, *args):
+    return subprocess.run(
+        [settings.GIT_BINARY, "-C", repo_path, *args],
+        capture_output=True,
+        text=True,
+        errors="replace",
+        check=True,
+    ).stdout
+
+
+def parse_commit(raw):
+    """Автор, дата и первая строка сообщения из вывода git cat-file commit"""
+    headers, _, message = raw.partition("\n\n")
+    info = {"author": None, "committed_at": None}
+    for line in headers.splitlines():
+        if line.startswith("author "):
+            # author Имя <email> <unix time> <часовой пояс>
+            identity, _, timestamp = line[len("author ") :].rpartition(">")
+            info["author"] = identity.split("<", 1)[0].strip()
+            parts = timestamp.split()
+            if parts:
+                info["committed_at"] = datetime.fromtimestamp(
+                    int(parts[0]), tz=timezone.utc
+                ).isoformat()
+    info["message"] = message.split("\n", 1)[0].strip()
+    return info
+
+
+def parse_count_objects(output):
+    """Размер объектной базы в МБ из git count-objects -v (значения в КиБ)"""
+    values = {}
+    for line in output.splitlines():
+        key, _, value = line.partition(":")
+        values[key.strip()] = value.strip()
+    kib = int(values.get("size", 0)) + int(values.get("size-pack", 0))
+    return round(kib / 1024, 2)
+
+
+class RepositoryStats:
+    """
+    Сведения о рабочей копии для страницы сканирования.
+
+    Собираются несколькими вызовами git без обхода истории в Python:
+    rev-list --count, cat-file commit HEAD и count-objects -v.
+    Результат кешируется на процесс по (репозиторий, HEAD).
+    """
+
+    MAX_CACHED = 64
+
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def collect(cls, repo_path):
+        if not os.path.exists(os.path.join(repo_path, ".git")):
+            logger.warning(f"Директория {repo_path} не является Git репозиторием")
+            manifest = FileManifest.for_path(repo_path)
+            return {
+                "is_git_repo": False,
+                "file_count": manifest.count(include_hidden=False),
+                "repo_size": round(
+                    manifest.total_size(include_hidden=False) / (1024 * 1024), 2
+                ),
+            }
+
+        head = _git(repo_path, "rev-parse", "HEAD").strip()
+        try:
+            origin = _git(repo_path, "config", "--get", "remote.origin.url").strip()
+        except subprocess.CalledProcessError:
+            origin = os.path.abspath(repo_path)
+
+        key = (origin, head)
+        with cls._lock:
+            info = cls._cache.get(key)
+            if info is not None:
+                cls._cache.move_to_end(key)
+                return dict(info)
+
+        info = cls._collect_git(repo_path, head)
+        with cls._lock:
+            cls._cache[key] = info
+            while len(cls._cache) > cls.MAX_CACHED:
+                cls._cache.popitem(last=False)
+        return dict(info)
+
+    @staticmethod
+    def _collect_git(repo_path, head):
+        try:
+            branch = _git(repo_path, "symbolic-ref", "--short", "-q", "HEAD").strip()
+        except subprocess.CalledProcessError:
+            branch = "detached"
+
+        commit = parse_commit(_git(repo_path, "cat-file", "commit", head))
+        manifest = FileManifest.for_path(repo_path)
+        return {
+            "is_git_repo": True,
+            "branch": branch,
+            "commit_count": int(_git(repo_path, "rev-list", "--count", head)),
+            # В shallow- и partial-клонах счетчик коммитов неполный
+            "shallow": _git(repo_path, "rev-parse", "--is-shallow-repository").strip()
+            == "true",
+            "latest_commit": head[:8],
+            "author": commit["author"],
+            "committed_at": commit["committed_at"],
+            "message": commit["message"],
+            "file_count": manifest.count(include_hidden=False),
+            "repo_size": round(
+                manifest.total_size(include_hidden=False) / (1024 * 1024), 2
+            ),
+            "git_size": parse_count_objects(_git(repo_path, "count-objects", "-v")),
+        }
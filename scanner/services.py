@@ -1,43 +1,160 @@
-import threading
-import subprocess
-import json
 import os
+from itertools import chain
+
+from django.conf import settings
+from django.utils import timezone
 
 from .email_utils import EmailNotifier
+from .metrics import ScanTimingRecorder, StageTimer, timed
 from .models import ScanRequest, ScanResult
-from .utils import download_github_repository, cleanup_repository
+from .persistence import ScanResultWriter
+from .progress import ScanProgressReporter
+from .advisories import AdvisoryDatabase
+from .blob_cache import BlobCacheSession
+from .clone_plan import plan_clone
+from .dependencies import collect_dependencies, find_manifests
+from .engines import ScanEngineRegistry
+from .exclusions import ScanExclusions
+from .history import HistorySecretScan, TruffleHogHistoryScan
+from .incremental import IncrementalScanPlan, get_head_commit
+from .native_engine import NativeSecretScan
+from .sharding import ShardedTruffleHogScan
+from .trufflehog import TruffleHogError, get_source_metadata
+from .utils import (
+    cleanup_repository,
+    download_github_repository,
+    get_repository_info,
+)
+from .walker import FileManifest
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class ScanOwnershipLost(Exception):
+    """Запрос вернули в очередь (requeue_stale), им владеет другой воркер"""
+
+
 class ScanProcessor:
     @staticmethod
     def get_trufflehog_version():
-        """Определяет версию TruffleHog"""
-        try:
-            result = subprocess.run(
-                ["trufflehog", "--version"], capture_output=True, text=True, timeout=10
+        """Определяет версию TruffleHog (результат кешируется для бинарника)"""
+        capabilities = ScanEngineRegistry.get("trufflehog")
+        return capabilities.version_tag if capabilities else "unknown"
+
+    @staticmethod
+    def select_secret_engine(scan_request):
+        """
+        Движок поиска секретов для запроса: встроенный для глубин из
+        SCAN_NATIVE_ENGINE_DEPTHS, иначе TruffleHog. Если выбранный движок
+        недоступен, используется другой.
+        """
+        preferred, fallback = "trufflehog", "native"
+        if scan_request.scan_depth in settings.SCAN_NATIVE_ENGINE_DEPTHS:
+            preferred, fallback = fallback, preferred
+
+        for name in (preferred, fallback):
+            if ScanEngineRegistry.get(name) is not None:
+                if name != preferred:
+                    logger.warning(
+                        f"Движок {preferred} недоступен, используется {name}"
+                    )
+                return name
+        raise TruffleHogError("Нет доступного движка поиска секретов")
+
+    @staticmethod
+    def process_scan(scan_request_id, worker_id=None):
+        """
+        Обрабатывает сканирование в отдельном потоке. Время и объем работы
+        этапов сохраняются в ScanStageTiming (см. metrics). worker_id -
+        воркер очереди, которому принадлежит запрос: статус, поля запроса
+        и находки записываются, только пока запрос за ним (см. _update, _writer).
+        """
+        with ScanTimingRecorder(scan_request_id).bind(), StageTimer("TOTAL"):
+            ScanProcessor._process_scan(scan_request_id, worker_id)
+
+    @staticmethod
+    def _finish(scan_request, status, error, worker_id=None):
+        """
+        Записывает итоговый статус запроса. Если запрос уже вернули в очередь
+        (requeue_stale) и им владеет другой воркер, статус не меняется.
+        Возвращает True, если статус записан.
+        """
+        if not ScanProcessor._owned(scan_request, worker_id).update(
+            status=status, error_message=error, updated_at=timezone.now()
+        ):
+            logger.warning(
+                f"Сканирование {scan_request.id} больше не принадлежит воркеру "
+                f"{worker_id}, статус {status} не записан"
             )
-            if result.returncode == 0:
-                version_output = result.stdout.strip().lower()
-                logger.info(f"TruffleHog version output: {version_output}")
-                if "v3" in version_output or "version 3" in version_output:
-                    return "v3"
-                else:
-                    return "v2"
-            return "unknown"
-        except Exception as e:
-            logger.warning(f"Не удалось определить версию TruffleHog: {e}")
-            return "unknown"
+            return False
+        scan_request.status = status
+        scan_request.error_message = error
+        return True
+
+    @staticmethod
+    def _owned(scan_request, worker_id=None):
+        """Запрос, пока он принадлежит воркеру worker_id (None - без проверки)"""
+        queryset = ScanRequest.objects.filter(id=scan_request.id)
+        if worker_id is not None:
+            queryset = queryset.filter(worker_id=worker_id)
+        return queryset
 
     @staticmethod
-    def process_scan(scan_request_id):
+    def _update(scan_request, worker_id=None, **fields):
         """
-        Обрабатывает сканирование в отдельном потоке
+        Промежуточная запись полей запроса. Если запросом уже владеет
+        другой воркер, ничего не меняется и сканирование прерывается.
         """
+        if not ScanProcessor._owned(scan_request, worker_id).update(
+            updated_at=timezone.now(), **fields
+        ):
+            raise ScanOwnershipLost(
+                f"Сканирование {scan_request.id} больше не принадлежит "
+                f"воркеру {worker_id}"
+            )
+        for name, value in fields.items():
+            setattr(scan_request, name, value)
+
+    @staticmethod
+    def _check_owner(scan_request, worker_id=None):
+        """
+        Проверка владения в транзакции пачки находок: блокировка строки
+        запроса не дает requeue_stale удалить находки между проверкой и записью.
+        """
+        if worker_id is None:
+            return
+        if not list(
+            ScanProcessor._owned(scan_request, worker_id)
+            .select_for_update()
+            .values_list("id")
+        ):
+            raise ScanOwnershipLost(
+                f"Сканирование {scan_request.id} больше не принадлежит "
+                f"воркеру {worker_id}"
+            )
+
+    @staticmethod
+    def _writer(scan_request, worker_id=None, progress=None):
+        """ScanResultWriter, который пишет пачки, только пока запрос за воркером"""
+        return ScanResultWriter(
+            progress=progress,
+            guard=lambda: ScanProcessor._check_owner(scan_request, worker_id),
+        )
+
+    @staticmethod
+    def _save_result(scan_request, worker_id=None, **fields):
+        """Служебная запись результата (ошибка, пустой результат) с проверкой владения"""
+        ScanProcessor._writer(scan_request, worker_id).write_all(
+            [ScanResult(scan_request=scan_request, **fields)]
+        )
+
+    @staticmethod
+    def _process_scan(scan_request_id, worker_id=None):
         scan_request = None
         repo_path = None
+        owned = True
+        progress = ScanProgressReporter(scan_request_id)
 
         try:
             # Получаем объект сканирования
@@ -48,59 +165,85 @@ class ScanProcessor:
             trufflehog_version = ScanProcessor.get_trufflehog_version()
             logger.info(f"Обнаружена версия TruffleHog: {trufflehog_version}")
 
-            # Обновляем статус на скачивание
-            scan_request.status = "DOWNLOADING"
-            scan_request.save()
+            # Стратегия скачивания выбирается по метаданным до начала загрузки
+            plan = plan_clone(scan_request.repository_url, scan_request.include_history)
+            if plan.refused:
+                error = f"Репозиторий не будет скачан: {plan.reason}"
+                logger.error(error)
+                if ScanProcessor._finish(scan_request, "FAILED", error, worker_id):
+                    EmailNotifier.send_scan_error_notification(scan_request, error)
+                return
 
-            # Скачиваем репозиторий
-            repo_path = download_github_repository(
-                scan_request.repository_url,
-                include_history=scan_request.include_history,
-            )
+            # Обновляем статус на скачивание
+            ScanProcessor._update(scan_request, worker_id, status="DOWNLOADING")
+            progress.stage("DOWNLOADING")
+
+            # Скачиваем репозиторий; объем рабочей копии - в тот же замер этапа
+            with StageTimer("CLONE") as clone_timer:
+                repo_path = download_github_repository(
+                    scan_request.repository_url,
+                    include_history=scan_request.include_history,
+                    plan=plan,
+                )
+                if repo_path:
+                    manifest = FileManifest.for_path(repo_path)
+                    clone_timer.add(bytes=manifest.total_size(), items=manifest.count())
 
             if not repo_path:
-                logger.error("Не удалось скачать репозиторий")
-                scan_request.status = "FAILED"
-                scan_request.error_message = "Не удалось скачать репозиторий"
-                scan_request.save()
-
-                # Отправляем уведомление об ошибке
-                EmailNotifier.send_scan_error_notification(
-                    scan_request, "Не удалось скачать репозиторий"
-                )
+                error = "Не удалось скачать репозиторий"
+                logger.error(error)
+                if ScanProcessor._finish(scan_request, "FAILED", error, worker_id):
+                    # Отправляем уведомление об ошибке
+                    EmailNotifier.send_scan_error_notification(scan_request, error)
                 return
 
-            # Сохраняем локальный путь и обновляем статус
-            scan_request.local_path = repo_path
-            scan_request.status = "SCANNING"
-            scan_request.save()
+            # Сохраняем локальный путь, сведения о репозитории и обновляем статус
+            ScanProcessor._update(
+                scan_request,
+                worker_id,
+                local_path=repo_path,
+                repository_info=get_repository_info(repo_path),
+                status="SCANNING",
+            )
+            progress.stage("SCANNING")
 
             # Запускаем сканирование с передачей версии TruffleHog
             if scan_request.scan_type == "SECRETS":
-                ScanProcessor._scan_secrets(
-                    scan_request, repo_path, trufflehog_version
-                )  # ← ДОБАВЬТЕ АРГУМЕНТ
+                status, error = ScanProcessor._scan_secrets(
+                    scan_request, repo_path, trufflehog_version, progress, worker_id
+                )
             else:
-                ScanProcessor._scan_dependencies(scan_request, repo_path)
+                status, error = ScanProcessor._scan_dependencies(
+                    scan_request, repo_path, progress, worker_id
+                )
 
-            scan_request.status = "COMPLETED"
-            scan_request.save()
+            if not ScanProcessor._finish(scan_request, status, error, worker_id):
+                return
 
-            logger.info(f"=== СКАНИРОВАНИЕ {scan_request_id} ЗАВЕРШЕНО ===")
+            logger.info(f"=== СКАНИРОВАНИЕ {scan_request_id} ЗАВЕРШЕНО: {status} ===")
 
-            # Отправляем уведомление о завершении сканирования
-            EmailNotifier.send_scan_completion_notification(scan_request)
+            if status == "FAILED":
+                EmailNotifier.send_scan_error_notification(scan_request, error)
+            else:
+                # Отправляем уведомление о завершении сканирования
+                EmailNotifier.send_scan_completion_notification(scan_request)
 
+        except ScanOwnershipLost as e:
+            # Запрос обрабатывает другой воркер: его статус и находки не трогаем
+            owned = False
+            logger.warning(f"Сканирование прервано: {e}")
         except Exception as e:
             logger.error(f"ОШИБКА при обработке сканирования {scan_request_id}: {e}")
-            if scan_request:
-                scan_request.status = "FAILED"
-                scan_request.error_message = str(e)
-                scan_request.save()
-
+            if scan_request and ScanProcessor._finish(
+                scan_request, "FAILED", str(e), worker_id
+            ):
                 # Отправляем уведомление об ошибке
                 EmailNotifier.send_scan_error_notification(scan_request, str(e))
         finally:
+            # Подписчики SSE узнают о завершении сразу, а не по таймауту
+            if scan_request and owned:
+                progress.stage(scan_request.status)
+
             # Очищаем временные файлы
             if repo_path:
                 try:
@@ -111,25 +254,143 @@ class ScanProcessor:
                     )
 
     @staticmethod
-    def _scan_secrets(scan_request, repo_path, trufflehog_version):
+    def _scan_secrets(
+        scan_request, repo_path, trufflehog_version, progress=None, worker_id=None
+    ):
         """
         Сканирует репозиторий на наличие секретов с помощью TruffleHog
+        или встроенного движка (см. select_secret_engine).
+        Возвращает (статус, сообщение об ошибке): COMPLETED, PARTIAL
+        (часть шардов не отсканирована) или FAILED.
         """
         try:
-            logger.info(
-                f"Запуск TruffleHog {trufflehog_version} для сканирования секретов: {repo_path}"
+            engine = ScanProcessor.select_secret_engine(scan_request)
+            ScanProcessor._update(scan_request, worker_id, engine=engine)
+            if engine == "trufflehog":
+                logger.info(
+                    f"Запуск TruffleHog {trufflehog_version} для сканирования секретов: {repo_path}"
+                )
+            else:
+                logger.info(
+                    f"Запуск встроенного движка для сканирования секретов: {repo_path}"
+                )
+            if scan_request.include_history and get_head_commit(repo_path):
+                # История сканируется по объектам git целиком: инкрементальный
+                # режим и кеш блобов рассчитаны на одну рабочую копию
+                plan = IncrementalScanPlan(get_head_commit(repo_path))
+                carried = cached = ()
+                exclusions = None
+                blob_cache = BlobCacheSession(repo_path, engine=None)
+                scan = ScanProcessor._scan_history(engine, repo_path)
+            elif ScanProcessor._scans_whole_tree_only(engine):
+                # TruffleHog v2 не принимает список файлов: перенос находок и
+                # кеш блобов отключаются, иначе находки полного прогона задублируют их
+                logger.warning(
+                    "TruffleHog не сканирует отдельные файлы: инкрементальный "
+                    "режим и кеш блобов отключены"
+                )
+                plan = IncrementalScanPlan(get_head_commit(repo_path))
+                carried = cached = ()
+                exclusions = ScanExclusions.build(
+                    repo_path, scan_request.exclude_patterns
+                )
+                blob_cache = BlobCacheSession(repo_path, engine=None)
+                scan = ScanProcessor._scan_with_trufflehog_brew(repo_path)
+            else:
+                plan = IncrementalScanPlan.build(scan_request, repo_path, engine)
+                # Вендорный код, сборки, lock-файлы, бинарные и большие файлы
+                exclusions = ScanExclusions.build(
+                    repo_path, scan_request.exclude_patterns
+                )
+
+                carried = ()
+                paths = None
+                if plan.is_incremental:
+                    # Находки в неизмененных файлах переносятся из прошлого сканирования
+                    carried = plan.carried_forward_results(scan_request)
+                    paths = [
+                        path
+                        for path in plan.changed_files
+                        if os.path.isfile(os.path.join(repo_path, path))
+                    ]
+
+                # Блобы, уже встречавшиеся в других репозиториях, не сканируются повторно
+                blob_cache = BlobCacheSession(
+                    repo_path, paths, engine=ScanEngineRegistry.cache_key(engine)
+                )
+                cached = blob_cache.cached_results(scan_request)
+                paths = blob_cache.paths_to_scan
+                if exclusions.excluded:
+                    # Старые находки в исключенных файлах не переносятся
+                    carried = exclusions.drop_results(carried)
+                    cached = exclusions.drop_results(cached)
+
+                scan = None
+                if paths is None or paths:
+                    scan = (
+                        ScanProcessor._scan_with_trufflehog_brew(repo_path, paths)
+                        if engine == "trufflehog"
+                        else NativeSecretScan(repo_path, paths)
+                    )
+            findings = scan if scan is not None else ()
+            if scan is not None:
+                scan.progress = progress
+                if exclusions is not None:
+                    scan.exclusions = exclusions
+
+            # Находки сохраняются пачками по мере поступления из движка
+            results = (
+                ScanProcessor._build_secret_result(scan_request, finding, repo_path)
+                for finding in findings
+            )
+            results = (result for result in results if result is not None)
+            if exclusions is not None and exclusions.excluded:
+                # Движок без --exclude-paths и списка файлов сканирует все дерево
+                results = exclusions.drop_results(results)
+            saved = ScanProcessor._writer(scan_request, worker_id, progress).write_all(
+                chain(carried, cached, results), atomic=False
+            )
+            failed_paths = scan.failed_paths if scan is not None else set()
+            # Неотсканированные исключенные файлы не должны попасть в кеш как чистые
+            skipped = set(exclusions.excluded) if exclusions is not None else set()
+            blob_cache.commit(scan_request, exclude_paths=failed_paths | skipped)
+
+            if failed_paths:
+                # Неотсканированные файлы не должны выглядеть как чистые
+                error = (
+                    f"Не удалось отсканировать {len(failed_paths)} файлов "
+                    f"({len(scan.failed_shards)} шардов)"
+                )
+                ScanProcessor._save_result(
+                    scan_request,
+                    worker_id,
+                    status=False,
+                    file_path="SYSTEM",
+                    str_number=0,
+                    bug_type="SECRETS",
+                    error_message=error,
+                    raw_context="\n".join(sorted(failed_paths)[:100]),
+                )
+                logger.warning(error)
+                return "PARTIAL", error
+
+            # Коммит запоминается только для полного сканирования - база инкремента
+            ScanProcessor._update(
+                scan_request,
+                worker_id,
+                commit_sha=plan.head_sha,
+                base_commit_sha=(
+                    plan.base_scan.commit_sha if plan.is_incremental else None
+                ),
             )
-            findings = ScanProcessor._scan_with_trufflehog_brew(repo_path)
 
-            # Обрабатываем результаты
-            if findings:
-                for finding in findings:
-                    ScanProcessor._save_secret_finding(scan_request, finding)
-                logger.info(f"Успешно сохранено {len(findings)} находок")
+            if saved:
+                logger.info(f"Успешно сохранено {saved} находок")
             else:
                 # Если ничего не найдено, создаем запись об успешном сканировании без находок
-                ScanResult.objects.create(
-                    scan_request=scan_request,
+                ScanProcessor._save_result(
+                    scan_request,
+                    worker_id,
                     status=False,
                     file_path="SYSTEM",
                     str_number=0,
@@ -137,139 +398,83 @@ class ScanProcessor:
                     description="Сканирование завершено. Секреты не найдены.",
                 )
                 logger.info("Сканирование завершено, секреты не найдены")
+            return "COMPLETED", None
 
+        except ScanOwnershipLost:
+            raise
         except Exception as e:
             logger.error(f"Критическая ошибка при сканировании секретов: {e}")
-            ScanResult.objects.create(
-                scan_request=scan_request,
+            error = f"Ошибка сканирования: {str(e)[:500]}"
+            ScanProcessor._save_result(
+                scan_request,
+                worker_id,
                 status=False,
                 file_path="SYSTEM",
                 str_number=0,
                 bug_type="SECRETS",
-                error_message=f"Ошибка сканирования: {str(e)[:500]}",
+                error_message=error,
             )
+            return "FAILED", error
+
+    @staticmethod
+    def _scans_whole_tree_only(engine):
+        """Движок не умеет сканировать список файлов (TruffleHog v2)"""
+        if engine != "trufflehog":
+            return False
+        capabilities = ScanEngineRegistry.get("trufflehog")
+        return capabilities is not None and not capabilities.accepts_paths
 
     @staticmethod
-    def _scan_with_trufflehog_brew(repo_path):
+    def _scan_with_trufflehog_brew(repo_path, paths=None):
         """
-        Сканирование с помощью TruffleHog v3 из brew
+        Сканирование TruffleHog с флагами, подобранными по возможностям бинарника.
+        Большие репозитории и списки файлов (paths) делятся на шарды,
+        которые сканируются параллельно. Возвращает итерируемый
+        ShardedTruffleHogScan; после итерации в failed_shards - неудачные шарды.
         """
-        command_variants = [
-            ["trufflehog", "filesystem", repo_path, "--json"],
-            # С отключенной верификацией
-            ["trufflehog", "filesystem", repo_path, "--json", "--no-verification"],
-            # С дополнительными опциями
-            ["trufflehog", "filesystem", repo_path, "--json", "--only-verified=false"],
-            # С включенной историей git
-            [
-                "trufflehog",
-                "filesystem",
-                repo_path,
-                "--json",
-                "--since-commit",
-                "HEAD~100",
-            ],
-        ]
-
-        for i, scan_args in enumerate(command_variants):
-            logger.info(f"Попытка brew.{i + 1}: {' '.join(scan_args)}")
-
-            try:
-                result = subprocess.run(
-                    scan_args,
-                    capture_output=True,
-                    text=True,
-                    timeout=300,
-                    cwd=repo_path,
-                )
-
-                logger.info(
-                    f"TruffleHog brew.{i + 1} завершился с кодом: {result.returncode}"
-                )
-                logger.info(f"Stdout длина: {len(result.stdout)}")
-                logger.info(
-                    f"Stderr: {result.stderr[:500] if result.stderr else 'None'}"
-                )
+        capabilities = ScanEngineRegistry.get("trufflehog")
+        if capabilities is None:
+            raise TruffleHogError("TruffleHog не установлен")
 
-                if result.returncode == 0 and result.stdout.strip():
-                    findings = ScanProcessor._parse_trufflehog_output(result.stdout)
-                    if findings:
-                        logger.info(f"Найдено {len(findings)} валидных результатов")
-                        return findings
-                    else:
-                        logger.info("Найдены результаты, но они пустые или невалидные")
-                else:
-                    logger.warning(f"Вариант brew.{i + 1} не сработал")
-
-            except subprocess.TimeoutExpired:
-                logger.error("TruffleHog превысил время выполнения")
-                break
-            except Exception as e:
-                logger.warning(f"Ошибка в варианте brew.{i + 1}: {e}")
-                continue
-
-        return []
+        return ShardedTruffleHogScan(capabilities, repo_path, paths)
 
     @staticmethod
-    def _parse_trufflehog_output(output):
-        findings = []
-        valid_lines = 0
-        invalid_lines = 0
-
-        for line in output.strip().split("\n"):
-            if line.strip():
-                try:
-                    finding = json.loads(line)
-
-                    # Проверяем, что это валидная находка
-                    if isinstance(finding, dict):
-                        # Для TruffleHog v3 ключи могут быть разными
-                        detector_name = (
-                            finding.get("DetectorName")
-                            or finding.get("detectorName")
-                            or finding.get("Detector")
-                            or finding.get("detector")
-                        )
-
-                        if detector_name:
-                            findings.append(finding)
-                            valid_lines += 1
-                        else:
-                            invalid_lines += 1
-                    else:
-                        invalid_lines += 1
-
-                except json.JSONDecodeError as e:
-                    logger.warning(
-                        f"Не удалось распарсить JSON: {line[:100]}..., ошибка: {e}"
-                    )
-                    invalid_lines += 1
-                    continue
-
-        logger.info(
-            f"Парсинг завершен: {valid_lines} валидных, {invalid_lines} невалидных строк"
-        )
-        return findings
+    def _scan_history(engine, repo_path):
+        """
+        Сканирование всей истории коммитов: trufflehog git, если бинарник
+        его поддерживает, иначе встроенный движок по уникальным блобам.
+        """
+        capabilities = ScanEngineRegistry.get("trufflehog")
+        if engine == "trufflehog" and capabilities is not None:
+            return TruffleHogHistoryScan(capabilities, repo_path)
+        return HistorySecretScan(repo_path)
 
     @staticmethod
-    def _save_secret_finding(scan_request, finding):
+    def _build_secret_result(scan_request, finding, repo_path=None):
         """
-        Сохраняет найденный секрет в базу данных
+        Преобразует находку TruffleHog в несохраненный ScanResult.
+        Пути внутри repo_path сохраняются относительными.
         """
         try:
+            source = get_source_metadata(finding)
+
             file_path = (
                 finding.get("Path")
                 or finding.get("path")
                 or finding.get("File")
                 or finding.get("file")
+                or source.get("file")
                 or "Unknown"
             )
+            if repo_path and os.path.isabs(file_path):
+                file_path = os.path.relpath(file_path, repo_path)
 
             line_number = (
                 finding.get("Line")
                 or finding.get("line")
                 or finding.get("LineNumber")
                 or finding.get("lineNumber")
+                or source.get("line")
                 or 1
             )
 
@@ -316,8 +521,11 @@ class ScanProcessor:
 
             readable_type = description_map.get(secret_type, secret_type)
 
-            # Создаем запись результата
-            ScanResult.objects.create(
+            # Коммит и автор есть только у находок из истории
+            commit_sha = source.get("commit") or finding.get("commitHash")
+            author = source.get("email")
+
+            return ScanResult(
                 scan_request=scan_request,
                 status=True,
                 file_path=file_path,
@@ -327,73 +535,138 @@ class ScanProcessor:
                 confidence=confidence,
                 raw_context=raw,
                 description=f"Найден {readable_type} (уверенность: {confidence})",
+                commit_sha=(commit_sha or "")[:40] or None,
+                author=(author or "")[:255] or None,
             )
 
-            logger.info(f"Сохранена находка: {file_path}:{line_number} - {secret_type}")
-
         except Exception as e:
-            logger.error(f"Ошибка при сохранении finding: {e}")
+            logger.error(f"Ошибка при обработке finding: {e}")
+            return None
 
     @staticmethod
-    def _scan_dependencies(scan_request, repo_path):
+    @timed("DEPENDENCIES")
+    def _scan_dependencies(scan_request, repo_path, progress=None, worker_id=None):
+        """
+        Ищет уязвимые версии зависимостей по локальной базе OSV
+        (DEPENDENCY_ADVISORY_DB). Возвращает (статус, сообщение об ошибке).
+        """
         try:
             logger.info(f"Сканирование зависимостей для: {repo_path}")
 
-            # Ищем файлы зависимостей
-            dependency_files = []
-            for root, dirs, files in os.walk(repo_path):
-                # Игнорируем скрытые директории
-                dirs[:] = [d for d in dirs if not d.startswith(".")]
-                for file in files:
-                    if file in [
-                        "requirements.txt",
-                        "package.json",
-                        "pom.xml",
-                        "build.gradle",
-                        "composer.json",
-                    ]:
-                        full_path = os.path.join(root, file)
-                        dependency_files.append(full_path)
-
-            if dependency_files:
-                for file_path in dependency_files[:5]:
-                    rel_path = os.path.relpath(file_path, repo_path)
-                    ScanResult.objects.create(
+            manifests = find_manifests(FileManifest.for_path(repo_path))
+            if not manifests:
+                ScanProcessor._save_result(
+                    scan_request,
+                    worker_id,
+                    status=False,
+                    file_path="ROOT",
+                    str_number=0,
+                    bug_type="DEPENDENCIES",
+                    description="Файлы зависимостей не найдены",
+                )
+                return "COMPLETED", None
+
+            advisories = AdvisoryDatabase.load()
+            if advisories is None:
+                # Без базы уязвимостей только перечисляем найденные файлы
+                logger.warning(
+                    f"База уязвимостей {settings.DEPENDENCY_ADVISORY_DB} не найдена, "
+                    f"уязвимости зависимостей не проверяются"
+                )
+                ScanProcessor._writer(scan_request, worker_id, progress).write_all(
+                    ScanResult(
                         scan_request=scan_request,
                         status=True,
-                        file_path=rel_path,
+                        file_path=path,
                         str_number=1,
                         bug_type="DEPENDENCIES",
-                        description="Файл зависимостей найден",
+                        description=(
+                            "Файл зависимостей найден (база уязвимостей "
+                            "не настроена, версии не проверены)"
+                        ),
                     )
-            else:
-                ScanResult.objects.create(
+                    for path in manifests
+                )
+                return "COMPLETED", None
+
+            if progress is not None:
+                progress.set_totals(len(manifests), 0)
+            dependencies, errors = collect_dependencies(repo_path, manifests)
+            StageTimer.current().add(items=len(dependencies))
+            if progress is not None:
+                progress.add_files(len(manifests))
+            results = (
+                ScanProcessor._build_dependency_result(
+                    scan_request, dependency, advisory
+                )
+                for dependency in dependencies
+                for advisory in advisories.lookup(
+                    dependency.ecosystem, dependency.name, dependency.version
+                )
+            )
+            parse_errors = (
+                ScanResult(
                     scan_request=scan_request,
                     status=False,
+                    file_path=path,
+                    str_number=0,
+                    bug_type="DEPENDENCIES",
+                    error_message=f"Не удалось разобрать файл: {error}",
+                )
+                for path, error in errors.items()
+            )
+            saved = ScanProcessor._writer(scan_request, worker_id, progress).write_all(
+                chain(results, parse_errors)
+            )
+
+            if saved == len(errors):
+                ScanProcessor._save_result(
+                    scan_request,
+                    worker_id,
+                    status=False,
                     file_path="ROOT",
                     str_number=0,
                     bug_type="DEPENDENCIES",
-                    description="Файлы зависимостей не найдены",
+                    description=(
+                        f"Проверено зависимостей: {len(dependencies)} "
+                        f"в {len(manifests)} файлах. Уязвимости не найдены."
+                    ),
                 )
+            logger.info(
+                f"Зависимостей: {len(dependencies)}, уязвимостей: {saved - len(errors)}"
+            )
+            return "COMPLETED", None
 
+        except ScanOwnershipLost:
+            raise
         except Exception as e:
             logger.error(f"Ошибка при сканировании зависимостей: {e}")
-            ScanResult.objects.create(
-                scan_request=scan_request,
+            error = str(e)[:500]
+            ScanProcessor._save_result(
+                scan_request,
+                worker_id,
                 status=False,
                 file_path="SYSTEM",
                 str_number=0,
                 bug_type="DEPENDENCIES",
-                error_message=str(e)[:500],
+                error_message=error,
             )
+            return "FAILED", error
 
     @staticmethod
-    def start_scan_async(scan_request_id):
-        """
-        Запускает сканирование в отдельном потоке
-        """
-        thread = threading.Thread(
-            target=ScanProcessor.process_scan, args=(scan_request_id,)
+    def _build_dependency_result(scan_request, dependency, advisory):
+        fixed = f", исправлено в {advisory.fixed}" if advisory.fixed else ""
+        return ScanResult(
+            scan_request=scan_request,
+            status=True,
+            file_path=dependency.file_path,
+            str_number=dependency.line,
+            bug_type="DEPENDENCIES",
+            secret_type=advisory.id[:100],
+            confidence=advisory.confidence,
+            raw_context=f"{dependency.name}@{dependency.version}",
+            description=(
+                f"Уязвимая зависимость {dependency.name} {dependency.version} "
+                f"({dependency.ecosystem}): {advisory.summary}{fixed}"
+            ),
         )
-        thread.daemon = True
-        thread.start()
@@ -0,0 +1,224 @@
+import heapq
+import math
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
+
+from django.conf import settings
+
+from .trufflehog import TruffleHogError, TruffleHogProcess, check_process
+from .walker import FileManifest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Shard:
+    """
+    Набор файлов, сканируемый одним запуском TruffleHog;
+    paths=None - рабочая копия целиком.
+    """
+
+    def __init__(self, paths, size=0, attempt=1):
+        self.paths = paths
+        self.size = size
+        self.attempt = attempt
+
+    def split(self):
+        """Делит шард пополам для повтора после таймаута"""
+        middle = len(self.paths) // 2
+        return [
+            Shard(self.paths[:middle], self.size // 2, self.attempt + 1),
+            Shard(self.paths[middle:], self.size - self.size // 2, self.attempt + 1),
+        ]
+
+
+def plan_shards(repo_path, paths=None, workers=None, exclusions=None):
+    """
+    Разбивает файлы на шарды, сбалансированные по суммарному размеру
+    (жадно: самый большой файл - в самый легкий шард). Файлы из
+    exclusions (exclusions.ScanExclusions) в шарды не попадают.
+    Возвращает None, если репозиторий достаточно мал для одного запуска.
+    """
+    workers = workers or settings.SCAN_SHARD_WORKERS
+    max_paths = settings.TRUFFLEHOG_MAX_PATHS_PER_RUN
+    sizes = FileManifest.for_path(repo_path).sizes(paths)
+    if exclusions is not None:
+        sizes = [
+            (path, size) for path, size in sizes if path not in exclusions.excluded
+        ]
+
+    total = sum(size for _, size in sizes)
+    if paths is None and (workers <= 1 or total < settings.SCAN_SHARD_MIN_BYTES):
+        return None
+
+    count = max(
+        1,
+        min(workers, len(sizes)),
+        math.ceil(len(sizes) / max_paths),
+    )
+    heap = [(0, index, Shard([])) for index in range(count)]
+    full = []
+    for path, size in sorted(sizes, key=lambda item: item[1], reverse=True):
+        _, index, shard = heapq.heappop(heap)
+        shard.paths.append(path)
+        shard.size += size
+        if len(shard.paths) >= max_paths:
+            # Шард, упершийся в лимит путей, больше не участвует в распределении
+            full.append(shard)
+        else:
+            heapq.heappush(heap, (shard.size, index, shard))
+
+    shards = full + [shard for _, _, shard in heap if shard.paths]
+    logger.info(
+        f"Файлов: {len(sizes)}, {total / (1024 * 1024):.1f} МБ, шардов: {len(shards)}"
+    )
+    return shards
+
+
+class ShardedTruffleHogScan:
+    """
+    Сканирование TruffleHog по шардам в пуле параллельных процессов.
+
+    Находки шарда отдаются после его успешного завершения, поэтому повтор
+    упавшего или превысившего время шарда не создает дубликатов. Шарды,
+    не прошедшие после SCAN_SHARD_RETRIES повторов, попадают в failed_shards.
+    Небольшой репозиторий сканируется одним запуском по всему каталогу
+    с той же политикой: при ошибке он делится на шарды по файлам.
+    """
+
+    # progress.ScanProgressReporter, если ход сканирования нужно публиковать
+    progress = None
+    # exclusions.ScanExclusions - файлы, которые не нужно сканировать
+    exclusions = None
+
+    def __init__(self, capabilities, repo_path, paths=None):
+        self.capabilities = capabilities
+        self.repo_path = repo_path
+        self.paths = paths
+        self.failed_shards = []
+
+    @property
+    def failed_paths(self):
+        return {
+            path
+            for shard in self.failed_shards
+            for path in (shard.paths if shard.paths is not None else self._tree_paths())
+        }
+
+    def _tree_paths(self):
+        """Файлы, которые сканирует запуск по всему каталогу"""
+        if self.paths is not None:
+            return list(self.paths)
+        if self.exclusions is not None:
+            return self.exclusions.included
+        return [entry.path for entry in FileManifest.for_path(self.repo_path).files()]
+
+    def __iter__(self):
+        paths = self.paths
+        if (
+            paths is None
+            and self.exclusions is not None
+            and self.exclusions.excluded
+            and self.capabilities.accepts_paths
+            and not self.capabilities.supports("--exclude-paths", "filesystem")
+        ):
+            # Без --exclude-paths исключения передаются явным списком файлов
+            paths = self.exclusions.included
+
+        # TruffleHog v2 не принимает список файлов - только целиком
+        shards = (
+            plan_shards(self.repo_path, paths, exclusions=self.exclusions)
+            if self.capabilities.accepts_paths
+            else None
+        )
+        if shards is None:
+            shards = [Shard(None, self._tree_size())]
+
+        if self.progress is not None:
+            self.progress.set_totals(
+                sum(len(shard.paths or self._tree_paths()) for shard in shards),
+                sum(shard.size for shard in shards),
+            )
+
+        completed = 0
+        with ThreadPoolExecutor(max_workers=settings.SCAN_SHARD_WORKERS) as executor:
+            # Копия контекста переносит в поток текущий ScanTimingRecorder
+            pending = {
+                executor.submit(copy_context().run, self._run_shard, shard): shard
+                for shard in shards
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    shard = pending.pop(future)
+                    try:
+                        findings = future.result()
+                    except TruffleHogError as e:
+                        for retry in self._retry(shard, e):
+                            future = executor.submit(
+                                copy_context().run, self._run_shard, retry
+                            )
+                            pending[future] = retry
+                        continue
+                    completed += 1
+                    yield from findings
+                    if self.progress is not None:
+                        self.progress.add_files(
+                            len(shard.paths or self._tree_paths()), shard.size
+                        )
+
+        if self.failed_shards and not completed:
+            raise TruffleHogError("Ни один шард не удалось отсканировать")
+
+    def _retry(self, shard, error):
+        name = (
+            "Каталог" if shard.paths is None else f"Шард из {len(shard.paths)} файлов"
+        )
+        if shard.attempt > settings.SCAN_SHARD_RETRIES:
+            logger.error(f"{name} не отсканирован: {error}")
+            self.failed_shards.append(shard)
+            return []
+
+        logger.warning(f"{name}: повтор после ошибки: {error}")
+        if shard.paths is None:
+            # TruffleHog v2 можно только перезапустить целиком
+            paths = self._tree_paths() if self.capabilities.accepts_paths else []
+            if len(paths) <= 1:
+                return [Shard(None, shard.size, shard.attempt + 1)]
+            shard = Shard(paths, shard.size, shard.attempt)
+        if len(shard.paths) > 1:
+            return shard.split()
+        return [Shard(shard.paths, shard.size, shard.attempt + 1)]
+
+    def _tree_size(self):
+        if self.exclusions is not None and self.exclusions.excluded:
+            return self.exclusions.included_size()
+        return FileManifest.for_path(self.repo_path).total_size()
+
+    def _run_shard(self, shard):
+        paths = shard.paths
+        exclude_file = None
+        if paths is None:
+            # Со списком файлов сюда попадает только v2 - и получает ошибку
+            paths = self.paths
+            if self.exclusions is not None and self.exclusions.excluded:
+                exclude_file = self.exclusions.exclude_file()
+        try:
+            args = self.capabilities.build_filesystem_command(
+                self.repo_path, paths, exclude_file=exclude_file
+            )
+            if shard.paths is None:
+                logger.info(f"Запуск: {' '.join(args)}")
+            process = TruffleHogProcess(
+                args,
+                cwd=self.repo_path,
+                timeout=settings.TRUFFLEHOG_TIMEOUT,
+                size=shard.size,
+            )
+            findings = list(process)
+            check_process(process)
+            return findings
+        finally:
+            if exclude_file:
+                os.remove(exclude_file)
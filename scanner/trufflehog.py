@@ -0,0 +1,291 @@
+import json
+import os
+import re
+import subprocess
+import threading
+from collections import deque
+
+from django.conf import settings
+import logging
+
+from .metrics import StageTimer
+
+logger = logging.getLogger(__name__)
+
+FLAG_RE = re.compile(r"--[a-z0-9][a-z0-9-]*")
+
+
+def get_detector_name(finding):
+    # Для TruffleHog v3 ключи могут быть разными
+    return (
+        finding.get("DetectorName")
+        or finding.get("detectorName")
+        or finding.get("Detector")
+        or finding.get("detector")
+    )
+
+
+def get_source_metadata(finding):
+    """
+    Метаданные источника TruffleHog v3: SourceMetadata.Data.<Filesystem|Git>
+    (file, line, commit, email и т.д.). Пустой dict, если их нет.
+    """
+    data = (finding.get("SourceMetadata") or {}).get("Data") or {}
+    for value in data.values():
+        if isinstance(value, dict):
+            return value
+    return {}
+
+
+def parse_trufflehog_line(line):
+    """
+    Разбирает одну строку JSON-вывода TruffleHog.
+    Возвращает находку или None, если строка невалидна.
+    """
+    line = line.strip()
+    if not line:
+        return None
+
+    try:
+        finding = json.loads(line)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Не удалось распарсить JSON: {line[:100]}..., ошибка: {e}")
+        return None
+
+    if isinstance(finding, dict) and get_detector_name(finding):
+        return finding
+    return None
+
+
+class TruffleHogProcess:
+    """
+    Запускает TruffleHog через Popen и отдает находки по мере их появления
+    в stdout, не накапливая весь вывод в памяти.
+
+        process = TruffleHogProcess(["trufflehog", "filesystem", path, "--json"])
+        for finding in process:
+            ...
+    """
+
+    STDERR_TAIL_LINES = 20
+
+    def __init__(self, args, cwd=None, timeout=300, size=0):
+        self.args = args
+        self.cwd = cwd
+        self.timeout = timeout
+        # Объем сканируемых файлов, байт - только для метрик этапа TRUFFLEHOG
+        self.size = size
+
+        self.returncode = None
+        self.timed_out = False
+        self.valid_lines = 0
+        self.invalid_lines = 0
+        self._stderr_tail = deque(maxlen=self.STDERR_TAIL_LINES)
+
+    @property
+    def stderr(self):
+        return "".join(self._stderr_tail)
+
+    def __iter__(self):
+        with StageTimer("TRUFFLEHOG", bytes=self.size) as timer:
+            try:
+                yield from self._run()
+            finally:
+                timer.add(items=self.valid_lines)
+
+    def _run(self):
+        process = subprocess.Popen(
+            self.args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            cwd=self.cwd,
+        )
+
+        # stderr читаем в отдельном потоке, иначе переполненный pipe заблокирует процесс
+        stderr_thread = threading.Thread(
+            target=self._drain_stderr, args=(process.stderr,), daemon=True
+        )
+        stderr_thread.start()
+
+        timer = threading.Timer(self.timeout, self._kill, args=(process,))
+        timer.start()
+
+        try:
+            for line in process.stdout:
+                if not line.strip():
+                    continue
+                finding = parse_trufflehog_line(line)
+                if finding is None:
+                    self.invalid_lines += 1
+                    continue
+                self.valid_lines += 1
+                yield finding
+        finally:
+            timer.cancel()
+            if process.poll() is None:
+                # Потребитель прервал итерацию раньше времени
+                process.kill()
+            process.stdout.close()
+            self.returncode = process.wait()
+            stderr_thread.join()
+
+            logger.info(
+                f"TruffleHog завершился с кодом {self.returncode}: "
+                f"{self.valid_lines} валидных, {self.invalid_lines} невалидных строк"
+            )
+
+    def _drain_stderr(self, stream):
+        for line in stream:
+            self._stderr_tail.append(line)
+        stream.close()
+
+    def _kill(self, process):
+        self.timed_out = True
+        logger.error("TruffleHog превысил время выполнения")
+        process.kill()
+
+
+def check_process(process):
+    """Исключение, если процесс TruffleHog превысил время или завершился с ошибкой"""
+    # Отсутствие находок - корректный результат, повторный запуск не нужен
+    if process.timed_out:
+        raise TruffleHogError(
+            f"TruffleHog превысил время выполнения ({process.timeout} с)"
+        )
+    if process.returncode != 0:
+        raise TruffleHogError(
+            f"TruffleHog завершился с кодом {process.returncode}: "
+            f"{process.stderr[-500:]}"
+        )
+
+
+class TruffleHogError(RuntimeError):
+    pass
+
+
+class TruffleHogCapabilities:
+    """
+    Возможности конкретного бинарника TruffleHog: версия, подкоманды и флаги,
+    извлеченные из вывода --version и --help.
+    """
+
+    SUBCOMMANDS = ("filesystem", "git")
+
+    def __init__(self, path, version, commands, flags):
+        self.path = path
+        self.version = version
+        self.commands = commands
+        self.flags = flags
+
+    @property
+    def major(self):
+        match = re.search(r"(\d+)\.\d+", self.version or "")
+        return int(match.group(1)) if match else None
+
+    @property
+    def version_tag(self):
+        if self.major is not None:
+            return f"v{self.major}"
+        if "filesystem" in self.commands:
+            return "v3"
+        if self.flags.get(""):
+            return "v2"
+        return "unknown"
+
+    @property
+    def sources(self):
+        # TruffleHog v2 без подкоманд сканирует только git-репозитории
+        return list(self.commands) or ["git"]
+
+    def as_dict(self):
+        return {
+            "path": self.path,
+            "version": self.version,
+            "version_tag": self.version_tag,
+            "sources": self.sources,
+        }
+
+    @property
+    def accepts_paths(self):
+        """Можно ли передать список файлов (TruffleHog v2 сканирует только каталог)"""
+        return "filesystem" in self.commands
+
+    def supports(self, flag, command=""):
+        return flag in self.flags.get(command, ()) or flag in self.flags.get("", ())
+
+    def build_filesystem_command(self, repo_path, paths=None, exclude_file=None):
+        """
+        Единственный корректный вызов для сканирования рабочей копии.
+        paths - относительные пути файлов, если сканируется только их подмножество,
+        exclude_file - файл регулярных выражений для --exclude-paths.
+        """
+        if "filesystem" in self.commands:
+            targets = [os.path.join(repo_path, path) for path in paths or ()]
+            args = [self.path, "filesystem", *(targets or [repo_path]), "--json"]
+            if self.supports("--no-update"):
+                args.append("--no-update")
+            if not settings.TRUFFLEHOG_VERIFY and self.supports("--no-verification"):
+                args.append("--no-verification")
+            if exclude_file and self.supports("--exclude-paths", "filesystem"):
+                args.extend(["--exclude-paths", exclude_file])
+            return args
+
+        # TruffleHog v2 умеет сканировать только git-репозитории целиком;
+        # молча отсканировать все дерево вместо paths нельзя - находки
+        # задублируют перенесенные и взятые из кеша
+        if paths:
+            raise TruffleHogError(
+                f"TruffleHog {self.version_tag} не сканирует отдельные файлы"
+            )
+        return [self.path, "--json", "--regex", "file://" + repo_path]
+
+    def build_git_command(self, repo_path):
+        """Сканирование всей истории коммитов локального репозитория"""
+        if "git" in self.commands:
+            args = [self.path, "git", "file://" + repo_path, "--json"]
+            if self.supports("--no-update"):
+                args.append("--no-update")
+            if not settings.TRUFFLEHOG_VERIFY and self.supports("--no-verification"):
+                args.append("--no-verification")
+            return args
+
+        return [self.path, "--json", "--regex", "file://" + repo_path]
+
+
+def probe_capabilities(path):
+    """Определяет возможности бинарника TruffleHog по его справке"""
+    version = parse_version(run_help([path, "--version"]))
+
+    help_output = run_help([path, "--help"])
+    commands = [
+        command
+        for command in TruffleHogCapabilities.SUBCOMMANDS
+        if re.search(rf"^\s+{command}\b", help_output, re.MULTILINE)
+    ]
+    flags = {"": set(FLAG_RE.findall(help_output))}
+    for command in commands:
+        flags[command] = set(FLAG_RE.findall(run_help([path, command, "--help"])))
+
+    capabilities = TruffleHogCapabilities(path, version, commands, flags)
+    logger.info(
+        f"TruffleHog {capabilities.version_tag} ({version}) по пути {path}, "
+        f"команды: {commands}"
+    )
+    return capabilities
+
+
+def parse_version(output):
+    match = re.search(r"\d+\.\d+(\.\d+)?", output)
+    return match.group(0) if match else None
+
+
+def run_help(args):
+    try:
+        result = subprocess.run(args, capture_output=True, text=True, timeout=10)
+        # kingpin и argparse пишут справку в разные потоки
+        return result.stdout + result.stderr
+    except Exception as e:
+        logger.warning(f"Не удалось выполнить {' '.join(args)}: {e}")
+        return ""
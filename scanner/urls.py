@@ -5,4 +5,20 @@ urlpatterns = [
     path("create/", views.create_scan_request, name="create_scan_request"),
     path("", views.scan_requests_list, name="scan_requests_list"),
     path("<int:pk>/", views.scan_request_detail, name="scan_request_detail"),
+    path(
+        "<int:pk>/results/<int:result_id>/",
+        views.scan_result_detail,
+        name="scan_result_detail",
+    ),
+    path(
+        "<int:pk>/progress/",
+        views.scan_progress_stream,
+        name="scan_progress_stream",
+    ),
+    path(
+        "<int:pk>/export/<str:format>/",
+        views.export_scan_results,
+        name="export_scan_results",
+    ),
+    path("engines/", views.scan_engines, name="scan_engines"),
 ]
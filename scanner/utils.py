@@ -3,38 +3,86 @@ import tempfile
 import shutil
 import requests
 import zipfile
-import io
+from django.conf import settings
 from git import Repo
 from git.exc import GitCommandError
 import logging
 
+from .archive import (
+    ArchiveError,
+    archive_url,
+    download_archive,
+    extract_archive,
+    resolve_default_branch,
+)
+from .clone_plan import MIRROR, PARTIAL, TARBALL, plan_clone
+from .github_client import (
+    GitHubAPIError,
+    RateLimitExceeded,
+    get_github_client,
+    parse_github_repo,
+)
+from .repo_cache import RepositoryMirrorCache
+from .repo_stats import RepositoryStats
+from .walker import FileManifest
+
 logger = logging.getLogger(__name__)
 
 
-def download_github_repository(repo_url, download_path=None, include_history=False):
+def download_github_repository(
+    repo_url, download_path=None, include_history=False, plan=None
+):
+    """
+    Скачивает репозиторий стратегией из plan (ClonePlan); без plan она
+    выбирается по метаданным GitHub. При ошибке git - откат на ZIP.
+    """
     try:
         logger.info(f"Начало скачивания: {repo_url}")
 
         repo_url = repo_url.strip().split("?")[0].split("#")[0]
 
-        if not repo_url.startswith("https://github.com/"):
+        local = settings.REPO_ALLOW_FILE_URLS and repo_url.startswith("file://")
+        if not repo_url.startswith("https://github.com/") and not local:
             logger.error(f"Неверный GitHub URL: {repo_url}")
             return None
 
+        if plan is None:
+            plan = plan_clone(repo_url, include_history)
+        logger.info(f"Стратегия скачивания: {plan}")
+        if plan.refused:
+            logger.error(f"Скачивание отклонено: {plan.reason}")
+            return None
+
         if download_path is None:
             download_path = tempfile.mkdtemp(prefix="github_repo_")
             logger.info(f"Создана временная директория: {download_path}")
 
+        if plan.strategy == TARBALL:
+            return download_github_repository_zip_simple(
+                repo_url, download_path, branch=plan.branch
+            )
+
         git_url = repo_url if repo_url.endswith(".git") else repo_url + ".git"
 
+        if plan.strategy == MIRROR:
+            checkout_path = _checkout_from_mirror(repo_url, git_url, download_path)
+            if checkout_path:
+                return checkout_path
+
         logger.info(f"Клонирование: {git_url} -> {download_path}")
 
         try:
-            if include_history:
+            if plan.strategy == PARTIAL:
+                _partial_clone(git_url, download_path, plan.branch, include_history)
+                logger.info("Частичное клонирование (blob:none) успешно")
+            elif include_history:
                 repo = Repo.clone_from(git_url, download_path)
                 logger.info("Полное клонирование успешно")
             else:
-                repo = Repo.clone_from(git_url, download_path, depth=1)
+                options = {"branch": plan.branch} if plan.branch else {}
+                repo = Repo.clone_from(
+                    git_url, download_path, depth=1, single_branch=True, **options
+                )
                 logger.info("Поверхностное клонирование успешно")
 
             if os.path.exists(download_path) and os.listdir(download_path):
@@ -46,50 +94,92 @@ def download_github_repository(repo_url, download_path=None, include_history=Fal
 
         except GitCommandError as e:
             logger.error(f"Ошибка Git: {e}")
-            return download_github_repository_zip_simple(repo_url, download_path)
+            shutil.rmtree(download_path, ignore_errors=True)
+            os.makedirs(download_path, exist_ok=True)
+            return download_github_repository_zip_simple(
+                repo_url, download_path, branch=plan.branch
+            )
 
     except Exception as e:
         logger.error(f"Неожиданная ошибка: {e}")
         return None
 
 
-def download_github_repository_zip_simple(repo_url, download_path):
+def _partial_clone(git_url, download_path, branch=None, include_history=False):
+    """
+    Blobless clone: коммиты и деревья скачиваются сразу, а блобы - только
+    для файлов sparse checkout (без вендорных каталогов REPO_SKIP_DIRS).
+    С историей скачиваются все блобы до SCAN_HISTORY_MAX_BLOB_BYTES.
+    """
+    options = {"branch": branch} if branch else {}
+    if include_history:
+        # Для сканирования истории нужны все блобы, кроме слишком больших
+        blob_filter = f"blob:limit={settings.SCAN_HISTORY_MAX_BLOB_BYTES}"
+    else:
+        blob_filter = "blob:none"
+        options["depth"] = 1
+    repo = Repo.clone_from(
+        git_url,
+        download_path,
+        filter=blob_filter,
+        no_checkout=True,
+        single_branch=True,
+        **options,
+    )
+    patterns = ["/*"] + [f"!{name}/" for name in settings.REPO_SKIP_DIRS]
+    repo.git.sparse_checkout("set", "--no-cone", *patterns)
+    repo.git.checkout()
+    return repo
+
+
+def _checkout_from_mirror(repo_url, git_url, download_path):
+    """Получает рабочую копию из локального кеша зеркал, None при неудаче"""
+    parsed = parse_github_repo(repo_url)
+    if not parsed:
+        return None
+
+    owner, repo_name = parsed
+    try:
+        RepositoryMirrorCache().checkout(owner, repo_name, git_url, download_path)
+        if os.listdir(download_path):
+            return download_path
+    except Exception as e:
+        logger.warning(f"Кеш зеркал недоступен, обычное клонирование: {e}")
+
+    # Убираем остатки неудачного worktree перед обычным клонированием
+    shutil.rmtree(download_path, ignore_errors=True)
+    os.makedirs(download_path, exist_ok=True)
+    return None
+
+
+def download_github_repository_zip_simple(repo_url, download_path, branch=None):
     try:
         logger.info("Попытка скачать через ZIP...")
 
         # Извлекаем owner/repo из URL
-        parts = repo_url.rstrip("/").split("/")
-        if "github.com" not in parts:
+        parsed = parse_github_repo(repo_url)
+        if not parsed:
             return None
 
-        github_index = parts.index("github.com")
-        owner = parts[github_index + 1]
-        repo_name = parts[github_index + 2].replace(".git", "")
+        owner, repo_name = parsed
 
         logger.info(f"Owner: {owner}, Repo: {repo_name}")
 
-        # Пробуем основные ветки
-        for branch in ["main", "master"]:
-            zip_url = f"https://github.com/{owner}/{repo_name}/archive/refs/heads/{branch}.zip"
-            logger.info(f"Попытка скачать: {zip_url}")
-
-            try:
-                response = requests.get(zip_url, timeout=30)
-                if response.status_code == 200:
-                    # Распаковываем ZIP
-                    with zipfile.ZipFile(io.BytesIO(response.content)) as zip_file:
-                        zip_file.extractall(download_path)
+        # Ветка по умолчанию определяется один раз, без перебора main/master
+        if branch is None:
+            branch = resolve_default_branch(owner, repo_name)
+        zip_url = archive_url(owner, repo_name, branch)
+        logger.info(f"Скачивание: {zip_url}")
 
-                    logger.info(f"ZIP успешно скачан и распакован в: {download_path}")
-                    return download_path
+        with download_archive(zip_url) as archive:
+            extract_archive(archive, download_path)
 
-            except Exception as e:
-                logger.warning(f"Не удалось скачать ветку {branch}: {e}")
-                continue
+        logger.info(f"ZIP успешно скачан и распакован в: {download_path}")
+        return download_path
 
-        logger.error("Не удалось скачать ни одну ветку")
+    except (ArchiveError, requests.RequestException, zipfile.BadZipFile) as e:
+        logger.error(f"Не удалось скачать ZIP: {e}")
         return None
-
     except Exception as e:
         logger.error(f"Ошибка при скачивании ZIP: {e}")
         return None
@@ -103,6 +193,7 @@ def cleanup_repository(path):
                 for prefix in ["github_repo_", "/tmp/", tempfile.gettempdir()]
             ):
                 shutil.rmtree(path)
+                FileManifest.forget(path)
                 logger.info(f"Репо удален: {path}")
             else:
                 logger.warning(f"Попытка удалить небезопасный путь: {path}")
@@ -111,33 +202,9 @@ def cleanup_repository(path):
 
 
 def get_repository_info(repo_path):
+    """Ветка, число коммитов, последний коммит и размеры (см. RepositoryStats)"""
     try:
-        if not os.path.exists(os.path.join(repo_path, ".git")):
-            logger.warning(f"Директория {repo_path} не является Git репозиторием")
-            return {"is_git_repo": False, "file_count": count_files(repo_path)}
-
-        repo = Repo(repo_path)
-
-        commits = list(repo.iter_commits())
-        active_branch = None
-        try:
-            active_branch = repo.active_branch.name
-        except:
-            active_branch = "detached"
-
-        info = {
-            "is_git_repo": True,
-            "branch": active_branch,
-            "commit_count": len(commits),
-            "latest_commit": commits[0].hexsha[:8] if commits else None,
-            "author": commits[0].author.name if commits else None,
-            "message": commits[0].message.split("\n")[0]
-            if commits
-            else None,  # Первая строка сообщения
-            "file_count": count_files(repo_path),
-            "repo_size": get_directory_size(repo_path),
-        }
-
+        info = RepositoryStats.collect(repo_path)
         logger.info(f"Информация о репо: {info}")
         return info
 
@@ -148,11 +215,7 @@ def get_repository_info(repo_path):
 
 def count_files(directory):
     try:
-        file_count = 0
-        for root, dirs, files in os.walk(directory):
-            dirs[:] = [d for d in dirs if not d.startswith(".")]
-            file_count += len(files)
-        return file_count
+        return FileManifest.for_path(directory).count(include_hidden=False)
     except Exception as e:
         logger.error(f"Ошибка при подсчете файлов: {e}")
         return 0
@@ -160,15 +223,7 @@ def count_files(directory):
 
 def get_directory_size(directory):
     try:
-        total_size = 0
-        for dirpath, dirnames, filenames in os.walk(directory):
-            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
-            for filename in filenames:
-                filepath = os.path.join(dirpath, filename)
-                try:
-                    total_size += os.path.getsize(filepath)
-                except OSError:
-                    continue
+        total_size = FileManifest.for_path(directory).total_size(include_hidden=False)
         return round(total_size / (1024 * 1024), 2)
     except Exception as e:
         logger.error(f"Ошибка при вычислении размера директории: {e}")
@@ -204,18 +259,20 @@ def validate_github_url(url):
         return False, "Недопустимые символы в имени репозитория"
 
     try:
-        api_url = f"https://api.github.com/repos/{owner}/{repo}"
-        response = requests.get(api_url, timeout=10)
-
-        if response.status_code == 404:
-            return False, "Репозиторий не найден"
-        elif response.status_code == 403:
-            # Rate limit или приватный репозиторий
+        metadata = get_github_client().get_repository(owner, repo)
+    except RateLimitExceeded:
+        return (
+            True,
+            "Проверка репозитория недоступна: исчерпан лимит запросов GitHub API",
+        )
+    except GitHubAPIError as e:
+        if e.status_code == 403:
+            # Приватный репозиторий или нет прав
             return True, "Отсутствует доступ к репозиторию"
-        elif response.status_code == 200:
-            return True, "Репозиторий существует и доступен"
-        else:
-            return True, f"Возникла ошибка (статус: {response.status_code})"
-
-    except requests.RequestException:
+        return True, f"Возникла ошибка (статус: {e.status_code})"
+    except (requests.RequestException, ValueError):
         return True, "проверка репозитория недоступна"
+
+    if metadata is None:
+        return False, "Репозиторий не найден"
+    return True, "Репозиторий существует и доступен"
@@ -1,8 +1,33 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from .engines import ScanEngineRegistry
+from .export import (
+    EXPORT_FORMATS,
+    aiterate,
+    encode,
+    iter_csv,
+    iter_ndjson,
+    iter_results,
+    iter_sarif,
+)
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
 from .models import ScanRequest, ScanResult
 from .forms import ScanRequestForm
+from .progress import FIELDS as PROGRESS_FIELDS, ProgressListener
 from .services import logger
 
 
@@ -18,15 +43,10 @@ def create_scan_request(request):
 
             logger.info(f"Создан ScanRequest ID: {scan_request.id}")
 
-            # синхронный вызов для отладки
-            from .services import ScanProcessor
-
-            ScanProcessor.process_scan(scan_request.id)
-
-            # позже: ScanProcessor.start_scan_async(scan_request.id)
-
+            # Сканирование выполнит воркер очереди (manage.py scan_worker)
             messages.success(
-                request, "Запрос на сканирование успешно создан! Сканирование запущено."
+                request,
+                "Запрос на сканирование успешно создан и поставлен в очередь.",
             )
             return redirect("scan_requests_list")
     else:
@@ -45,12 +65,275 @@ def scan_requests_list(request):
     )
 
 
+RESULT_LIST_FIELDS = (
+    "id",
+    "scan_request",
+    "status",
+    "file_path",
+    "str_number",
+    "bug_type",
+    "secret_type",
+    "confidence",
+    "description",
+    "error_message",
+)
+
+
+def _result_filters(params):
+    """Фильтры находок из GET-параметров: детектор, уверенность, префикс пути"""
+    filters = {}
+    if params.get("detector"):
+        filters["secret_type"] = params["detector"]
+    if params.get("confidence") in dict(ScanResult.CONFIDENCE_CHOICES):
+        filters["confidence"] = params["confidence"]
+    if params.get("path"):
+        filters["file_path__startswith"] = params["path"]
+    return filters
+
+
+def _cursor(params, name):
+    try:
+        return int(params.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def _keyset_page(queryset, after=None, before=None, size=50):
+    """
+    Страница находок по курсору id вместо OFFSET: стоимость не зависит
+    от номера страницы. Возвращает (строки, id для «назад», id для «вперед»).
+    """
+    if before is not None:
+        rows = list(queryset.filter(id__lt=before).order_by("-id")[: size + 1])
+        has_previous = len(rows) > size
+        rows = rows[:size][::-1]
+        has_next = True
+    else:
+        if after is not None:
+            queryset = queryset.filter(id__gt=after)
+        rows = list(queryset.order_by("id")[: size + 1])
+        has_next = len(rows) > size
+        rows = rows[:size]
+        has_previous = after is not None
+
+    previous_cursor = rows[0].id if rows and has_previous else None
+    next_cursor = rows[-1].id if rows and has_next else None
+    return rows, previous_cursor, next_cursor
+
+
+def _result_stats(scan_request):
+    """Сводные счетчики и список детекторов одним запросом к ScanResultSummary"""
+    stats = {"total": 0, "found": 0, "high": 0, "detectors": set()}
+    for row in scan_request.result_summary.values(
+        "status", "secret_type", "confidence", "count"
+    ):
+        stats["total"] += row["count"]
+        if row["status"]:
+            stats["found"] += row["count"]
+            if row["secret_type"]:
+                stats["detectors"].add(row["secret_type"])
+        if row["confidence"] == "high":
+            stats["high"] += row["count"]
+    stats["detectors"] = sorted(stats["detectors"])
+    return stats
+
+
 @login_required
 def scan_request_detail(request, pk):
     scan_request = get_object_or_404(ScanRequest, pk=pk, user=request.user)
-    scan_results = scan_request.scan_results.all()
+    filters = _result_filters(request.GET)
+
+    # raw_context может быть большим и подгружается только для открытой находки
+    queryset = scan_request.scan_results.filter(**filters).only(*RESULT_LIST_FIELDS)
+    scan_results, previous_cursor, next_cursor = _keyset_page(
+        queryset,
+        after=_cursor(request.GET, "after"),
+        before=_cursor(request.GET, "before"),
+        size=settings.SCAN_RESULTS_PAGE_SIZE,
+    )
     return render(
         request,
         "scanner/scan_request_detail.html",
-        {"scan_request": scan_request, "scan_results": scan_results},
+        {
+            "scan_request": scan_request,
+            "scan_results": scan_results,
+            "stats": _result_stats(scan_request),
+            "filters": filters,
+            "previous_cursor": previous_cursor,
+            "next_cursor": next_cursor,
+        },
+    )
+
+
+@login_required
+def scan_result_detail(request, pk, result_id):
+    """Полные данные одной находки для модального окна страницы деталей"""
+    result = get_object_or_404(
+        ScanResult, pk=result_id, scan_request__pk=pk, scan_request__user=request.user
+    )
+    return JsonResponse(
+        {
+            "id": result.id,
+            "file_path": result.file_path,
+            "line": result.str_number,
+            "commit_sha": result.commit_sha,
+            "author": result.author,
+            "secret_type": result.secret_type,
+            "confidence": (
+                result.get_confidence_display() if result.confidence else None
+            ),
+            "description": result.description,
+            "error_message": result.error_message,
+            "raw_context": result.raw_context,
+        }
+    )
+
+
+@login_required
+def export_scan_results(request, pk, format):
+    """
+    Потоковая выгрузка находок в CSV, NDJSON или SARIF (?gzip=1 - со сжатием).
+    Учитывает те же фильтры, что и страница деталей.
+    """
+    if format not in EXPORT_FORMATS:
+        raise Http404("Неизвестный формат выгрузки")
+    scan_request = get_object_or_404(ScanRequest, pk=pk, user=request.user)
+    results = iter_results(
+        scan_request.scan_results.filter(**_result_filters(request.GET))
+    )
+
+    if format == "csv":
+        chunks = iter_csv(results)
+    elif format == "ndjson":
+        chunks = iter_ndjson(results)
+    else:
+        chunks = iter_sarif(
+            scan_request, results, _result_stats(scan_request)["detectors"]
+        )
+
+    content_type, extension = EXPORT_FORMATS[format]
+    filename = f"scan_results_{scan_request.id}.{extension}"
+    compress = request.GET.get("gzip") in ("1", "true")
+    if compress:
+        content_type = "application/gzip"
+        filename += ".gz"
+
+    content = encode(chunks, compress=compress)
+    if isinstance(request, ASGIRequest):
+        # Под ASGI синхронный итератор был бы прочитан в память целиком
+        content = aiterate(content)
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+FINAL_STATUSES = ("COMPLETED", "PARTIAL", "FAILED")
+
+
+async def _progress_snapshot(pk):
+    """Статус и счетчики прогресса одним запросом (LEFT JOIN к ScanProgress)"""
+    row = await (
+        ScanRequest.objects.filter(pk=pk)
+        .values("status", *(f"progress__{field}" for field in PROGRESS_FIELDS))
+        .afirst()
     )
+    if row is None:
+        return None
+    return {key.removeprefix("progress__"): value for key, value in row.items()}
+
+
+async def _progress_events(pk):
+    listener = await ProgressListener(pk).open()
+    deadline = time.monotonic() + settings.SCAN_PROGRESS_STREAM_SECONDS
+    last_snapshot = None
+    last_sent = time.monotonic()
+    try:
+        # Интервал переподключения EventSource после обрыва, мс
+        yield "retry: 3000\n\n"
+        while time.monotonic() < deadline:
+            snapshot = await _progress_snapshot(pk)
+            if snapshot != last_snapshot:
+                yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+                last_snapshot = snapshot
+                last_sent = time.monotonic()
+            if snapshot is None or snapshot["status"] in FINAL_STATUSES:
+                yield "event: done\ndata: {}\n\n"
+                return
+
+            if not await listener.wait():
+                if time.monotonic() - last_sent >= settings.SCAN_PROGRESS_KEEPALIVE:
+                    # Комментарий SSE не дает прокси закрыть простаивающее соединение
+                    yield ": keepalive\n\n"
+                    last_sent = time.monotonic()
+    finally:
+        await listener.close()
+
+
+@login_required
+async def scan_progress_stream(request, pk):
+    """
+    Server-Sent Events с ходом сканирования. Асинхронное представление:
+    одно долгое соединение на зрителя вместо перезагрузки страницы
+    (требует ASGI-сервера, см. github_osint_project/asgi.py).
+    """
+    user = await request.auser()
+    if not await ScanRequest.objects.filter(pk=pk, user=user).aexists():
+        raise Http404("Сканирование не найдено")
+
+    response = StreamingHttpResponse(
+        _progress_events(pk), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # nginx не должен буферизовать поток
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required
+def scan_engines(request):
+    """
+    Движки сканирования, найденные воркерами (manage.py scan_worker).
+    Пути к бинарникам видны только персоналу.
+    """
+    workers = []
+    scan_types = set()
+    for worker in ScanEngineRegistry.workers():
+        engines = worker.engines
+        if not request.user.is_staff:
+            engines = {
+                name: {key: value for key, value in info.items() if key != "path"}
+                for name, info in engines.items()
+            }
+        workers.append(
+            {
+                "worker": worker.worker_id,
+                "updated_at": worker.updated_at.isoformat(),
+                "engines": engines,
+                "scan_types": worker.scan_types,
+            }
+        )
+        scan_types.update(worker.scan_types)
+
+    return JsonResponse(
+        {"workers": workers, "scan_types": sorted(scan_types)},
+        status=200 if "SECRETS" in scan_types else 503,
+    )
+
+
+@require_GET
+def metrics(request):
+    """
+    Метрики Prometheus: гистограммы этапов сканирования и глубина очередей.
+    Доступ по METRICS_TOKEN в заголовке Authorization, без токена - персоналу.
+    """
+    if settings.METRICS_TOKEN:
+        authorized = constant_time_compare(
+            request.headers.get("Authorization", ""),
+            f"Bearer {settings.METRICS_TOKEN}",
+        )
+    else:
+        authorized = request.user.is_staff
+    if not authorized:
+        return HttpResponse("Forbidden", status=403, content_type="text/plain")
+
+    return HttpResponse(render_metrics(), content_type=METRICS_CONTENT_TYPE)
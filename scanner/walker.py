@@ -0,0 +1,200 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .archive import BINARY_EXTENSIONS
+from .dependencies import manifest_parser
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FileEntry:
+    """
+    Файл рабочей копии.
+
+    hidden - файл лежит в скрытом каталоге, vendored - в каталоге из
+    REPO_SKIP_DIRS, binary - бинарный по расширению, manifest - экосистема
+    файла зависимостей или None.
+    """
+
+    __slots__ = (
+        "path",
+        "size",
+        "extension",
+        "binary",
+        "manifest",
+        "hidden",
+        "vendored",
+    )
+
+    def __init__(self, path, size, hidden=False, vendored=False):
+        name = os.path.basename(path)
+        parser = manifest_parser(name)
+        self.path = path
+        self.size = size
+        self.extension = os.path.splitext(name)[1].lower()
+        self.binary = self.extension in BINARY_EXTENSIONS
+        self.manifest = parser[0] if parser else None
+        self.hidden = hidden
+        self.vendored = vendored
+
+
+def _walk_tree(root, start, hidden, vendored, skip_dirs):
+    """Обход поддерева через os.scandir: тип файла берется из d_type, без stat"""
+    entries = []
+    stack = [(start, hidden, vendored)]
+    while stack:
+        directory, hidden, vendored = stack.pop()
+        try:
+            with os.scandir(directory) as iterator:
+                for entry in iterator:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name == ".git":
+                            continue
+                        stack.append(
+                            (
+                                entry.path,
+                                hidden or entry.name.startswith("."),
+                                vendored or entry.name in skip_dirs,
+                            )
+                        )
+                    elif entry.is_file(follow_symlinks=False):
+                        try:
+                            size = entry.stat(follow_symlinks=False).st_size
+                        except OSError:
+                            continue
+                        entries.append(
+                            FileEntry(
+                                os.path.relpath(entry.path, root),
+                                size,
+                                hidden,
+                                vendored,
+                            )
+                        )
+        except OSError as e:
+            logger.warning(f"Не удалось прочитать каталог {directory}: {e}")
+    return entries
+
+
+class FileManifest:
+    """
+    Список файлов рабочей копии, собранный за один обход.
+
+    Используется всеми этапами сканирования (поиск файлов зависимостей,
+    шардирование, встроенный движок, кеш блобов, статистика репозитория).
+    for_path() строит манифест один раз на каталог; forget() сбрасывает его
+    при удалении рабочей копии.
+    """
+
+    MAX_CACHED = 16
+
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, root, entries):
+        self.root = root
+        self.entries = sorted(entries, key=lambda entry: entry.path)
+        self._by_path = {entry.path: entry for entry in self.entries}
+
+    @classmethod
+    def build(cls, root, workers=None):
+        """Обходит root; каталоги верхнего уровня обходятся параллельно"""
+        workers = workers or settings.SCAN_WALK_WORKERS
+        skip_dirs = set(settings.REPO_SKIP_DIRS)
+
+        entries = []
+        subtrees = []
+        with os.scandir(root) as iterator:
+            for entry in iterator:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name != ".git":
+                        subtrees.append(entry)
+                elif entry.is_file(follow_symlinks=False):
+                    try:
+                        size = entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+                    entries.append(FileEntry(entry.name, size))
+
+        def walk(entry):
+            return _walk_tree(
+                root,
+                entry.path,
+                entry.name.startswith("."),
+                entry.name in skip_dirs,
+                skip_dirs,
+            )
+
+        if workers > 1 and len(subtrees) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for subtree_entries in executor.map(walk, subtrees):
+                    entries.extend(subtree_entries)
+        else:
+            for subtree in subtrees:
+                entries.extend(walk(subtree))
+
+        manifest = cls(root, entries)
+        logger.info(
+            f"Манифест файлов {root}: {len(manifest.entries)} файлов, "
+            f"{manifest.total_size() / (1024 * 1024):.1f} МБ"
+        )
+        return manifest
+
+    @classmethod
+    def for_path(cls, root):
+        root = os.path.abspath(root)
+        with cls._lock:
+            manifest = cls._cache.get(root)
+            if manifest is not None:
+                cls._cache.move_to_end(root)
+                return manifest
+
+        manifest = cls.build(root)
+        with cls._lock:
+            cls._cache[root] = manifest
+            while len(cls._cache) > cls.MAX_CACHED:
+                cls._cache.popitem(last=False)
+        return manifest
+
+    @classmethod
+    def forget(cls, root):
+        with cls._lock:
+            cls._cache.pop(os.path.abspath(root), None)
+
+    def files(self, include_hidden=True, include_vendored=True):
+        for entry in self.entries:
+            if entry.hidden and not include_hidden:
+                continue
+            if entry.vendored and not include_vendored:
+                continue
+            yield entry
+
+    def get(self, path):
+        return self._by_path.get(path)
+
+    def count(self, include_hidden=True):
+        return sum(1 for _ in self.files(include_hidden=include_hidden))
+
+    def total_size(self, include_hidden=True):
+        return sum(entry.size for entry in self.files(include_hidden=include_hidden))
+
+    def sizes(self, paths=None):
+        """[(путь, размер)] для всех файлов или для списка paths"""
+        if paths is None:
+            return [(entry.path, entry.size) for entry in self.entries]
+
+        sizes = []
+        for path in paths:
+            entry = self._by_path.get(path)
+            if entry is not None:
+                sizes.append((path, entry.size))
+                continue
+            try:
+                sizes.append((path, os.path.getsize(os.path.join(self.root, path))))
+            except OSError:
+                continue
+        return sizes